@@ -1,3 +1,4 @@
+from django.contrib.contenttypes.fields import GenericRelation
 from django.db import models
 from peacelink.users.models import User
 
@@ -24,6 +25,7 @@ class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField(blank=True)
     audio_message = models.FileField(upload_to='messages/audio/', null=True, blank=True)
+    derivatives = GenericRelation('media.MediaDerivative')  # Transcoded audio, see peacelink.media
     attachment = models.FileField(upload_to='messages/attachments/', null=True, blank=True)
     
     # Encryption
@@ -1,3 +1,5 @@
 from django.contrib import admin
-from .models import Analytics
+from .models import Analytics, RollupCounter, RollupWatermark
 admin.site.register(Analytics)
+admin.site.register(RollupCounter)
+admin.site.register(RollupWatermark)
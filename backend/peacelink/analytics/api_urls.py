@@ -4,4 +4,6 @@ from . import api_views
 urlpatterns = [
     path('', api_views.AnalyticsListCreate.as_view()),
     path('<int:pk>/', api_views.AnalyticsRetrieveUpdateDestroy.as_view()),
+    path('rollups/', api_views.rollup_counts),
+    path('series/', api_views.metric_series),
 ]
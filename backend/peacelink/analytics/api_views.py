@@ -1,11 +1,81 @@
-from rest_framework import generics
+from datetime import datetime, time
+
+from rest_framework import generics, status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from .models import Analytics
 from .serializers import AnalyticsSerializer
+from . import rollups, series
 
 class AnalyticsListCreate(generics.ListCreateAPIView):
     queryset = Analytics.objects.all()
     serializer_class = AnalyticsSerializer
+    cursor_ordering = ('-id',)  # No created_at on this model
 
 class AnalyticsRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
     queryset = Analytics.objects.all()
     serializer_class = AnalyticsSerializer
+
+
+def parse_moment(value):
+    """Aware datetime from an ISO datetime or a YYYY-MM-DD date (its midnight), or None"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+def metric_query(params):
+    """(keyword arguments for rollups.query and series.series, error message) from query parameters
+
+    ?metric=&granularity=&start=&end=&group_by=a,b plus dimension=value filters
+    """
+    name = params.get('metric', None)
+    if name not in rollups.METRICS:
+        return None, f"metric must be one of {', '.join(rollups.METRICS)}"
+    query = {
+        'name': name,
+        'granularity': params.get('granularity', 'day'),
+        'group_by': [dim for dim in params.get('group_by', '').split(',') if dim],
+        'filters': {dim: params[dim] for dim in rollups.METRICS[name].dimensions if dim in params},
+    }
+    for param in ('start', 'end'):
+        value = params.get(param, None)
+        if value:
+            query[param] = parse_moment(value)
+            if query[param] is None:
+                return None, f'{param} must be an ISO date or datetime'
+    return query, None
+
+@api_view(['GET'])
+def rollup_counts(request):
+    """Pre-aggregated counts per stored bucket, see metric_query for the parameters"""
+    query, error = metric_query(request.query_params)
+    if error is None:
+        try:
+            results = rollups.query(**query)
+        except ValueError as exc:
+            error = str(exc)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'metric': query['name'], 'granularity': query['granularity'],
+                     'group_by': query['group_by'], 'results': results})
+
+@api_view(['GET'])
+def metric_series(request):
+    """Zero-filled dashboard series (granularity may also be month), see metric_query for the parameters"""
+    query, error = metric_query(request.query_params)
+    if error is None:
+        try:
+            result = series.series(**query)
+        except ValueError as exc:
+            error = str(exc)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result)
@@ -1,3 +1,6 @@
 from django.apps import AppConfig
 class AnalyticsConfig(AppConfig):
     name = 'peacelink.analytics'
+
+    def ready(self):
+        from . import rollups  # noqa: F401 - connects the signals that keep rollup counters current
@@ -0,0 +1,250 @@
+"""
+Buffered engagement counters (view and download tallies)
+
+Requests call `increment()` instead of doing a read-modify-write save on the
+row. Increments accumulate in the configured backend and `flush()` writes them
+with one `UPDATE ... SET field = field + n` per (model, field, delta) group.
+Flushing happens on a background timer every COUNTERS['FLUSH_INTERVAL']
+seconds, at process exit, and on demand via `manage.py flush_counters`.
+
+The default Redis backend keeps increments outside the worker processes, so
+a crashed or restarted worker loses nothing, and a failed flush leaves them
+in Redis for the next one. If Redis cannot be reached, increment() writes
+straight to the row instead of dropping the count. The in-process backend
+loses whatever was counted since the last flush on a hard crash and is
+meant for tests.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# (model label, field) pairs that may be counted through this module
+COUNTED_FIELDS = {
+    ('forums.ForumTopic', 'view_count'),
+    ('forums.ForumPost', 'view_count'),
+    ('resources.Resource', 'view_count'),
+    ('resources.Resource', 'download_count'),
+    ('community.SuccessStory', 'view_count'),
+}
+
+DEFAULTS = {
+    'BACKEND': 'peacelink.analytics.counters.RedisCounterBackend',
+    'FLUSH_INTERVAL': 10,
+    'OPTIONS': {},
+}
+
+# Sent after each successful flush with sender=model, field and deltas={pk: n}
+counters_flushed = Signal()
+
+
+class CounterBackendUnavailable(Exception):
+    """The buffer cannot take increments right now; increment() writes through instead"""
+
+
+class LocalCounterBackend:
+    """Per-process buffer for tests; a hard crash loses what has not been flushed"""
+
+    def __init__(self, **options):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+
+    def incr(self, key, amount):
+        with self._lock:
+            self._pending[key] += amount
+            return self._pending[key]
+
+    def get(self, key):
+        with self._lock:
+            return self._pending.get(key, 0)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        return dict(pending)
+
+    def commit(self):
+        pass
+
+    def restore(self, pending):
+        with self._lock:
+            for key, amount in pending.items():
+                self._pending[key] += amount
+
+
+class RedisCounterBackend:
+    """Shared buffer in a Redis-compatible store, safe across processes
+
+    Flushing renames the live hash to a processing hash under a lock, so
+    increments arriving mid-flush land in a fresh hash. The processing hash
+    is only deleted after the database commit; if the flush fails it is
+    picked up again by the next one.
+    """
+
+    def __init__(self, location='redis://localhost:6379/0', prefix='peacelink:counters', **options):
+        import redis
+        self._client = redis.Redis.from_url(location)
+        self._live = prefix
+        self._processing = f'{prefix}:processing'
+        self._lock = self._client.lock(f'{prefix}:lock', timeout=60)
+
+    @staticmethod
+    def _field(key):
+        return '%s|%s|%s' % key
+
+    @staticmethod
+    def _key(field):
+        label, name, pk = field.decode().split('|')
+        return label, name, int(pk)
+
+    def incr(self, key, amount):
+        from redis.exceptions import ConnectionError, TimeoutError
+        try:
+            return self._client.hincrby(self._live, self._field(key), amount)
+        except (ConnectionError, TimeoutError) as exc:
+            raise CounterBackendUnavailable(str(exc)) from exc
+
+    def get(self, key):
+        from redis.exceptions import ConnectionError, TimeoutError
+        try:
+            return int(self._client.hget(self._live, self._field(key)) or 0)
+        except (ConnectionError, TimeoutError):
+            return 0
+
+    def drain(self):
+        if not self._lock.acquire(blocking=False):
+            return {}  # Another process is flushing
+        if not self._client.exists(self._processing):
+            try:
+                self._client.rename(self._live, self._processing)
+            except Exception:
+                self._lock.release()
+                return {}  # Nothing buffered
+        pending = self._client.hgetall(self._processing)
+        return {self._key(field): int(amount) for field, amount in pending.items()}
+
+    def commit(self):
+        self._client.delete(self._processing)
+        self._lock.release()
+
+    def restore(self, pending):
+        self._lock.release()  # Processing hash is kept for the next flush
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_timer = None
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'COUNTERS', {})}
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = get_config()
+                _backend = import_string(config['BACKEND'])(**config['OPTIONS'])
+    return _backend
+
+
+def _key(instance, field):
+    label = instance._meta.label
+    if (label, field) not in COUNTED_FIELDS:
+        raise ValueError(f'{label}.{field} is not a buffered counter')
+    return label, field, instance.pk
+
+
+def increment(instance, field, amount=1):
+    """Buffer an increment and add the unflushed total to the freshly loaded `instance`
+
+    Falls back to an immediate UPDATE when the backend is unavailable, so the
+    increment is never dropped.
+    """
+    key = _key(instance, field)
+    _start_timer()
+    try:
+        buffered = get_backend().incr(key, amount)
+    except CounterBackendUnavailable:
+        logger.warning('Counter backend unavailable, writing %s.%s directly', *key[:2])
+        type(instance)._default_manager.filter(pk=instance.pk).update(**{field: F(field) + amount})
+        counters_flushed.send(sender=type(instance), field=field, deltas={instance.pk: amount})
+        buffered = amount
+    setattr(instance, field, getattr(instance, field) + buffered)
+    return buffered
+
+
+def pending(instance, field):
+    """Increments counted for instance.field that are not yet in the database"""
+    return get_backend().get(_key(instance, field))
+
+
+def flush():
+    """Write buffered increments to the database, returns the number of counters flushed"""
+    backend = get_backend()
+    drained = backend.drain()
+    if not drained:
+        return 0
+
+    # (label, field) -> delta -> [pk, ...] so equal deltas share one UPDATE
+    grouped = defaultdict(lambda: defaultdict(list))
+    for (label, field, pk), amount in drained.items():
+        if amount:
+            grouped[(label, field)][amount].append(pk)
+
+    try:
+        with transaction.atomic():
+            for (label, field), by_amount in grouped.items():
+                model = apps.get_model(label)
+                for amount, pks in by_amount.items():
+                    model.objects.filter(pk__in=pks).update(**{field: F(field) + amount})
+    except Exception:
+        backend.restore(drained)
+        raise
+    backend.commit()
+
+    for (label, field), by_amount in grouped.items():
+        deltas = {pk: amount for amount, pks in by_amount.items() for pk in pks}
+        counters_flushed.send(sender=apps.get_model(label), field=field, deltas=deltas)
+    return len(drained)
+
+
+def _flush_quietly():
+    close_old_connections()
+    try:
+        flush()
+    except Exception:
+        logger.exception('Counter flush failed, increments kept for the next flush')
+    finally:
+        close_old_connections()
+
+
+def _run_timer(interval):
+    while True:
+        time.sleep(interval)
+        _flush_quietly()
+
+
+def _start_timer():
+    global _timer
+    if _timer is not None:
+        return
+    with _backend_lock:
+        if _timer is not None:
+            return
+        _timer = threading.Thread(target=_run_timer, args=(get_config()['FLUSH_INTERVAL'],),
+                                  name='counter-flush', daemon=True)
+        _timer.start()
+        atexit.register(_flush_quietly)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from peacelink.analytics import counters
+
+
+class Command(BaseCommand):
+    help = 'Write buffered view/download counter increments to the database (shared backends only)'
+
+    def handle(self, *args, **options):
+        flushed = counters.flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} counters'))
@@ -0,0 +1,39 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from peacelink.analytics import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute analytics rollup counters from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('metrics', nargs='*', help='Metrics to rebuild (default: all with a source table)')
+        parser.add_argument('--since', help='Only replace buckets from the week containing this YYYY-MM-DD date')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only replace buckets touched since the previous incremental run')
+
+    def handle(self, *args, **options):
+        names = options['metrics'] or [name for name, metric in rollups.METRICS.items() if metric.time_field]
+        unknown = [name for name in names if name not in rollups.METRICS]
+        if unknown:
+            raise CommandError(f"Unknown metric: {', '.join(unknown)}")
+        since = None
+        if options['since']:
+            day = parse_date(options['since'])
+            if day is None:
+                raise CommandError('--since must be a YYYY-MM-DD date')
+            since = timezone.make_aware(datetime.combine(day, time.min))
+
+        for name in names:
+            try:
+                if options['incremental']:
+                    written = rollups.rebuild_incremental(name)
+                else:
+                    written = rollups.rebuild(name, since=since)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(f'{name}: wrote {written} counters'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=32, unique=True)),
+                ('rebuilt_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=32)),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('week', 'Week')], max_length=8)),
+                ('bucket', models.DateTimeField()),
+                ('dimensions', models.CharField(blank=True, max_length=64)),
+                ('key', models.CharField(blank=True, max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metric', 'granularity', 'dimensions', 'bucket', 'key'), name='rollup_counter_unique')],
+            },
+        ),
+    ]
@@ -7,3 +7,43 @@ class Analytics(models.Model):
 
     def __str__(self):
         return f"{self.key}: {self.value}"
+
+
+class RollupCounter(models.Model):
+    """Event count for one metric, time bucket and combination of dimension values
+
+    Maintained by peacelink.analytics.rollups; `dimensions` names the grouped
+    dimensions (e.g. "category,state") and `key` holds their values as a JSON list.
+    """
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+        ('week', 'Week'),
+    ]
+    
+    metric = models.CharField(max_length=32)
+    granularity = models.CharField(max_length=8, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()  # Start of the hour/day/week in TIME_ZONE
+    dimensions = models.CharField(max_length=64, blank=True)
+    key = models.CharField(max_length=255, blank=True)
+    count = models.BigIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            # Also the index for range scans of one metric/granularity/grouping
+            models.UniqueConstraint(
+                fields=['metric', 'granularity', 'dimensions', 'bucket', 'key'], name='rollup_counter_unique'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.metric}/{self.granularity} {self.bucket:%Y-%m-%d %H:%M} {self.key}: {self.count}"
+
+
+class RollupWatermark(models.Model):
+    """How far `manage.py rebuild_rollups --incremental` has recomputed a metric"""
+    metric = models.CharField(max_length=32, unique=True)
+    rebuilt_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.metric} rebuilt at {self.rebuilt_at}"
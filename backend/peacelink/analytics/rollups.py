@@ -0,0 +1,386 @@
+"""
+Pre-aggregated analytics rollups
+
+Every counted event (a report, alert, forum topic or post created, a
+resource download) adds to one RollupCounter row per granularity (hour,
+day, week) and per combination of the metric's dimensions, e.g. reports
+per day for each (category, state). Dashboards then read counts for any
+grouping and filter from at most (buckets in range) x (distinct values)
+rows, however large the source tables grow.
+
+Counters are kept current from post_save/post_delete signals, from
+record_update() for queryset updates such as bulk status transitions, and
+from counters_flushed for downloads. Deltas are computed in the caller's
+transaction but upserted once it commits, so the hot rows (the ()
+cuboid every event touches) are locked for one statement rather than for
+the rest of a transition or save. `manage.py rebuild_rollups`
+recomputes them from the source tables; with ROLLUPS['SIGNALS'] off, run
+it periodically with --incremental to refold everything since the last
+watermark instead, along with the older weeks of rows whose updated_at
+moved past it. Changes that leave updated_at alone (deleted rows, a
+reporter moving county) are only repaired by a full rebuild.
+
+Report counts are bucketed by created_at, so the status dimension reads
+as "reports created in the bucket that are now in this status".
+"""
+import json
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import combinations
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Trunc
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .counters import counters_flushed
+from .models import RollupCounter, RollupWatermark
+
+GRANULARITIES = ('hour', 'day', 'week')
+MAX_VALUE_LENGTH = 64
+UPSERT_BATCH = 500
+
+# A county name is only meaningful within its state, so county is always grouped with state
+IMPLIES = {'county': 'state'}
+
+DEFAULTS = {
+    'SIGNALS': True,  # Off: only `rebuild_rollups --incremental` updates save-driven metrics
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'ROLLUPS', {})}
+
+
+class Metric:
+    """A counted event and the dimensions it can be grouped by
+
+    `dimensions` maps each dimension to its lookup path on the model.
+    Metrics with a `time_field` count rows of the model by that timestamp;
+    metrics with a `counter_field` count flushed increments of that counter.
+    """
+
+    def __init__(self, model, dimensions, time_field='created_at', counter_field=None):
+        self.label = model
+        self.dimensions = dimensions
+        self.time_field = time_field
+        self.counter_field = counter_field
+        self.fields = {path.split('__')[0] for path in dimensions.values()}
+        self.cuboids = [
+            dims
+            for size in range(len(dimensions) + 1)
+            for dims in combinations(dimensions, size)
+            if all(IMPLIES[dim] in dims for dim in dims if dim in IMPLIES)
+        ]
+
+    @property
+    def model(self):
+        return apps.get_model(self.label)
+
+    def cuboid(self, dims):
+        """The counted grouping covering `dims`, in canonical order"""
+        dims = set(dims) | {IMPLIES[dim] for dim in dims if dim in IMPLIES}
+        return tuple(dim for dim in self.dimensions if dim in dims)
+
+    def values_of(self, instance):
+        values = {}
+        for dim, path in self.dimensions.items():
+            value = instance
+            try:
+                for attr in path.split('__'):
+                    value = getattr(value, attr) if value is not None else None
+            except ObjectDoesNotExist:
+                value = None
+            values[dim] = clean_value(value)
+        return values
+
+    def row_values(self, row):
+        return {dim: clean_value(row[path]) for dim, path in self.dimensions.items()}
+
+
+METRICS = {
+    'reports': Metric('reports.Report', {
+        'category': 'category',
+        'urgency': 'urgency',
+        'status': 'status',
+        'state': 'user__state',
+        'county': 'user__county',
+    }),
+    'alerts': Metric('notifications.Alert', {'channel': 'channel'}, time_field='sent_at'),
+    'emergency_alerts': Metric('notifications.EmergencyAlert', {
+        'alert_type': 'alert_type',
+        'severity': 'severity',
+    }),
+    'forum_topics': Metric('forums.ForumTopic', {'category': 'category', 'topic_type': 'topic_type'}),
+    'forum_posts': Metric('forums.ForumPost', {'category': 'topic__category', 'language': 'language'}),
+    'resource_downloads': Metric('resources.Resource', {
+        'category': 'category',
+        'language': 'language',
+        'type': 'resource_type',
+    }, time_field=None, counter_field='download_count'),
+}
+
+
+def clean_value(value):
+    return '' if value is None else str(value)[:MAX_VALUE_LENGTH]
+
+
+def bucket_start(moment, granularity):
+    """Start of the hour, day, (Monday) week or month containing `moment`, in TIME_ZONE"""
+    local = timezone.localtime(moment)
+    if granularity == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+    day = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'week':
+        day -= timedelta(days=day.weekday())
+    elif granularity == 'month':
+        day = day.replace(day=1)
+    return day
+
+
+def _counts(metric, events):
+    """Fold (moment, values, delta) events into counter deltas"""
+    counts = Counter()
+    for moment, values, delta in events:
+        buckets = [(granularity, bucket_start(moment, granularity)) for granularity in GRANULARITIES]
+        for dims in metric.cuboids:
+            dimensions = ','.join(dims)
+            key = json.dumps([values[dim] for dim in dims], ensure_ascii=False)
+            for granularity, bucket in buckets:
+                counts[(granularity, bucket, dimensions, key)] += delta
+    return counts
+
+
+def _upsert(name, counts):
+    """Add counter deltas with INSERT ... ON CONFLICT DO UPDATE, one statement per batch"""
+    # Key order, so concurrent upserts lock shared rows in the same order
+    rows = sorted((key, delta) for key, delta in counts.items() if delta)
+    if not rows:
+        return
+    qn = connection.ops.quote_name
+    table = qn(RollupCounter._meta.db_table)
+    columns = ', '.join(qn(column) for column in ('metric', 'granularity', 'dimensions', 'bucket', 'key'))
+    for start in range(0, len(rows), UPSERT_BATCH):
+        batch = rows[start:start + UPSERT_BATCH]
+        params = []
+        for (granularity, bucket, dimensions, key), delta in batch:
+            params += [name, granularity, dimensions, connection.ops.adapt_datetimefield_value(bucket), key, delta]
+        sql = (
+            f'INSERT INTO {table} ({columns}, {qn("count")}) VALUES '
+            + ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(batch))
+            + f' ON CONFLICT ({columns}) DO UPDATE SET {qn("count")} = {table}.{qn("count")} + EXCLUDED.{qn("count")}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+def record(name, events):
+    """Count (moment, {dimension: value}, delta) events for metric `name` once the transaction commits
+
+    A rollback drops them with the rows they counted. A failed upsert is
+    logged rather than raised into a committed request; rebuild_rollups
+    repairs the counters.
+    """
+    counts = _counts(METRICS[name], events)
+    if counts:
+        transaction.on_commit(lambda: _upsert(name, counts), robust=True)
+
+
+def record_update(name, queryset, **changes):
+    """Count a pending queryset.update(**changes); call it just before the update
+
+    Fields are given by their lookup paths, as in the update itself.
+    """
+    metric = METRICS[name]
+    if not get_config()['SIGNALS'] or not metric.fields & set(changes):
+        return
+    events = []
+    for row in queryset.values(metric.time_field, *metric.dimensions.values()):
+        old = metric.row_values(row)
+        new = {**old, **{dim: clean_value(changes[path]) for dim, path in metric.dimensions.items() if path in changes}}
+        if new != old:
+            events += [(row[metric.time_field], old, -1), (row[metric.time_field], new, 1)]
+    record(name, events)
+
+
+def query(name, granularity='day', start=None, end=None, group_by=(), filters=None):
+    """Counts per bucket and group_by values within [start, end), oldest first
+
+    `filters` maps dimensions to the single value to keep. Raises KeyError
+    for an unknown metric and ValueError for unknown dimensions.
+    """
+    metric = METRICS[name]
+    filters = filters or {}
+    group_by = tuple(group_by)
+    unknown = (set(group_by) | set(filters)) - set(metric.dimensions)
+    if unknown:
+        raise ValueError(f"Unknown dimension for {name}: {', '.join(sorted(unknown))}")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Granularity must be one of {", ".join(GRANULARITIES)}')
+
+    dims = metric.cuboid(set(group_by) | set(filters))
+    counters = RollupCounter.objects.filter(metric=name, granularity=granularity, dimensions=','.join(dims))
+    if set(filters) >= set(dims):
+        counters = counters.filter(key=json.dumps([filters[dim] for dim in dims], ensure_ascii=False))
+    if start is not None:
+        counters = counters.filter(bucket__gte=bucket_start(start, granularity))
+    if end is not None:
+        counters = counters.filter(bucket__lt=end)
+
+    totals = defaultdict(int)
+    for bucket, key, count in counters.order_by('bucket').values_list('bucket', 'key', 'count').iterator():
+        values = dict(zip(dims, json.loads(key)))
+        if all(values[dim] == value for dim, value in filters.items()):
+            totals[(bucket, tuple(values[dim] for dim in group_by))] += count
+    return [
+        {'bucket': timezone.localtime(bucket), **dict(zip(group_by, group)), 'count': count}
+        for (bucket, group), count in totals.items() if count
+    ]
+
+
+def rebuild(name, since=None, weeks=()):
+    """Recompute a metric's counters from its source table, returns the counters written
+
+    With `since`, only buckets from the start of that week on are replaced,
+    plus the earlier weeks starting at the `weeks` bucket starts.
+    Source rows are read pre-grouped by hour and folded a week at a time,
+    so memory stays bounded by one week of distinct values.
+    """
+    metric = METRICS[name]
+    if metric.time_field is None:
+        raise ValueError(f'{name} has no source table to rebuild from')
+    rows = metric.model._default_manager.all()
+    stale = RollupCounter.objects.filter(metric=name)
+    if since is not None:
+        since = bucket_start(since, 'week')
+        in_range = Q(**{f'{metric.time_field}__gte': since})
+        stale_range = Q(bucket__gte=since)
+        for week in weeks:
+            end = week + timedelta(days=7)
+            in_range |= Q(**{f'{metric.time_field}__gte': week, f'{metric.time_field}__lt': end})
+            stale_range |= Q(bucket__gte=week, bucket__lt=end)
+        rows = rows.filter(in_range)
+        stale = stale.filter(stale_range)
+    rows = (
+        rows.annotate(rollup_hour=Trunc(metric.time_field, 'hour')).order_by()
+        .values('rollup_hour', *metric.dimensions.values())
+        .annotate(rollup_count=Count('pk'))
+        .order_by('rollup_hour')
+    )
+
+    written = 0
+    with transaction.atomic():
+        stale.delete()
+        week, events = None, []
+        for row in rows.iterator():
+            row_week = bucket_start(row['rollup_hour'], 'week')
+            if row_week != week and events:
+                counts = _counts(metric, events)
+                _upsert(name, counts)
+                written += len(counts)
+                events = []
+            week = row_week
+            events.append((row['rollup_hour'], metric.row_values(row), row['rollup_count']))
+        counts = _counts(metric, events)
+        _upsert(name, counts)
+        written += len(counts)
+    return written
+
+
+def changed_weeks(name, since):
+    """Starts of the weeks before `since` holding rows updated since then"""
+    metric = METRICS[name]
+    model = metric.model
+    try:
+        model._meta.get_field('updated_at')
+    except FieldDoesNotExist:
+        return set()
+    hours = (
+        model._default_manager
+        .filter(updated_at__gte=since, **{f'{metric.time_field}__lt': bucket_start(since, 'week')})
+        .annotate(rollup_hour=Trunc(metric.time_field, 'hour')).order_by()
+        .values_list('rollup_hour', flat=True).distinct()
+    )
+    return {bucket_start(hour, 'week') for hour in hours}
+
+
+def rebuild_incremental(name):
+    """Rebuild the buckets touched since the metric's watermark and move it to now
+
+    Besides the buckets from the watermark's week on, this refolds the
+    older weeks of rows updated since, e.g. a report from last month that
+    was resolved today.
+    """
+    now = timezone.now()
+    watermark = RollupWatermark.objects.filter(metric=name).first()
+    if watermark is None:
+        written = rebuild(name)
+    else:
+        written = rebuild(name, since=watermark.rebuilt_at, weeks=changed_weeks(name, watermark.rebuilt_at))
+    RollupWatermark.objects.update_or_create(metric=name, defaults={'rebuilt_at': now})
+    return written
+
+
+SAVED_METRICS = {metric.label: name for name, metric in METRICS.items() if metric.time_field}
+
+
+def capture_old_values(sender, instance, raw=False, update_fields=None, **kwargs):
+    metric = METRICS[SAVED_METRICS[sender._meta.label]]
+    if raw or instance._state.adding or not get_config()['SIGNALS']:
+        return
+    if update_fields is not None and not metric.fields & set(update_fields):
+        return
+    row = sender._default_manager.filter(pk=instance.pk).values(*metric.dimensions.values()).first()
+    if row is not None:
+        instance._rollup_values = metric.row_values(row)
+
+
+def count_saved(sender, instance, created=False, raw=False, **kwargs):
+    name = SAVED_METRICS[sender._meta.label]
+    metric = METRICS[name]
+    if raw or not get_config()['SIGNALS']:
+        return
+    moment = getattr(instance, metric.time_field)
+    if created:
+        record(name, [(moment, metric.values_of(instance), 1)])
+        return
+    old = instance.__dict__.pop('_rollup_values', None)
+    if old is not None:
+        new = metric.values_of(instance)
+        if new != old:
+            record(name, [(moment, old, -1), (moment, new, 1)])
+
+
+def capture_deleted_values(sender, instance, **kwargs):
+    # Read related values (the reporter's state) before a cascade can remove them
+    if get_config()['SIGNALS']:
+        instance._rollup_values = METRICS[SAVED_METRICS[sender._meta.label]].values_of(instance)
+
+
+def count_deleted(sender, instance, **kwargs):
+    values = instance.__dict__.pop('_rollup_values', None)
+    if values is not None:
+        name = SAVED_METRICS[sender._meta.label]
+        record(name, [(getattr(instance, METRICS[name].time_field), values, -1)])
+
+
+for label in SAVED_METRICS:
+    model = apps.get_model(label)
+    pre_save.connect(capture_old_values, sender=model, dispatch_uid=f'rollups-pre-save-{label}')
+    post_save.connect(count_saved, sender=model, dispatch_uid=f'rollups-save-{label}')
+    pre_delete.connect(capture_deleted_values, sender=model, dispatch_uid=f'rollups-pre-delete-{label}')
+    post_delete.connect(count_deleted, sender=model, dispatch_uid=f'rollups-delete-{label}')
+
+
+@receiver(counters_flushed)
+def count_flushed(sender, field, deltas, **kwargs):
+    for name, metric in METRICS.items():
+        if metric.counter_field == field and metric.label == sender._meta.label:
+            now = timezone.now()
+            rows = sender._default_manager.filter(pk__in=deltas).values('pk', *metric.dimensions.values())
+            record(name, [(now, metric.row_values(row), deltas[row['pk']]) for row in rows])
@@ -0,0 +1,166 @@
+"""
+Time series for the situation-room dashboards
+
+A series is the count of a rollup metric per hour, day, week or month
+over a time range, split by group-by dimensions and zero-filled. Counts
+come from the rollup counters (months are summed from days), or, when
+ROLLUPS['SIGNALS'] is off and the counters may lag, from a single
+GROUP BY date_trunc over the source table.
+
+Ranges that would need more than MAX_POINTS buckets are downsampled to
+the next coarser granularity. Results are cached on the normalized
+parameters: ranges reaching into the current, still-filling bucket for
+LIVE_CACHE_TIMEOUT seconds, closed ranges for CACHE_TIMEOUT.
+"""
+import hashlib
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from . import rollups
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+APPROX_SECONDS = {'hour': 3600, 'day': 86400, 'week': 7 * 86400, 'month': 30 * 86400}
+DEFAULT_SPAN = {
+    'hour': timedelta(hours=48),
+    'day': timedelta(days=30),
+    'week': timedelta(weeks=26),
+    'month': timedelta(days=365),
+}
+
+DEFAULTS = {
+    'CACHE_TIMEOUT': 10 * 60,
+    'LIVE_CACHE_TIMEOUT': 5,
+    'MAX_POINTS': 500,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'ANALYTICS_SERIES', {})}
+
+
+def next_bucket(bucket, granularity):
+    if granularity == 'hour':
+        return bucket + timedelta(hours=1)
+    day = timezone.localtime(bucket).date()
+    if granularity == 'day':
+        day += timedelta(days=1)
+    elif granularity == 'week':
+        day += timedelta(weeks=1)
+    else:
+        day = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def downsample(granularity, start, end, max_points):
+    """`granularity`, or the first coarser one giving at most max_points buckets"""
+    seconds = (end - start).total_seconds()
+    for candidate in GRANULARITIES[GRANULARITIES.index(granularity):]:
+        if seconds / APPROX_SECONDS[candidate] <= max_points:
+            return candidate
+    return GRANULARITIES[-1]
+
+
+def _rollup_rows(name, granularity, start, end, group_by, filters):
+    stored = granularity if granularity in rollups.GRANULARITIES else 'day'
+    return rollups.query(name, stored, start, end, group_by=group_by, filters=filters)
+
+
+def _table_rows(metric, granularity, start, end, group_by, filters):
+    """The same rows as rollups.query, from one GROUP BY date_trunc over the source table"""
+    time_field = metric.time_field
+    paths = [metric.dimensions[dim] for dim in group_by]
+    rows = (
+        metric.model._default_manager
+        .filter(**{f'{time_field}__gte': start, f'{time_field}__lt': end})
+        .filter(**{metric.dimensions[dim]: value for dim, value in filters.items()})
+        .annotate(series_bucket=Trunc(time_field, granularity)).order_by()
+        .values('series_bucket', *paths)
+        .annotate(series_count=Count('pk'))
+    )
+    return [
+        {'bucket': row['series_bucket'], **{dim: rollups.clean_value(row[path]) for dim, path in zip(group_by, paths)},
+         'count': row['series_count']}
+        for row in rows
+    ]
+
+
+def series(name, granularity='day', start=None, end=None, group_by=(), filters=None):
+    """Zero-filled counts per bucket for each group_by combination, cached
+
+    Raises KeyError for an unknown metric and ValueError for bad parameters.
+    """
+    metric = rollups.METRICS[name]
+    filters = filters or {}
+    group_by = sorted(set(group_by))
+    unknown = (set(group_by) | set(filters)) - set(metric.dimensions)
+    if unknown:
+        raise ValueError(f"Unknown dimension for {name}: {', '.join(sorted(unknown))}")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Granularity must be one of {", ".join(GRANULARITIES)}')
+
+    config = get_config()
+    now = timezone.now()
+    end = end or now
+    start = start or end - DEFAULT_SPAN[granularity]
+    if start >= end:
+        raise ValueError('start must be before end')
+    granularity = downsample(granularity, start, end, config['MAX_POINTS'])
+    start = rollups.bucket_start(start, granularity)
+    if rollups.bucket_start(end, granularity) != end:
+        end = next_bucket(rollups.bucket_start(end, granularity), granularity)
+
+    normalized = {
+        'metric': name,
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'group_by': group_by,
+        'filters': sorted(filters.items()),
+    }
+    key = 'analytics:series:' + hashlib.blake2b(
+        json.dumps(normalized, sort_keys=True).encode(), digest_size=16
+    ).hexdigest()
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    from_rollups = metric.time_field is None or rollups.get_config()['SIGNALS']
+    if from_rollups:
+        rows = _rollup_rows(name, granularity, start, end, group_by, filters)
+    else:
+        rows = _table_rows(metric, granularity, start, end, group_by, filters)
+
+    buckets = []
+    bucket = start
+    while bucket < end:
+        buckets.append(bucket)
+        bucket = next_bucket(bucket, granularity)
+    index = {bucket: i for i, bucket in enumerate(buckets)}
+    groups = {}
+    for row in rows:
+        counts = groups.setdefault(tuple(row[dim] for dim in group_by), [0] * len(buckets))
+        counts[index[rollups.bucket_start(row['bucket'], granularity)]] += row['count']
+
+    result = {
+        'metric': name,
+        'granularity': granularity,
+        'start': start,
+        'end': end,
+        'group_by': group_by,
+        'filters': filters,
+        'source': 'rollups' if from_rollups else 'table',
+        'buckets': buckets,
+        'series': [
+            {**dict(zip(group_by, group)), 'total': sum(counts), 'counts': counts}
+            for group, counts in sorted(groups.items(), key=lambda item: (-sum(item[1]), item[0]))
+        ],
+    }
+    live = end > now
+    cache.set(key, result, config['LIVE_CACHE_TIMEOUT'] if live else config['CACHE_TIMEOUT'])
+    return result
@@ -5,13 +5,22 @@ from rest_framework.permissions import IsAdminUser
 from .models import ForumTopic, ForumPost, ForumLike, Meeting
 from .serializers import (ForumTopicSerializer, ForumTopicDetailSerializer, 
                           ForumPostSerializer, MeetingSerializer)
-from django.db.models import Q, Count, F
+from django.db.models import Q, F
+from peacelink.analytics import counters
+from peacelink.pagination import SearchResultsPagination
+from .search import search_topics
 
 class ForumTopicListCreate(generics.ListCreateAPIView):
     serializer_class = ForumTopicSerializer
     
+    @property
+    def pagination_class(self):
+        if self.request.query_params.get('search'):
+            return SearchResultsPagination
+        return super().pagination_class
+    
     def get_queryset(self):
-        queryset = ForumTopic.objects.all()
+        queryset = ForumTopic.objects.with_activity()
         topic_type = self.request.query_params.get('type', None)
         category = self.request.query_params.get('category', None)
         search = self.request.query_params.get('search', None)
@@ -21,36 +30,42 @@ class ForumTopicListCreate(generics.ListCreateAPIView):
         if category:
             queryset = queryset.filter(category=category)
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(posts__content__icontains=search)
-            ).distinct()
+            queryset = search_topics(queryset, search)
         
         return queryset
 
 class ForumTopicDetail(generics.RetrieveUpdateDestroyAPIView):
-    queryset = ForumTopic.objects.all()
+    queryset = ForumTopic.objects.with_activity()
     serializer_class = ForumTopicDetailSerializer
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        # Increment view count
-        instance.view_count += 1
-        instance.save(update_fields=['view_count'])
+        counters.increment(instance, 'view_count')
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
 class ForumPostListCreate(generics.ListCreateAPIView):
     serializer_class = ForumPostSerializer
+    cursor_ordering = ('created_at', 'id')  # Threads read oldest first
     
     def get_queryset(self):
+        queryset = ForumPost.objects.with_replies(self.request.user)
         topic_id = self.request.query_params.get('topic', None)
         if topic_id:
-            return ForumPost.objects.filter(topic_id=topic_id, parent=None)
-        return ForumPost.objects.all()
+            return queryset.filter(topic_id=topic_id, parent=None)
+        return queryset
 
 class ForumPostRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
-    queryset = ForumPost.objects.all()
     serializer_class = ForumPostSerializer
+    
+    def get_queryset(self):
+        return ForumPost.objects.with_replies(self.request.user)
+    
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        counters.increment(instance, 'view_count')
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
 
 @api_view(['POST'])
 def like_post(request, post_id):
@@ -73,9 +88,7 @@ def like_post(request, post_id):
 def highlighted_posts(request):
     """Get most engaged posts based on likes, replies, and views"""
     # Calculate engagement score: (likes * 2) + replies + (views / 10)
-    posts = ForumPost.objects.annotate(
-        like_count=Count('likes'),
-        reply_count=Count('replies'),
+    posts = ForumPost.objects.with_replies(request.user).annotate(
         engagement_score=F('like_count') * 2 + F('reply_count') + F('view_count') / 10
     ).filter(
         parent=None,  # Only top-level posts
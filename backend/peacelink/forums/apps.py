@@ -1,3 +1,6 @@
 from django.apps import AppConfig
 class ForumsConfig(AppConfig):
     name = 'peacelink.forums'
+
+    def ready(self):
+        from . import search  # noqa: F401 - connects the search vector signals
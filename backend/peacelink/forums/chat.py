@@ -1,9 +1,92 @@
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from django.utils import timezone
+from community.models import Conversation, Message
+import asyncio
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per socket before a slow client is disconnected
+SEND_QUEUE_SIZE = getattr(settings, 'CHAT_SEND_QUEUE_SIZE', 100)
+
+
+class MessageWriter:
+    """Buffers chat messages and persists them with one bulk_create per batch
+
+    add() returns a future that resolves to the saved message once its batch
+    is written, so consumers only broadcast stored messages. A failed write is
+    retried `attempts` times; after that the futures raise and the senders
+    are told their messages were not saved.
+    """
+
+    def __init__(self, batch_size=50, interval=0.05, attempts=3, retry_delay=0.2):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.buffer = []  # (message, future)
+        self.timer = None
+
+    def add(self, message):
+        loop = asyncio.get_running_loop()
+        saved = loop.create_future()
+        self.buffer.append((message, saved))
+        if len(self.buffer) >= self.batch_size:
+            asyncio.ensure_future(self.flush())
+        elif self.timer is None:
+            self.timer = loop.call_later(self.interval, lambda: asyncio.ensure_future(self.flush()))
+        return saved
+
+    async def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.buffer = self.buffer, []
+        if not batch:
+            return
+        messages = [message for message, _ in batch]
+        for attempt in range(1, self.attempts + 1):
+            try:
+                await database_sync_to_async(self.write)(messages)
+                break
+            except Exception as exc:
+                if attempt == self.attempts:
+                    logger.exception('Failed to persist %d chat messages', len(batch))
+                    for _, saved in batch:
+                        if not saved.done():
+                            saved.set_exception(exc)
+                    return
+                logger.warning('Persisting %d chat messages failed, retrying', len(batch))
+                await asyncio.sleep(self.retry_delay * attempt)
+        for message, saved in batch:
+            if not saved.done():
+                saved.set_result(message)
+
+    @staticmethod
+    def write(batch):
+        Message.objects.bulk_create(batch)
+        Conversation.objects.filter(id__in={m.conversation_id for m in batch}).update(updated_at=timezone.now())
+
+
+writer = MessageWriter()
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
+    """Chat for one Conversation; only its participants may join"""
+
     async def connect(self):
-        self.room_group_name = 'global_chat'
+        user = self.scope.get('user')
+        self.conversation_id = self.scope['url_route']['kwargs']['conversation_id']
+        if user is None or not user.is_authenticated or not await self.is_participant(user):
+            await self.close(code=4403)
+            return
+        self.user = user
+        self.room_group_name = f'chat_{self.conversation_id}'
+        self.queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.sender = asyncio.ensure_future(self.drain_queue())
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
@@ -11,24 +94,63 @@ class ChatConsumer(AsyncWebsocketConsumer):
         await self.accept()
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+        if hasattr(self, 'sender'):
+            self.sender.cancel()
+        if hasattr(self, 'room_group_name'):
+            await self.channel_layer.group_discard(
+                self.room_group_name,
+                self.channel_name
+            )
+        await writer.flush()
 
-    async def receive(self, text_data):
-        data = json.loads(text_data)
+    @database_sync_to_async
+    def is_participant(self, user):
+        return Conversation.objects.filter(id=self.conversation_id, participants=user).exists()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            content = str(json.loads(text_data)['message']).strip()
+        except (TypeError, ValueError, KeyError):
+            return
+        if not content:
+            return
+        try:
+            message = await writer.add(Message(conversation_id=self.conversation_id, sender_id=self.user.id,
+                                               content=content, created_at=timezone.now()))
+        except Exception:
+            await self.send(text_data=json.dumps({'error': 'Message could not be saved, please resend',
+                                                  'message': content}))
+            return
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 'type': 'chat_message',
-                'message': data['message'],
-                'user': data.get('user', 'anonymous')
+                'id': message.id,
+                'message': content,
+                'user': self.user.username,
+                'user_id': self.user.id,
+                'created_at': message.created_at.isoformat(),
             }
         )
 
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps({
-            'message': event['message'],
-            'user': event['user']
-        }))
+        # Never await a slow socket here: queue the event, drop the client if it can't keep up
+        if self.sender.done():
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.info('Dropping slow chat client %s', self.channel_name)
+            self.sender.cancel()
+            await self.close(code=4008)
+
+    async def drain_queue(self):
+        while True:
+            event = await self.queue.get()
+            await self.send(text_data=json.dumps({
+                'id': event['id'],
+                'message': event['message'],
+                'user': event['user'],
+                'user_id': event['user_id'],
+                'created_at': event['created_at'],
+            }))
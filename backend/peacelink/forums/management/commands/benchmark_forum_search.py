@@ -0,0 +1,110 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from rest_framework.test import APIRequestFactory
+
+from peacelink.forums.api_views import ForumTopicListCreate
+from peacelink.forums.models import ForumTopic
+from peacelink.users.models import User
+
+# Seeded post text is drawn from these, so every term below has a known frequency
+WORDS = [
+    'water', 'borehole', 'cattle', 'market', 'school', 'clinic', 'road', 'flood',
+    'harvest', 'meeting', 'chief', 'youth', 'women', 'peace', 'court', 'land',
+    'grazing', 'church', 'radio', 'teacher', 'fuel', 'bridge', 'rain', 'border',
+]
+POSTS_PER_TOPIC = 20
+SEARCHES = ['borehole', 'cattle grazing', '"peace meeting"', 'floods bridges', 'nothingmatches']
+
+
+class IcontainsTopicList(ForumTopicListCreate):
+    """The topic list as it searched before full-text search"""
+
+    def get_queryset(self):
+        search = self.request.query_params['search']
+        return ForumTopic.objects.with_activity().filter(
+            Q(title__icontains=search) | Q(posts__content__icontains=search)
+        ).distinct()
+
+
+class Command(BaseCommand):
+    help = 'Measure forum search latency as posts grow, full-text search against icontains'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000', help='Comma-separated post counts')
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests per search')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Full-text search and the synthetic posts are PostgreSQL only')
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        self.factory = APIRequestFactory()
+        views = [('fts', ForumTopicListCreate.as_view()), ('icontains', IcontainsTopicList.as_view())]
+        self.stdout.write(f"{'posts':>9} {'search':<18} {'fts p50':>10} {'fts p99':>10} "
+                          f"{'icont p50':>10} {'icont p99':>10}  (ms)")
+        with transaction.atomic():
+            author = User.objects.get_or_create(username='benchmark-forum-search')[0]
+            seeded = 0
+            for size in sizes:
+                self.seed(author, seeded, size)
+                seeded = size
+                for search in SEARCHES:
+                    timings = [self.measure(view, search, options['requests']) for _, view in views]
+                    self.stdout.write(f'{size:>9} {search:<18} ' + ' '.join(
+                        f'{value:>10}' for timing in timings for value in timing
+                    ))
+            transaction.set_rollback(True)
+
+    def seed(self, author, start, end):
+        """Posts `start` + 1 to `end`, POSTS_PER_TOPIC to a topic, one in five in Arabic or Dinka"""
+        words = '(ARRAY[' + ', '.join(f"'{word}'" for word in WORDS) + '])'
+        word = f'{words}[1 + mod(%s, {len(WORDS)})]'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO forums_forumtopic (title, category, topic_type, author_id, created_at, updated_at, "
+                "is_pinned, is_locked, view_count, is_live, meeting_link) "
+                f"SELECT 'Benchmark topic ' || t || ' about ' || {word % 't'}, 'general', 'community', %s, "
+                "now() - t * interval '1 hour', now(), false, false, 0, false, '' "
+                "FROM generate_series(%s, %s) AS t",
+                [author.id, start // POSTS_PER_TOPIC + 1, end // POSTS_PER_TOPIC],
+            )
+            cursor.execute(
+                "INSERT INTO forums_forumpost (topic_id, user_id, content, created_at, updated_at, trusted, "
+                "approved, language, view_count, is_highlighted) "
+                "WITH topics AS (SELECT array_agg(id ORDER BY id) AS ids FROM forums_forumtopic WHERE author_id = %s) "
+                "SELECT topics.ids[(p - 1) / %s + 1], %s, "
+                f"{word % 'p'} || ' ' || {word % '(p * 7 + 3)'} || ' ' || {word % '(p / 5)'} || "
+                "' reported near the ' || "
+                f"{word % '(p * 13)'} || ' after the ' || {word % '(p / 3)'}, "
+                "now() - p * interval '3 minutes', now(), false, true, "
+                "(ARRAY['en', 'en', 'en', 'ar', 'din'])[1 + mod(p, 5)], 0, false "
+                "FROM topics, generate_series(%s, %s) AS p",
+                [author.id, POSTS_PER_TOPIC, author.id, start + 1, end],
+            )
+            # Same expressions as the 0004_search_vector backfill
+            cursor.execute(
+                "UPDATE forums_forumtopic SET search_vector = to_tsvector('english', coalesce(title, '')) "
+                "WHERE search_vector IS NULL"
+            )
+            cursor.execute(
+                "UPDATE forums_forumpost SET search_vector = to_tsvector("
+                "(CASE language WHEN 'en' THEN 'english' WHEN 'ar' THEN 'arabic' ELSE 'simple' END)::regconfig, "
+                "coalesce(content, '')) WHERE search_vector IS NULL"
+            )
+            cursor.execute('ANALYZE forums_forumtopic')
+            cursor.execute('ANALYZE forums_forumpost')
+
+    def measure(self, view, search, requests):
+        def get():
+            view(self.factory.get('/api/forums/topics/', {'search': search})).render()
+
+        get()  # Warm up
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            get()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return f'{timings[len(timings) // 2]:.1f}', f'{timings[min(len(timings) - 1, int(len(timings) * 0.99))]:.1f}'
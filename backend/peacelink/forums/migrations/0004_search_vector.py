@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:25
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def build_search_index(apps, schema_editor):
+    # GIN indexes and backfill only exist on PostgreSQL; other backends use icontains
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX forums_topic_search_gin ON forums_forumtopic USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX forums_post_search_gin ON forums_forumpost USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        "UPDATE forums_forumtopic SET search_vector = to_tsvector('english', coalesce(title, ''))"
+    )
+    schema_editor.execute(
+        "UPDATE forums_forumpost SET search_vector = to_tsvector("
+        "(CASE language WHEN 'en' THEN 'english' WHEN 'ar' THEN 'arabic' ELSE 'simple' END)::regconfig, "
+        "coalesce(content, ''))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS forums_topic_search_gin')
+    schema_editor.execute('DROP INDEX IF EXISTS forums_post_search_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0003_alter_forumpost_options_forumpost_attachment_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumpost',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='forumtopic',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
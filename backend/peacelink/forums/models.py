@@ -1,6 +1,55 @@
+from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from peacelink.users.models import User
 
+REPLIES_PER_POST = 5  # Replies nested under each top-level post
+
+
+def _count_subquery(queryset, field):
+    """Correlated COUNT(*) grouped on `field`, 0 when there are no rows"""
+    counts = queryset.order_by().values(field).annotate(c=Count('*')).values('c')
+    return Coalesce(Subquery(counts), 0)
+
+
+class ForumTopicQuerySet(models.QuerySet):
+    def with_activity(self):
+        """Annotate the counts and latest post read by ForumTopicSerializer"""
+        latest = ForumPost.objects.filter(topic=OuterRef('pk')).order_by('-created_at')
+        return self.select_related('author').annotate(
+            post_count=_count_subquery(ForumPost.objects.filter(topic=OuterRef('pk')), 'topic'),
+            participant_count=Coalesce(Subquery(
+                ForumPost.objects.filter(topic=OuterRef('pk')).order_by().values('topic')
+                .annotate(c=Count('user', distinct=True)).values('c')
+            ), 0),
+            latest_post_user=Subquery(latest.values('user__username')[:1]),
+            latest_post_at=Subquery(latest.values('created_at')[:1]),
+        )
+
+
+class ForumPostQuerySet(models.QuerySet):
+    def with_engagement(self, user=None):
+        """Annotate reply/like counts and is_liked for `user`, prefetch audio derivatives"""
+        if user is not None and user.is_authenticated:
+            is_liked = Exists(ForumLike.objects.filter(post=OuterRef('pk'), user=user))
+        else:
+            is_liked = Value(False)
+        return self.select_related('user').prefetch_related('derivatives').annotate(
+            reply_count=_count_subquery(ForumPost.objects.filter(parent=OuterRef('pk')), 'parent'),
+            like_count=_count_subquery(ForumLike.objects.filter(post=OuterRef('pk')), 'post'),
+            is_liked=is_liked,
+        )
+
+    def with_replies(self, user=None):
+        """Engagement annotations plus the first replies of each post in one extra query"""
+        replies = ForumPost.objects.with_engagement(user).order_by('created_at')
+        return self.with_engagement(user).prefetch_related(
+            models.Prefetch('replies', queryset=replies[:REPLIES_PER_POST], to_attr='recent_replies')
+        )
+
+
 class ForumTopic(models.Model):
     CATEGORY_CHOICES = [
         ('conflict_resolution', 'Conflict Resolution'),
@@ -30,6 +79,9 @@ class ForumTopic(models.Model):
     is_pinned = models.BooleanField(default=False)
     is_locked = models.BooleanField(default=False)
     view_count = models.IntegerField(default=0)
+    search_vector = SearchVectorField(null=True, editable=False)  # GIN-indexed on PostgreSQL, see search.py
+    
+    objects = ForumTopicQuerySet.as_manager()
     
     # Formal dialogue specific fields
     scheduled_date = models.DateTimeField(null=True, blank=True)
@@ -53,6 +105,7 @@ class ForumPost(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='forum_posts')
     content = models.TextField(blank=True)  # Optional if audio is provided
     audio_recording = models.FileField(upload_to='forum_audio/', null=True, blank=True)
+    derivatives = GenericRelation('media.MediaDerivative')  # Transcoded audio, see peacelink.media
     attachment = models.FileField(upload_to='forum_attachments/', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -62,6 +115,9 @@ class ForumPost(models.Model):
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='replies')
     view_count = models.IntegerField(default=0)
     is_highlighted = models.BooleanField(default=False)  # For featured/engaged posts
+    search_vector = SearchVectorField(null=True, editable=False)  # GIN-indexed on PostgreSQL, see search.py
+    
+    objects = ForumPostQuerySet.as_manager()
     
     class Meta:
         ordering = ['created_at']
@@ -0,0 +1,95 @@
+"""
+Full-text search over forum topics and posts
+
+On PostgreSQL, ForumTopic.title and ForumPost.content are indexed in
+tsvector columns with GIN indexes, refreshed whenever the text is saved.
+Posts are parsed with the text search configuration of their language and
+searched with one constant query, the union of the query parsed with every
+configuration, so the planner can use the GIN index rather than re-parsing
+the query per row.
+Other databases (SQLite in tests) fall back to icontains matching.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import ForumPost, ForumTopic
+
+# PostgreSQL text search configurations by ForumPost.language
+LANGUAGE_CONFIGS = {
+    'en': 'english',
+    'ar': 'arabic',
+}
+DEFAULT_CONFIG = 'simple'  # No stemmer for Dinka, Nuer, Bari, ...
+TOPIC_CONFIG = 'english'
+
+
+def is_supported():
+    return connection.vendor == 'postgresql'
+
+
+def post_config():
+    """The text search configuration for each post row, from its language"""
+    return Case(
+        *[When(language=code, then=Value(config)) for code, config in LANGUAGE_CONFIGS.items()],
+        default=Value(DEFAULT_CONFIG),
+    )
+
+
+def post_query(text):
+    """`text` parsed with every post configuration, OR-ed into one tsquery"""
+    configs = sorted({*LANGUAGE_CONFIGS.values(), DEFAULT_CONFIG})
+    query = SearchQuery(text, config=configs[0], search_type='websearch')
+    for config in configs[1:]:
+        query |= SearchQuery(text, config=config, search_type='websearch')
+    return query
+
+
+def topic_vector():
+    return SearchVector('title', config=TOPIC_CONFIG)
+
+
+def post_vector():
+    return SearchVector('content', config=post_config())
+
+
+def search_topics(queryset, text):
+    """Topics whose title or posts match `text`, best matches first"""
+    if not is_supported():
+        return queryset.filter(
+            Q(title__icontains=text) | Q(posts__content__icontains=text)
+        ).distinct()
+
+    topic_query = SearchQuery(text, config=TOPIC_CONFIG, search_type='websearch')
+    posts_query = post_query(text)
+    matching_posts = ForumPost.objects.filter(search_vector=posts_query)
+    best_post_rank = Subquery(
+        matching_posts.filter(topic=OuterRef('pk'))
+        .annotate(rank=SearchRank(F('search_vector'), posts_query))
+        .order_by('-rank').values('rank')[:1],
+        output_field=FloatField(),
+    )
+    # Uncorrelated IN so the post side is one bitmap scan of the GIN index
+    return queryset.filter(
+        Q(search_vector=topic_query) | Q(pk__in=matching_posts.values('topic'))
+    ).annotate(
+        search_rank=Greatest(
+            Coalesce(SearchRank(F('search_vector'), topic_query), Value(0.0)),
+            Coalesce(best_post_rank, Value(0.0)),
+        )
+    ).order_by('-search_rank', '-created_at')
+
+
+@receiver(post_save, sender=ForumTopic)
+def update_topic_vector(sender, instance, update_fields=None, **kwargs):
+    if is_supported() and (update_fields is None or 'title' in update_fields):
+        ForumTopic.objects.filter(pk=instance.pk).update(search_vector=topic_vector())
+
+
+@receiver(post_save, sender=ForumPost)
+def update_post_vector(sender, instance, update_fields=None, **kwargs):
+    if is_supported() and (update_fields is None or {'content', 'language'} & set(update_fields)):
+        ForumPost.objects.filter(pk=instance.pk).update(search_vector=post_vector())
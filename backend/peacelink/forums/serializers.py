@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import ForumTopic, ForumPost, ForumLike, Meeting
+from .models import ForumTopic, ForumPost, ForumLike, Meeting, REPLIES_PER_POST
+from peacelink.media.serializers import DerivativesField
 from peacelink.users.models import User
 
 class UserBasicSerializer(serializers.ModelSerializer):
@@ -13,22 +14,34 @@ class ForumPostSerializer(serializers.ModelSerializer):
     like_count = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
     replies = serializers.SerializerMethodField()
+    derivatives = DerivativesField()
     
+    # Counts come from ForumPostQuerySet.with_engagement() when the view
+    # annotated them; the per-object queries are only a fallback.
     def get_reply_count(self, obj):
+        if hasattr(obj, 'reply_count'):
+            return obj.reply_count
         return obj.replies.count()
     
     def get_like_count(self, obj):
+        if hasattr(obj, 'like_count'):
+            return obj.like_count
         return obj.likes.count()
     
     def get_is_liked(self, obj):
+        if hasattr(obj, 'is_liked'):
+            return obj.is_liked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(user=request.user).exists()
         return False
     
     def get_replies(self, obj):
-        if obj.parent is None:  # Only get replies for top-level posts
-            replies = obj.replies.all()[:5]  # Limit to 5 most recent
+        if obj.parent_id is None:  # Only get replies for top-level posts
+            if hasattr(obj, 'recent_replies'):
+                replies = obj.recent_replies
+            else:
+                replies = obj.replies.all()[:REPLIES_PER_POST]
             return ForumPostSerializer(replies, many=True, context=self.context).data
         return []
     
@@ -37,7 +50,7 @@ class ForumPostSerializer(serializers.ModelSerializer):
         fields = ['id', 'topic', 'user', 'user_info', 'content', 'audio_recording', 
                   'attachment', 'created_at', 'updated_at', 'trusted', 'approved', 
                   'language', 'parent', 'view_count', 'is_highlighted',
-                  'reply_count', 'like_count', 'is_liked', 'replies']
+                  'reply_count', 'like_count', 'is_liked', 'replies', 'derivatives']
         read_only_fields = ['user', 'created_at', 'updated_at', 'view_count']
     
     def create(self, validated_data):
@@ -50,10 +63,20 @@ class ForumTopicSerializer(serializers.ModelSerializer):
     latest_post = serializers.SerializerMethodField()
     participant_count = serializers.SerializerMethodField()
     
+    # Read from ForumTopicQuerySet.with_activity() annotations when present
     def get_post_count(self, obj):
+        if hasattr(obj, 'post_count'):
+            return obj.post_count
         return obj.posts.count()
     
     def get_latest_post(self, obj):
+        if hasattr(obj, 'latest_post_at'):
+            if obj.latest_post_at is None:
+                return None
+            return {
+                'user': obj.latest_post_user,
+                'created_at': obj.latest_post_at
+            }
         latest = obj.posts.order_by('-created_at').first()
         if latest:
             return {
@@ -63,6 +86,8 @@ class ForumTopicSerializer(serializers.ModelSerializer):
         return None
     
     def get_participant_count(self, obj):
+        if hasattr(obj, 'participant_count'):
+            return obj.participant_count
         return obj.posts.values('user').distinct().count()
     
     class Meta:
@@ -82,7 +107,9 @@ class ForumTopicDetailSerializer(ForumTopicSerializer):
     
     def get_posts(self, obj):
         # Get only top-level posts (parent=None), replies are nested in ForumPostSerializer
-        posts = obj.posts.filter(parent=None).order_by('created_at')
+        request = self.context.get('request')
+        user = request.user if request else None
+        posts = obj.posts.filter(parent=None).with_replies(user).order_by('created_at')
         return ForumPostSerializer(posts, many=True, context=self.context).data
     
     class Meta(ForumTopicSerializer.Meta):
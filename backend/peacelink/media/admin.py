@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import MediaDerivative, MediaJob
+
+@admin.register(MediaJob)
+class MediaJobAdmin(admin.ModelAdmin):
+    list_display = ['source_name', 'kind', 'status', 'attempts', 'next_attempt_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['created_at', 'finished_at']
+
+@admin.register(MediaDerivative)
+class MediaDerivativeAdmin(admin.ModelAdmin):
+    list_display = ['field_name', 'object_id', 'kind', 'variant', 'size_bytes', 'created_at']
+    list_filter = ['kind', 'variant']
@@ -0,0 +1,6 @@
+from django.apps import AppConfig
+class MediaConfig(AppConfig):
+    name = 'peacelink.media'
+
+    def ready(self):
+        from . import jobs  # noqa: F401 - connects the upload signals that queue processing
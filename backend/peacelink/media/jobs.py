@@ -0,0 +1,192 @@
+"""
+Media processing outbox
+
+Saving an upload only queues a MediaJob. The `process_media` worker
+claims due jobs, copies each original to a scratch directory, runs the
+ffmpeg recipes in peacelink.media.processing on a thread pool and stores
+the results as MediaDerivative rows, replacing earlier derivatives of
+the same field. Failures are retried with exponential backoff.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import MediaDerivative, MediaJob
+from .processing import ProcessingError, process
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 60 * 60
+LEASE = timedelta(minutes=30)  # Claimed rows become due again if a worker dies
+
+# model label -> {field name: kind, or a callable taking the instance}
+SOURCES = {
+    'reports.Report': {'audio_recording': 'audio'},
+    'reports.ReportMedia': {'file': lambda media: media.file_type},
+    'forums.ForumPost': {'audio_recording': 'audio'},
+    'community.Message': {'audio_message': 'audio'},
+}
+
+
+def get_max_attempts():
+    return getattr(settings, 'MEDIA_PROCESSING_MAX_ATTEMPTS', 5)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def enqueue(instance, field_name, kind):
+    """Queue processing of an upload unless this exact file is already queued"""
+    field_file = getattr(instance, field_name)
+    if not field_file or kind not in ('audio', 'image', 'video'):
+        return None
+    content_type = ContentType.objects.get_for_model(instance)
+    job, _ = MediaJob.objects.get_or_create(
+        content_type=content_type,
+        object_id=instance.pk,
+        field_name=field_name,
+        source_name=field_file.name,
+        defaults={'kind': kind},
+    )
+    return job
+
+
+def queue_upload(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for field_name, kind in SOURCES[sender._meta.label].items():
+        if callable(kind):
+            kind = kind(instance)
+        enqueue(instance, field_name, kind)
+
+
+for label in SOURCES:
+    post_save.connect(queue_upload, sender=apps.get_model(label), dispatch_uid=f'media-{label}')
+
+
+def store_derivatives(job, specs):
+    """Save derivative files and swap them in for the field's previous derivatives"""
+    # Stored under MediaDerivative.file's upload_to, e.g. derivatives/reports_reportmedia/12/
+    prefix = f'{job.content_type.app_label}_{job.content_type.model}/{job.object_id}'
+    derivatives = []
+    for spec in specs:
+        derivative = MediaDerivative(
+            content_type_id=job.content_type_id,
+            object_id=job.object_id,
+            field_name=job.field_name,
+            kind=spec['kind'],
+            variant=spec['variant'],
+            width=spec.get('width'),
+            bitrate=spec.get('bitrate'),
+            size_bytes=spec['size_bytes'],
+        )
+        with open(spec['path'], 'rb') as output:
+            name = f"{prefix}/{job.field_name}-{os.path.basename(spec['path'])}"
+            derivative.file.save(name, File(output), save=False)
+        derivatives.append(derivative)
+    with transaction.atomic():
+        MediaDerivative.objects.filter(
+            content_type_id=job.content_type_id, object_id=job.object_id, field_name=job.field_name
+        ).delete()
+        MediaDerivative.objects.bulk_create(derivatives)
+    return derivatives
+
+
+@receiver(post_delete, sender=MediaDerivative)
+def delete_derivative_file(sender, instance, **kwargs):
+    # Also runs when the source row is deleted, through its GenericRelation
+    transaction.on_commit(lambda: instance.file.delete(save=False))
+
+
+class MediaWorker:
+    def __init__(self, concurrency=2, batch_size=10):
+        self.batch_size = batch_size
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='media')
+
+    def claim(self):
+        """Lease a batch of due jobs so other workers skip them"""
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                MediaJob.objects.select_for_update(skip_locked=True)
+                .filter(status='pending', next_attempt_at__lte=now)
+                .order_by('next_attempt_at')
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            MediaJob.objects.filter(id__in=ids).update(next_attempt_at=now + LEASE)
+        return list(MediaJob.objects.filter(id__in=ids).select_related('content_type'))
+
+    def run_job(self, job):
+        """Process one job on a pool thread, returns an error message or None"""
+        try:
+            source = job.source
+            if source is None or getattr(source, job.field_name).name != job.source_name:
+                return None  # Deleted or replaced since; nothing left to process
+            field_file = getattr(source, job.field_name)
+            scratch = tempfile.mkdtemp(prefix='media-')
+            try:
+                local = os.path.join(scratch, 'source' + os.path.splitext(field_file.name)[1])
+                with field_file.open('rb') as original, open(local, 'wb') as copy:
+                    shutil.copyfileobj(original, copy)
+                specs = process(job.kind, local, scratch)
+                store_derivatives(job, specs)
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+        except ProcessingError as exc:
+            logger.warning('Media job %s failed: %s', job.id, exc)
+            return str(exc)
+        except Exception as exc:
+            logger.exception('Media job %s failed', job.id)
+            return str(exc) or exc.__class__.__name__
+        return None
+
+    def record(self, jobs, errors):
+        now = timezone.now()
+        max_attempts = get_max_attempts()
+        for job, error in zip(jobs, errors):
+            attempts = job.attempts + 1
+            if error is None:
+                MediaJob.objects.filter(id=job.id).update(
+                    status='done', attempts=attempts, last_error='', finished_at=now
+                )
+            else:
+                MediaJob.objects.filter(id=job.id).update(
+                    attempts=attempts,
+                    last_error=error,
+                    status='failed' if attempts >= max_attempts else 'pending',
+                    next_attempt_at=now + retry_delay(attempts),
+                )
+
+    def run_once(self):
+        """Process one batch, returns the number of jobs attempted"""
+        jobs = self.claim()
+        if jobs:
+            errors = list(self.pool.map(self.run_job, jobs))
+            self.record(jobs, errors)
+        return len(jobs)
+
+    def run(self, poll_interval=5, once=False):
+        try:
+            while True:
+                handled = self.run_once()
+                if once and not handled:
+                    return
+                if not handled:
+                    time.sleep(poll_interval)
+        finally:
+            self.pool.shutdown()
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from peacelink.media.jobs import MediaWorker
+
+
+class Command(BaseCommand):
+    help = 'Transcode queued uploads into low-bandwidth derivatives with ffmpeg'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help='ffmpeg processes run in parallel')
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs claimed per batch')
+        parser.add_argument('--poll-interval', type=float, default=5, help='Seconds to sleep when idle')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        worker = MediaWorker(concurrency=options['concurrency'], batch_size=options['batch_size'])
+        worker.run(poll_interval=options['poll_interval'], once=options['once'])
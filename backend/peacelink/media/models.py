@@ -0,0 +1,75 @@
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils import timezone
+
+
+class MediaJob(models.Model):
+    """Outbox of uploads to transcode, drained by `manage.py process_media`"""
+    KIND_CHOICES = [
+        ('audio', 'Audio'),
+        ('image', 'Image'),
+        ('video', 'Video'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    # The uploaded file is getattr(source, field_name)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    source = GenericForeignKey('content_type', 'object_id')
+    field_name = models.CharField(max_length=50)
+    source_name = models.CharField(max_length=255)  # Storage name of the original when queued
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    
+    # Retry bookkeeping; claimed rows are leased by pushing next_attempt_at forward
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['content_type', 'object_id', 'field_name']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} job for {self.source_name} ({self.status})"
+
+
+class MediaDerivative(models.Model):
+    """A transcoded or downscaled copy of an upload; the original is never modified"""
+    KIND_CHOICES = [
+        ('audio', 'Opus Audio'),
+        ('image', 'WebP Image'),
+        ('poster', 'Video Poster'),
+    ]
+    
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    source = GenericForeignKey('content_type', 'object_id')
+    field_name = models.CharField(max_length=50)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    variant = models.CharField(max_length=20)  # e.g. low/standard, small/medium/large
+    file = models.FileField(upload_to='derivatives/', max_length=255)
+    width = models.IntegerField(null=True, blank=True)  # Upper bound for images and posters
+    bitrate = models.IntegerField(null=True, blank=True)  # kbps for audio
+    size_bytes = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['kind', 'size_bytes']
+        indexes = [
+            models.Index(fields=['content_type', 'object_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind}/{self.variant} of {self.field_name} #{self.object_id}"
@@ -0,0 +1,98 @@
+"""
+ffmpeg recipes for media derivatives
+
+Each function reads one local source file and writes its derivatives
+into an output directory, returning a spec per file written. They touch
+neither the database nor storage, so they can be run against fixture
+files directly. The ffmpeg binary is settings.MEDIA_FFMPEG.
+"""
+import os
+import subprocess
+
+from django.conf import settings
+
+# (variant, kbps) - mono Opus in VoIP mode stays intelligible at 12 kbps on 2G
+AUDIO_VARIANTS = [('low', 12), ('standard', 24)]
+# (variant, max width) - never upscaled
+IMAGE_VARIANTS = [('small', 320), ('medium', 640), ('large', 1280)]
+POSTER_VARIANTS = [('small', 320), ('medium', 640)]
+WEBP_QUALITY = 70
+TIMEOUT = 10 * 60
+
+
+class ProcessingError(Exception):
+    pass
+
+
+def get_ffmpeg():
+    return getattr(settings, 'MEDIA_FFMPEG', 'ffmpeg')
+
+
+def run_ffmpeg(args):
+    command = [get_ffmpeg(), '-hide_banner', '-loglevel', 'error', '-nostdin', '-y', *args]
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=TIMEOUT)
+    except FileNotFoundError:
+        raise ProcessingError(f'{get_ffmpeg()} not found')
+    except subprocess.TimeoutExpired:
+        raise ProcessingError('ffmpeg timed out')
+    if result.returncode != 0:
+        raise ProcessingError(result.stderr.decode(errors='replace').strip()[-2000:] or 'ffmpeg failed')
+
+
+def _spec(path, kind, variant, **extra):
+    if not os.path.exists(path) or not os.path.getsize(path):
+        raise ProcessingError(f'ffmpeg wrote no output for {kind}/{variant}')
+    return {'path': path, 'kind': kind, 'variant': variant, 'size_bytes': os.path.getsize(path), **extra}
+
+
+def _scale(width):
+    return f"scale='min(iw,{width})':-2"
+
+
+def transcode_audio(source, output_dir):
+    specs = []
+    for variant, kbps in AUDIO_VARIANTS:
+        path = os.path.join(output_dir, f'{variant}.opus')
+        run_ffmpeg(['-i', source, '-vn', '-ac', '1', '-c:a', 'libopus', '-b:a', f'{kbps}k',
+                    '-application', 'voip', path])
+        specs.append(_spec(path, 'audio', variant, bitrate=kbps))
+    return specs
+
+
+def downscale_image(source, output_dir):
+    specs = []
+    for variant, width in IMAGE_VARIANTS:
+        path = os.path.join(output_dir, f'{variant}.webp')
+        run_ffmpeg(['-i', source, '-frames:v', '1', '-vf', _scale(width),
+                    '-c:v', 'libwebp', '-quality', str(WEBP_QUALITY), path])
+        specs.append(_spec(path, 'image', variant, width=width))
+    return specs
+
+
+def extract_poster(source, output_dir):
+    specs = []
+    for variant, width in POSTER_VARIANTS:
+        path = os.path.join(output_dir, f'poster-{variant}.webp')
+        args = ['-frames:v', '1', '-vf', _scale(width), '-c:v', 'libwebp', '-quality', str(WEBP_QUALITY), path]
+        # A second in skips black lead-in frames; clips shorter than that use the first frame
+        try:
+            run_ffmpeg(['-ss', '1', '-i', source, *args])
+            spec = _spec(path, 'poster', variant, width=width)
+        except ProcessingError:
+            run_ffmpeg(['-i', source, *args])
+            spec = _spec(path, 'poster', variant, width=width)
+        specs.append(spec)
+    return specs
+
+
+PROCESSORS = {
+    'audio': transcode_audio,
+    'image': downscale_image,
+    'video': extract_poster,
+}
+
+
+def process(kind, source, output_dir):
+    """Write the derivatives of a `kind` upload, returns their specs"""
+    return PROCESSORS[kind](source, output_dir)
@@ -0,0 +1,65 @@
+from rest_framework import serializers
+
+from .models import MediaDerivative
+
+# Effective downlink (Mbps, from the Downlink client hint) below which the smallest variant is served
+SLOW_DOWNLINK_MBPS = 1.0
+# Largest variant served on fast links; 'large' images are only listed, not picked
+PREFERRED_VARIANTS = {'audio': 'standard', 'image': 'medium', 'poster': 'medium'}
+
+
+def bandwidth_hint(request):
+    """'low' or 'high' from ?bandwidth=, the Save-Data header or the Downlink client hint"""
+    if request is None:
+        return 'high'
+    hint = request.query_params.get('bandwidth') if hasattr(request, 'query_params') else None
+    if hint in ('low', 'high'):
+        return hint
+    if request.headers.get('Save-Data', '').lower() == 'on':
+        return 'low'
+    try:
+        if float(request.headers.get('Downlink', '')) < SLOW_DOWNLINK_MBPS:
+            return 'low'
+    except ValueError:
+        pass
+    return 'high'
+
+
+def pick_derivatives(derivatives, hint):
+    """One derivative per kind: the smallest on low bandwidth, else the preferred variant"""
+    picked = {}
+    for derivative in sorted(derivatives, key=lambda d: d.size_bytes):
+        current = picked.get(derivative.kind)
+        if current is None:
+            picked[derivative.kind] = derivative
+        elif hint == 'high' and current.variant != PREFERRED_VARIANTS.get(derivative.kind):
+            picked[derivative.kind] = derivative
+    return picked
+
+
+class DerivativeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MediaDerivative
+        fields = ['id', 'field_name', 'kind', 'variant', 'file', 'width', 'bitrate', 'size_bytes']
+
+
+class DerivativesField(serializers.Field):
+    """Read-only `{kind: derivative}` picked for the requesting client's bandwidth
+
+    Declare it as `derivatives` on a model with the GenericRelation of that
+    name; it reads obj.derivatives.all(), so list views should prefetch 'derivatives'.
+    Empty until `manage.py process_media` has handled the upload; clients
+    fall back to the original file.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        hint = bandwidth_hint(self.context.get('request'))
+        picked = pick_derivatives(value.all(), hint)
+        return {
+            kind: DerivativeSerializer(derivative, context=self.context).data
+            for kind, derivative in picked.items()
+        }
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Alert, Notification, NotificationPreference, EmergencyAlert
+from .models import Alert, Notification, NotificationDelivery, NotificationPreference, EmergencyAlert
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
@@ -8,6 +8,12 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ['recipient__username', 'title', 'message']
     readonly_fields = ['created_at']
 
+@admin.register(NotificationDelivery)
+class NotificationDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['notification', 'channel', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['channel', 'status']
+    readonly_fields = ['created_at', 'sent_at']
+
 @admin.register(NotificationPreference)
 class NotificationPreferenceAdmin(admin.ModelAdmin):
     list_display = ['user', 'push_enabled', 'sms_enabled', 'email_enabled']
@@ -4,4 +4,13 @@ from . import api_views
 urlpatterns = [
     path('', api_views.AlertListCreate.as_view()),
     path('<int:pk>/', api_views.AlertRetrieveUpdateDestroy.as_view()),
+    path('emergency/<int:pk>/', api_views.EmergencyAlertDetail.as_view()),
+    path('emergency/<int:pk>/activate/', api_views.activate_alert),
+    path('emergency/<int:pk>/deactivate/', api_views.deactivate_alert),
+    path('notifications/', api_views.NotificationList.as_view()),
+    path('notifications/recent/', api_views.recent_notifications),
+    path('notifications/unread_count/', api_views.unread_count),
+    path('notifications/<int:pk>/read/', api_views.mark_notification_read),
+    path('notifications/read_all/', api_views.mark_all_read),
+    path('notifications/clear/', api_views.clear_notifications),
 ]
@@ -6,11 +6,13 @@ from django.utils import timezone
 from .models import Alert, Notification, NotificationPreference, EmergencyAlert
 from .serializers import (AlertSerializer, NotificationSerializer, 
                           NotificationPreferenceSerializer, EmergencyAlertSerializer)
-from .utils import send_emergency_alert
+from .utils import activate_emergency_alert, send_emergency_alert
+from . import inbox, realtime
 
 class AlertListCreate(generics.ListCreateAPIView):
     queryset = Alert.objects.all()
     serializer_class = AlertSerializer
+    cursor_ordering = ('-sent_at', '-id')  # No created_at on this model
 
 class AlertRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
     queryset = Alert.objects.all()
@@ -50,7 +52,10 @@ def mark_notification_read(request, pk):
     """Mark a notification as read"""
     try:
         notification = Notification.objects.get(pk=pk, recipient=request.user)
-        notification.mark_as_read()
+        if not notification.read:
+            notification.mark_as_read()
+            inbox.notification_read(notification)
+            realtime.publish_unread_count(request.user.id, inbox.unread_count(request.user.id))
         return Response({'status': 'marked as read'})
     except Notification.DoesNotExist:
         return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -63,20 +68,28 @@ def mark_all_read(request):
         read=True,
         read_at=timezone.now()
     )
+    inbox.all_read(request.user.id)
+    realtime.publish_unread_count(request.user.id, 0)
     return Response({'status': 'all notifications marked as read'})
 
 
 @api_view(['GET'])
 def unread_count(request):
     """Get count of unread notifications"""
-    count = Notification.objects.filter(recipient=request.user, read=False).count()
-    return Response({'unread_count': count})
+    return Response({'unread_count': inbox.unread_count(request.user.id)})
+
+
+@api_view(['GET'])
+def recent_notifications(request):
+    """Get the newest notifications from the cached inbox"""
+    return Response(inbox.recent(request.user.id))
 
 
 @api_view(['DELETE'])
 def clear_notifications(request):
     """Clear all read notifications"""
     Notification.objects.filter(recipient=request.user, read=True).delete()
+    inbox.cleared(request.user.id)
     return Response({'status': 'read notifications cleared'})
 
 
@@ -128,6 +141,28 @@ class EmergencyAlertDetail(generics.RetrieveUpdateDestroyAPIView):
     queryset = EmergencyAlert.objects.all()
     serializer_class = EmergencyAlertSerializer
     permission_classes = [IsAdminUser]
+    
+    def perform_update(self, serializer):
+        # Drafts (e.g. from hotspot detection) are sent when they are switched on
+        activate = serializer.validated_data.get('is_active') and not serializer.instance.is_active
+        if activate:
+            del serializer.validated_data['is_active']  # Switched on by activate_emergency_alert
+        alert = serializer.save()
+        if activate:
+            activate_emergency_alert(alert)
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def activate_alert(request, pk):
+    """Activate a draft emergency alert and send it"""
+    try:
+        alert = EmergencyAlert.objects.get(pk=pk)
+    except EmergencyAlert.DoesNotExist:
+        return Response({'error': 'Alert not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not activate_emergency_alert(alert):
+        return Response({'status': 'alert already active'})
+    return Response({'status': 'alert activated', 'recipients_count': alert.recipients_count})
 
 
 @api_view(['POST'])
@@ -0,0 +1,39 @@
+"""
+Channel backends used by the notification delivery worker
+
+Configured per channel in settings.NOTIFICATION_CHANNELS. A backend's
+`send(delivery)` either returns normally or raises; raising schedules a retry.
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BaseChannelBackend:
+    def __init__(self, channel, **options):
+        self.channel = channel
+        self.options = options
+
+    def send(self, delivery):
+        raise NotImplementedError
+
+
+class LoggingBackend(BaseChannelBackend):
+    """Logs instead of calling a gateway, until FCM/SMS/WhatsApp integrations land"""
+
+    def send(self, delivery):
+        notification = delivery.notification
+        logger.info('%s -> user %s: %s', self.channel, notification.recipient_id, notification.title)
+
+
+class InMemoryBackend(BaseChannelBackend):
+    """Collects deliveries in `InMemoryBackend.outbox` for tests"""
+    outbox = []
+    _lock = threading.Lock()
+
+    def send(self, delivery):
+        if self.options.get('fail'):
+            raise RuntimeError(f'{self.channel} gateway unavailable')
+        with self._lock:
+            self.outbox.append((self.channel, delivery.notification_id))
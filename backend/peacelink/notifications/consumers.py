@@ -0,0 +1,40 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from . import inbox
+
+
+def user_group(user_id):
+    return f'notifications_{user_id}'
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """Pushes a user's new notifications and unread count as they happen"""
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.group_name = user_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        count = await database_sync_to_async(inbox.unread_count)(user.id)
+        await self.send_json({'type': 'unread_count', 'unread_count': count})
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        pass  # Server-to-client only
+
+    async def notification_created(self, event):
+        await self.send_json({
+            'type': 'notification',
+            'notification': event['notification'],
+            'unread_count': event.get('unread_count'),
+        })
+
+    async def inbox_changed(self, event):
+        await self.send_json({'type': 'unread_count', 'unread_count': event['unread_count']})
@@ -0,0 +1,183 @@
+"""
+Notification delivery outbox
+
+Request handlers only enqueue NotificationDelivery rows. The
+`deliver_notifications` worker claims due rows, sends them through the
+channel backends configured in settings.NOTIFICATION_CHANNELS with a
+per-channel rate limit, and retries failures with exponential backoff.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Notification, NotificationDelivery
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNELS = {
+    'push': {'BACKEND': 'peacelink.notifications.backends.LoggingBackend', 'RATE_LIMIT': 100},
+    'sms': {'BACKEND': 'peacelink.notifications.backends.LoggingBackend', 'RATE_LIMIT': 10},
+    'whatsapp': {'BACKEND': 'peacelink.notifications.backends.LoggingBackend', 'RATE_LIMIT': 10},
+}
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+LEASE = timedelta(minutes=5)  # Claimed rows become due again if a worker dies
+
+
+def enqueue(notification_ids, channel):
+    """Queue one delivery per notification on `channel`"""
+    if not notification_ids:
+        return
+    if connection.vendor != 'postgresql':
+        NotificationDelivery.objects.bulk_create(
+            [NotificationDelivery(notification_id=pk, channel=channel) for pk in notification_ids]
+        )
+        return
+    # One array parameter instead of a bound row per delivery; bulk_create spends
+    # most of a large fan-out preparing those values in Python
+    qn = connection.ops.quote_name
+    columns = ('notification_id', 'channel', 'status', 'attempts', 'next_attempt_at', 'last_error', 'created_at')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {qn(NotificationDelivery._meta.db_table)} ({', '.join(qn(c) for c in columns)}) "
+            f"SELECT id, %s, 'pending', 0, now(), '', now() FROM unnest(%s::bigint[]) AS id",
+            [channel, list(notification_ids)],
+        )
+
+
+def get_channels():
+    return getattr(settings, 'NOTIFICATION_CHANNELS', DEFAULT_CHANNELS)
+
+
+def get_max_attempts():
+    return getattr(settings, 'NOTIFICATION_DELIVERY_MAX_ATTEMPTS', 5)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def mark_sent(notification_ids, channel, now):
+    """Flag notifications as delivered on `channel` in one UPDATE"""
+    if not notification_ids:
+        return
+    if channel == 'push':
+        flags = {'push_sent': True, 'sent': True, 'sent_at': now}
+    elif channel == 'sms':
+        flags = {'sms_sent': True}
+    else:
+        flags = {'sent': True}
+    Notification.objects.filter(id__in=notification_ids).update(**flags)
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` sends per second, shared by the worker threads"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class DeliveryWorker:
+    def __init__(self, concurrency=4, batch_size=100):
+        self.batch_size = batch_size
+        self.backends = {}
+        self.limiters = {}
+        for channel, config in get_channels().items():
+            backend_class = import_string(config['BACKEND'])
+            self.backends[channel] = backend_class(channel, **config.get('OPTIONS', {}))
+            self.limiters[channel] = RateLimiter(config.get('RATE_LIMIT', 0))
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='delivery')
+
+    def claim(self):
+        """Lease a batch of due deliveries so other workers skip them"""
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                NotificationDelivery.objects.select_for_update(skip_locked=True)
+                .filter(status='pending', next_attempt_at__lte=now)
+                .order_by('next_attempt_at')
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            NotificationDelivery.objects.filter(id__in=ids).update(next_attempt_at=now + LEASE)
+        return list(
+            NotificationDelivery.objects.filter(id__in=ids).select_related('notification__recipient')
+        )
+
+    def send(self, delivery):
+        """Send one delivery from a pool thread, returns an error message or None"""
+        backend = self.backends.get(delivery.channel)
+        if backend is None:
+            return f'No backend configured for {delivery.channel}'
+        self.limiters[delivery.channel].acquire()
+        try:
+            backend.send(delivery)
+        except Exception as exc:
+            logger.warning('%s delivery %s failed: %s', delivery.channel, delivery.id, exc)
+            return str(exc) or exc.__class__.__name__
+        return None
+
+    def record(self, deliveries, errors):
+        now = timezone.now()
+        sent = [delivery for delivery, error in zip(deliveries, errors) if error is None]
+        NotificationDelivery.objects.filter(id__in=[d.id for d in sent]).update(
+            status='sent', sent_at=now, attempts=F('attempts') + 1, last_error=''
+        )
+        for channel in self.backends:
+            mark_sent([d.notification_id for d in sent if d.channel == channel], channel, now)
+
+        max_attempts = get_max_attempts()
+        for delivery, error in zip(deliveries, errors):
+            if error is None:
+                continue
+            attempts = delivery.attempts + 1
+            NotificationDelivery.objects.filter(id=delivery.id).update(
+                attempts=attempts,
+                last_error=error,
+                status='failed' if attempts >= max_attempts else 'pending',
+                next_attempt_at=now + retry_delay(attempts),
+            )
+
+    def run_once(self):
+        """Deliver one batch, returns the number of deliveries attempted"""
+        deliveries = self.claim()
+        if deliveries:
+            errors = list(self.pool.map(self.send, deliveries))
+            self.record(deliveries, errors)
+        return len(deliveries)
+
+    def run(self, poll_interval=2, once=False):
+        try:
+            while True:
+                handled = self.run_once()
+                if once and not handled:
+                    return
+                if not handled:
+                    time.sleep(poll_interval)
+        finally:
+            self.pool.shutdown()
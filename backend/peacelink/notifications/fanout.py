@@ -0,0 +1,155 @@
+"""
+Set-based notification fan-out for large audiences
+
+Recipients and their channel preferences are resolved in a single streamed
+query, notifications are written with chunked bulk_create on a small worker
+pool, and channel deliveries are queued for the delivery worker with one
+INSERT per channel. Alert tracking counters are advanced once per chunk.
+
+The pool's threads use their own database connections, so a fan-out started
+inside a transaction waits for it to commit: until then the threads could not
+see the rows it refers to.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+from . import inbox, realtime
+from .models import EmergencyAlert, Notification
+from .utils import send_push_batch, send_sms_batch, send_whatsapp_batch
+
+SMS_PRIORITIES = ('critical', 'high')
+
+
+def get_chunk_size():
+    return getattr(settings, 'NOTIFICATION_FANOUT_CHUNK_SIZE', 2000)
+
+
+def get_workers():
+    # SQLite cannot write from several connections at once; tests wrapped in a
+    # transaction should set NOTIFICATION_FANOUT_WORKERS = 0 to run inline too
+    if connection.vendor == 'sqlite':
+        return 0
+    return getattr(settings, 'NOTIFICATION_FANOUT_WORKERS', 4)
+
+
+def recipient_rows(users, chunk_size=None):
+    """Stream (user_id, phone, whatsapp_number, push_enabled, sms_enabled) for a User queryset in one query"""
+    return users.order_by().annotate(
+        push_on=Coalesce('notification_preferences__push_enabled', Value(True)),
+        sms_on=Coalesce('notification_preferences__sms_enabled', Value(False)),
+    ).values_list('id', 'phone', 'whatsapp_number', 'push_on', 'sms_on').iterator(chunk_size=chunk_size or get_chunk_size())
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def deliver_chunk(rows, fields, push=True, force_sms=False, whatsapp=False, row_fields=None):
+    """Insert one notification per recipient row and queue it on the enabled channels
+
+    `row_fields`, when given, holds a dict per row merged over `fields`.
+    """
+    row_fields = row_fields or [{}] * len(rows)
+    notifications = Notification.objects.bulk_create(
+        [Notification(recipient_id=row[0], **{**fields, **extra}) for row, extra in zip(rows, row_fields)]
+    )
+    push_ids, sms_ids, whatsapp_ids = [], [], []
+    for notification, (user_id, phone, whatsapp_number, push_on, sms_on) in zip(notifications, rows):
+        if push and push_on:
+            push_ids.append(notification.id)
+        if (sms_on and notification.priority in SMS_PRIORITIES) or (force_sms and phone):
+            sms_ids.append(notification.id)
+        if whatsapp and whatsapp_number:
+            whatsapp_ids.append(notification.id)
+    send_push_batch(push_ids)
+    send_sms_batch(sms_ids)
+    send_whatsapp_batch(whatsapp_ids)
+    inbox.invalidate(row[0] for row in rows)
+    realtime.publish_created(notifications)
+    return notifications
+
+
+def _in_worker(func, *args):
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+def run_chunks(chunks, func):
+    """Apply `func` to each chunk on the worker pool, keeping a bounded number in flight
+
+    Inline when the pool is disabled; otherwise run at once, or on commit of
+    the enclosing transaction.
+    """
+    workers = get_workers()
+    if workers <= 1:
+        for chunk in chunks:
+            func(chunk)
+        return
+    transaction.on_commit(lambda: _run_pooled(chunks, func, workers))
+
+
+def _run_pooled(chunks, func, workers):
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fanout') as pool:
+        pending = set()
+        for chunk in chunks:
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            pending.add(pool.submit(_in_worker, func, chunk))
+        for future in pending:
+            future.result()
+
+
+def alert_recipients(alert):
+    """Users targeted by an emergency alert"""
+    from peacelink.users.models import User
+
+    recipients = User.objects.filter(is_active=True)
+    if not alert.broadcast_all:
+        if alert.target_states:
+            recipients = recipients.filter(state__in=alert.target_states)
+        if alert.target_regions:
+            recipients = recipients.filter(location__in=alert.target_regions)
+    return recipients
+
+
+def fan_out_alert(alert):
+    """Deliver an emergency alert to every targeted user
+
+    Returns the delivered count; inside a transaction delivery waits for the
+    commit, see run_chunks.
+    """
+    recipients = alert_recipients(alert)
+    EmergencyAlert.objects.filter(pk=alert.pk).update(recipients_count=recipients.count())
+
+    fields = {
+        'notification_type': 'emergency_alert',
+        'title': f"🚨 {alert.severity.upper()}: {alert.title}",
+        'message': alert.message,
+        'priority': 'critical',
+        'action_url': '/alerts',
+    }
+    force_sms = alert.severity == 'critical' and alert.send_sms
+
+    def deliver(rows):
+        deliver_chunk(rows, fields, push=alert.send_push, force_sms=force_sms,
+                      whatsapp=alert.send_whatsapp)
+        EmergencyAlert.objects.filter(pk=alert.pk).update(delivered_count=F('delivered_count') + len(rows))
+
+    run_chunks(chunked(recipient_rows(recipients), get_chunk_size()), deliver)
+    alert.refresh_from_db(fields=['recipients_count', 'delivered_count'])
+    return alert.delivered_count
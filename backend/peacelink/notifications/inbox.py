@@ -0,0 +1,91 @@
+"""
+Cached per-user inbox: unread counter and a ring of the newest notifications
+
+Backed by the Django cache so polling clients are answered without touching
+the Notification table. Single creates bump the counter and push onto the
+ring; bulk writes and read/clear actions update or invalidate the entries,
+which are rebuilt from the database on the next read. Counts read from the
+database expire after COUNT_TIMEOUT, since a notification created during
+the read has no cached counter to bump.
+"""
+from django.core.cache import cache
+
+from .models import Notification
+from .serializers import NotificationSerializer
+
+RING_SIZE = 20
+TIMEOUT = 60 * 60 * 24
+# A count filled from the database can miss a notification committed while it
+# was counted, whose increment found no key; keep it only this long
+COUNT_TIMEOUT = 60
+
+
+def _unread_key(user_id):
+    return f'inbox:{user_id}:unread'
+
+
+def _recent_key(user_id):
+    return f'inbox:{user_id}:recent'
+
+
+def _serialize(notifications):
+    return [dict(item) for item in NotificationSerializer(notifications, many=True).data]
+
+
+def unread_count(user_id):
+    """Unread notifications for a user, from the cache when warm"""
+    count = cache.get(_unread_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, read=False).count()
+        cache.add(_unread_key(user_id), count, COUNT_TIMEOUT)
+    return count
+
+
+def recent(user_id):
+    """The newest RING_SIZE notifications for a user, serialized"""
+    items = cache.get(_recent_key(user_id))
+    if items is None:
+        items = _serialize(
+            Notification.objects.filter(recipient_id=user_id).order_by('-created_at')[:RING_SIZE]
+        )
+        cache.add(_recent_key(user_id), items, TIMEOUT)
+    return items
+
+
+def notification_created(notification):
+    user_id = notification.recipient_id
+    try:
+        cache.incr(_unread_key(user_id))
+    except ValueError:
+        pass  # Not cached; the next read counts from the database
+    items = cache.get(_recent_key(user_id))
+    if items is not None:
+        cache.set(_recent_key(user_id), _serialize([notification]) + items[:RING_SIZE - 1], TIMEOUT)
+
+
+def notification_read(notification):
+    user_id = notification.recipient_id
+    try:
+        if cache.decr(_unread_key(user_id)) < 0:
+            cache.delete(_unread_key(user_id))
+    except ValueError:
+        pass
+    cache.delete(_recent_key(user_id))
+
+
+def all_read(user_id):
+    cache.set(_unread_key(user_id), 0, COUNT_TIMEOUT)
+    cache.delete(_recent_key(user_id))
+
+
+def cleared(user_id):
+    cache.delete(_recent_key(user_id))
+
+
+def invalidate(user_ids):
+    """Drop cached inboxes after bulk writes, one cache round trip per call"""
+    keys = []
+    for user_id in user_ids:
+        keys += [_unread_key(user_id), _recent_key(user_id)]
+    if keys:
+        cache.delete_many(keys)
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from peacelink.notifications.fanout import fan_out_alert, get_workers
+from peacelink.notifications.models import EmergencyAlert, Notification, NotificationDelivery
+from peacelink.users.models import User
+
+PREFIX = 'benchmark-fanout'
+STATE = 'Benchmark State'
+
+
+class Command(BaseCommand):
+    help = 'Time an emergency alert fan-out to synthetic recipients (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=100000)
+        parser.add_argument('--sms-share', type=float, default=0.3, help='Share of recipients with a phone number')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Synthetic users are seeded with generate_series, PostgreSQL only')
+        # The pool's threads only see committed rows, so the seed is committed and removed afterwards
+        self.cleanup()
+        started = time.perf_counter()
+        self.seed(options['recipients'], options['sms_share'])
+        self.stdout.write(f"seeded       {options['recipients']} users in {time.perf_counter() - started:.1f}s")
+        alert = EmergencyAlert.objects.create(
+            title='Benchmark', message='Flooding expected along the river, move to higher ground.',
+            alert_type='flood', severity='critical', target_states=[STATE], is_active=False,
+        )
+        try:
+            started = time.perf_counter()
+            delivered = fan_out_alert(alert)
+            elapsed = time.perf_counter() - started
+            deliveries = NotificationDelivery.objects.filter(notification__recipient__state=STATE).count()
+            self.stdout.write(f'workers      {get_workers()}')
+            self.stdout.write(f'delivered    {delivered} notifications, {deliveries} channel deliveries queued')
+            self.stdout.write(f'elapsed      {elapsed:.2f}s')
+            self.stdout.write(f'throughput   {delivered / elapsed:.0f} recipients/s')
+        finally:
+            alert.delete()
+            self.cleanup()
+
+    def seed(self, count, sms_share):
+        template = User.objects.create(username=f'{PREFIX}-template', state=STATE)
+        columns = [f.column for f in User._meta.concrete_fields if not f.primary_key]
+        overrides = {
+            'username': f"'{PREFIX}-' || g",
+            'phone': f"CASE WHEN random() < {float(sms_share)} THEN '+2119' || lpad(g::text, 8, '0') ELSE '' END",
+        }
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {User._meta.db_table} ({', '.join(columns)}) "
+                f"SELECT {', '.join(overrides.get(c, c) for c in columns)} "
+                f"FROM {User._meta.db_table}, generate_series(1, %s) AS g WHERE id = %s",
+                [count, template.id],
+            )
+            cursor.execute(f'DELETE FROM {User._meta.db_table} WHERE id = %s', [template.id])
+            cursor.execute(f'ANALYZE {User._meta.db_table}')
+
+    def cleanup(self):
+        # Plain DELETEs: the ORM cascade would load every row first
+        users = f"SELECT id FROM {User._meta.db_table} WHERE username LIKE %s"
+        notifications = f"SELECT id FROM {Notification._meta.db_table} WHERE recipient_id IN ({users})"
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {NotificationDelivery._meta.db_table} WHERE notification_id IN ({notifications})",
+                           [f'{PREFIX}-%'])
+            cursor.execute(f"DELETE FROM {Notification._meta.db_table} WHERE recipient_id IN ({users})", [f'{PREFIX}-%'])
+            cursor.execute(f"DELETE FROM {User._meta.db_table} WHERE username LIKE %s", [f'{PREFIX}-%'])
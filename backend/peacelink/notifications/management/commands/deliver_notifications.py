@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from peacelink.notifications.delivery import DeliveryWorker
+
+
+class Command(BaseCommand):
+    help = 'Drain the notification delivery outbox through the configured channel backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Sender threads')
+        parser.add_argument('--batch-size', type=int, default=100, help='Deliveries claimed per batch')
+        parser.add_argument('--poll-interval', type=float, default=2, help='Seconds to sleep when idle')
+        parser.add_argument('--once', action='store_true', help='Exit once the outbox is empty')
+
+    def handle(self, *args, **options):
+        worker = DeliveryWorker(concurrency=options['concurrency'], batch_size=options['batch_size'])
+        worker.run(poll_interval=options['poll_interval'], once=options['once'])
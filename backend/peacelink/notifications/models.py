@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from peacelink.users.models import User
 
 class Alert(models.Model):
@@ -144,6 +145,42 @@ class Notification(models.Model):
             self.save()
 
 
+class NotificationDelivery(models.Model):
+    """Outbox of channel deliveries, drained by `manage.py deliver_notifications`"""
+    CHANNEL_CHOICES = [
+        ('push', 'Push Notification'),
+        ('sms', 'SMS'),
+        ('whatsapp', 'WhatsApp'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='deliveries')
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    
+    # Retry bookkeeping; claimed rows are leased by pushing next_attempt_at forward
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.channel} delivery of notification #{self.notification_id} ({self.status})"
+
+
 class NotificationPreference(models.Model):
     """User preferences for notifications"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_preferences')
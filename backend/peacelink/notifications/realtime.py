@@ -0,0 +1,48 @@
+"""
+Publish notification events to connected NotificationConsumer sockets
+
+Publishing is best effort: a missing or unreachable channel layer is logged
+and never fails the write that triggered it; clients catch up from the API.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from .consumers import user_group
+from .serializers import NotificationSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def _group_send(messages):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+
+    async def send_all():
+        for group, message in messages:
+            await layer.group_send(group, message)
+
+    try:
+        async_to_sync(send_all)()
+    except Exception:
+        logger.warning('Could not publish notifications to the channel layer', exc_info=True)
+
+
+def publish_created(notifications, unread_count=None):
+    """Push newly created notifications to their recipients"""
+    data = NotificationSerializer(notifications, many=True).data
+    _group_send([
+        (user_group(notification.recipient_id), {
+            'type': 'notification.created',
+            'notification': dict(item),
+            'unread_count': unread_count,
+        })
+        for notification, item in zip(notifications, data)
+    ])
+
+
+def publish_unread_count(user_id, unread_count):
+    """Sync the unread badge across a user's open sessions"""
+    _group_send([(user_group(user_id), {'type': 'inbox.changed', 'unread_count': unread_count})])
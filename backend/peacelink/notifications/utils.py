@@ -1,8 +1,9 @@
 """
 Utility functions for sending notifications across different channels
 """
-from django.utils import timezone
 from .models import Notification, NotificationPreference, EmergencyAlert
+from .delivery import enqueue
+from . import inbox, realtime
 
 def create_notification(recipient, notification_type, title, message, priority='medium', 
                        report_id=None, forum_post_id=None, meeting_id=None, action_url=''):
@@ -18,6 +19,8 @@ def create_notification(recipient, notification_type, title, message, priority='
         meeting_id=meeting_id,
         action_url=action_url,
     )
+    inbox.notification_created(notification)
+    realtime.publish_created([notification], unread_count=inbox.unread_count(recipient.id))
     
     # Check user preferences and send via appropriate channels
     try:
@@ -38,51 +41,76 @@ def create_notification(recipient, notification_type, title, message, priority='
 
 
 def send_push_notification(notification):
-    """Send push notification via Firebase/OneSignal"""
-    # TODO: Integrate with Firebase Cloud Messaging or OneSignal
-    # For now, just mark as sent
-    notification.push_sent = True
-    notification.sent = True
-    notification.sent_at = timezone.now()
-    notification.save()
-    pass
+    """Queue a push notification for the delivery worker"""
+    enqueue([notification.id], 'push')
 
 
 def send_sms_notification(notification):
-    """Send SMS via Africa's Talking or similar"""
-    # TODO: Integrate with SMS gateway
-    notification.sms_sent = True
-    notification.save()
-    pass
+    """Queue an SMS for the delivery worker"""
+    enqueue([notification.id], 'sms')
+
+
+def send_push_batch(notification_ids):
+    """Queue push notifications for many notifications in one INSERT"""
+    enqueue(notification_ids, 'push')
+
+
+def send_sms_batch(notification_ids):
+    """Queue SMS for many notifications in one INSERT"""
+    enqueue(notification_ids, 'sms')
+
+
+def send_whatsapp_batch(notification_ids):
+    """Queue WhatsApp messages for many notifications in one INSERT"""
+    enqueue(notification_ids, 'whatsapp')
 
 
 def notify_report_status_change(report, old_status, new_status):
     """Notify report author of status change"""
+    notify_report_status_changes([(report.id, report.user_id, report.category)], new_status)
+
+
+def notify_report_status_changes(reports, new_status):
+    """Notify the authors and followers of many reports moved to `new_status`
+    
+    `reports` holds (report_id, user_id, category) tuples. Every
+    notification is written and queued as one batch per chunk.
+    """
     from peacelink.reports.models import ReportFollower
+    from peacelink.users.models import User
+    from .fanout import chunked, deliver_chunk, get_chunk_size, recipient_rows, run_chunks
     
-    # Notify author
-    create_notification(
-        recipient=report.user,
-        notification_type='report_status',
-        title=f"Report Status Updated: {new_status.title()}",
-        message=f"Your report about {report.category} has been updated to {new_status}.",
-        priority='high' if new_status in ['assigned', 'resolved'] else 'medium',
-        report_id=report.id,
-        action_url=f"/reports/{report.id}"
-    )
+    author_priority = 'high' if new_status in ['assigned', 'resolved'] else 'medium'
+    targets = []  # (user_id, per-notification fields)
+    authors = {}
+    for report_id, user_id, category in reports:
+        authors[report_id] = user_id
+        targets.append((user_id, {
+            'title': f"Report Status Updated: {new_status.title()}",
+            'message': f"Your report about {category} has been updated to {new_status}.",
+            'priority': author_priority,
+            'report_id': report_id,
+            'action_url': f"/reports/{report_id}",
+        }))
+    followers = ReportFollower.objects.filter(report_id__in=authors).values_list('report_id', 'user_id')
+    for report_id, user_id in followers.iterator():
+        if user_id != authors[report_id]:
+            targets.append((user_id, {
+                'title': "Followed Report Updated",
+                'message': f"Report you're following has been updated to {new_status}.",
+                'priority': 'medium',
+                'report_id': report_id,
+                'action_url': f"/reports/{report_id}",
+            }))
+    if not targets:
+        return
     
-    # Notify followers
-    followers = ReportFollower.objects.filter(report=report).exclude(user=report.user)
-    for follower in followers:
-        create_notification(
-            recipient=follower.user,
-            notification_type='report_status',
-            title=f"Followed Report Updated",
-            message=f"Report you're following has been updated to {new_status}.",
-            priority='medium',
-            report_id=report.id,
-            action_url=f"/reports/{report.id}"
-        )
+    rows = {row[0]: row for row in recipient_rows(User.objects.filter(id__in={t[0] for t in targets}))}
+    targets = [(rows[user_id], extra) for user_id, extra in targets if user_id in rows]
+    fields = {'notification_type': 'report_status'}
+    run_chunks(chunked(targets, get_chunk_size()),
+               lambda chunk: deliver_chunk([row for row, _ in chunk], fields,
+                                           row_fields=[extra for _, extra in chunk]))
 
 
 def notify_meeting_invitation(meeting, invited_users):
@@ -144,39 +172,22 @@ def notify_forum_like(post, liker):
 
 def send_emergency_alert(alert):
     """Broadcast emergency alert to targeted regions"""
-    from peacelink.users.models import User
-    
-    # Determine recipients
-    if alert.broadcast_all:
-        recipients = User.objects.filter(is_active=True)
-    else:
-        recipients = User.objects.filter(is_active=True)
-        if alert.target_states:
-            recipients = recipients.filter(state__in=alert.target_states)
-        if alert.target_regions:
-            recipients = recipients.filter(location__in=alert.target_regions)
-    
-    alert.recipients_count = recipients.count()
-    alert.save()
-    
-    # Send to each recipient
-    for user in recipients:
-        notification = create_notification(
-            recipient=user,
-            notification_type='emergency_alert',
-            title=f"🚨 {alert.severity.upper()}: {alert.title}",
-            message=alert.message,
-            priority='critical',
-            action_url='/alerts'
-        )
-        
-        # Force SMS for critical alerts
-        if alert.severity == 'critical' and alert.send_sms and user.phone:
-            send_sms_notification(notification)
-        
-        alert.delivered_count += 1
+    from .fanout import fan_out_alert
     
-    alert.save()
+    return fan_out_alert(alert)
+
+
+def activate_emergency_alert(alert):
+    """Activate a draft emergency alert and broadcast it
+
+    Returns False, sending nothing, when the alert was already active, so
+    concurrent activations broadcast it once.
+    """
+    if not EmergencyAlert.objects.filter(pk=alert.pk, is_active=False).update(is_active=True):
+        return False
+    alert.is_active = True
+    send_emergency_alert(alert)
+    return True
 
 
 def send_meeting_reminder(meeting, hours_before=2):
@@ -193,26 +204,27 @@ def send_meeting_reminder(meeting, hours_before=2):
         )
 
 
-def batch_notify_users(users, notification_type, title, message, priority='medium'):
-    """Send same notification to multiple users"""
-    notifications = []
-    for user in users:
-        notification = Notification(
-            recipient=user,
-            notification_type=notification_type,
-            priority=priority,
-            title=title,
-            message=message,
-        )
-        notifications.append(notification)
+def batch_notify_users(users, notification_type, title, message, priority='medium', chunk_size=None):
+    """Send same notification to multiple users
     
-    Notification.objects.bulk_create(notifications)
+    `users` is best passed as a User QuerySet: it is streamed with
+    iterator(chunk_size=...) together with each user's channel preferences,
+    so memory stays bounded for any audience size. Lists of users or user
+    ids are accepted too. Each chunk is one bulk INSERT of notifications
+    plus one INSERT per channel into the delivery outbox.
+    """
+    from django.db.models import QuerySet
+    from peacelink.users.models import User
+    from .fanout import chunked, deliver_chunk, get_chunk_size, recipient_rows, run_chunks
     
-    # Send push notifications
-    for notification in notifications:
-        try:
-            prefs = notification.recipient.notification_preferences
-            if prefs.push_enabled:
-                send_push_notification(notification)
-        except NotificationPreference.DoesNotExist:
-            pass
+    if not isinstance(users, QuerySet):
+        users = User.objects.filter(pk__in=[getattr(user, 'pk', user) for user in users])
+    chunk_size = chunk_size or get_chunk_size()
+    fields = {
+        'notification_type': notification_type,
+        'priority': priority,
+        'title': title,
+        'message': message,
+    }
+    run_chunks(chunked(recipient_rows(users, chunk_size), chunk_size),
+               lambda rows: deliver_chunk(rows, fields))
@@ -0,0 +1,29 @@
+"""
+Shared pagination classes for the API
+"""
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Keyset pagination over the -created_at indexes with opaque cursors.
+
+    Views can override the ordering by setting `cursor_ordering`; the first
+    field is used as the cursor position and must be (nearly) unique.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering:
+            return tuple(ordering)
+        return super().get_ordering(request, queryset, view)
+
+
+class SearchResultsPagination(PageNumberPagination):
+    """Numbered pages for relevance-ranked results, which have no stable cursor key"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Report, ReportStatusHistory, ReportComment, ReportFollower
+from .models import Report, ReportStatusHistory, ReportComment, ReportFollower, ReportSLA
 
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
@@ -25,3 +25,9 @@ class ReportFollowerAdmin(admin.ModelAdmin):
     list_display = ['report', 'user', 'created_at']
     list_filter = ['created_at']
     search_fields = ['user__username']
+
+@admin.register(ReportSLA)
+class ReportSLAAdmin(admin.ModelAdmin):
+    list_display = ['report', 'time_to_review', 'time_to_resolve', 'resolved_late', 'status_since']
+    list_filter = ['resolved_late']
+    readonly_fields = ['updated_at']
@@ -4,4 +4,10 @@ from . import api_views
 urlpatterns = [
     path('', api_views.ReportListCreate.as_view()),
     path('<int:pk>/', api_views.ReportRetrieveUpdateDestroy.as_view()),
+    path('bulk-transition/', api_views.bulk_transition_reports),
+    path('uploads/', api_views.create_media_upload),
+    path('uploads/<uuid:upload_id>/', api_views.media_upload),
+    path('map/tiles/<int:z>/<int:x>/<int:y>/', api_views.report_map_tile),
+    path('export/<str:export_format>/', api_views.export_reports),
+    path('sla/', api_views.report_sla_percentiles),
 ]
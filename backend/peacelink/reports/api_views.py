@@ -1,9 +1,69 @@
 from rest_framework import generics, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from .models import Report, ReportMedia
+import os
+from datetime import datetime, timedelta
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .models import LatencySketch, MediaUpload, Report, ReportMedia
 from .serializers import ReportSerializer, ReportListSerializer
-from django.db.models import Q
+from . import geo
+from .map import tile_clusters
+from .export import stream_csv, stream_ndjson
+from .permissions import IsModerator, IsPartner
+from .transitions import can_transition, transition_reports
+from . import sla, uploads
+
+MAX_BULK_TRANSITION = 1000
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
+
+def filter_reports(queryset, params):
+    """Apply the moderator queue filters from the query string"""
+    status_filter = params.get('status', None)
+    category_filter = params.get('category', None)
+    urgency_filter = params.get('urgency', None)
+    user_id = params.get('user_id', None)
+    unresolved = params.get('unresolved', None)
+    bbox = params.get('bbox', None)
+    
+    # Whole days as created_at ranges, so the -created_at index applies
+    for param, lookup, offset in (('from', 'created_at__gte', 0), ('to', 'created_at__lt', 1)):
+        value = params.get(param, None)
+        if value:
+            try:
+                day = parse_date(value)
+            except ValueError:
+                day = None
+            if day is None:
+                raise ValidationError({param: 'Expected a YYYY-MM-DD date'})
+            start = datetime.combine(day + timedelta(days=offset), datetime.min.time())
+            queryset = queryset.filter(**{lookup: timezone.make_aware(start)})
+    
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    if category_filter:
+        queryset = queryset.filter(category=category_filter)
+    if urgency_filter:
+        queryset = queryset.filter(urgency=urgency_filter)
+    if user_id:
+        queryset = queryset.filter(user_id=user_id)
+    if unresolved:
+        queryset = queryset.unresolved()
+    if bbox:
+        try:
+            west, south, east, north = [float(value) for value in bbox.split(',')]
+        except ValueError:
+            raise ValidationError({'bbox': 'Expected west,south,east,north'})
+        queryset = queryset.within_bbox(south, west, north, east)
+    
+    return queryset
 
 class ReportListCreate(generics.ListCreateAPIView):
     parser_classes = (MultiPartParser, FormParser)
@@ -14,19 +74,7 @@ class ReportListCreate(generics.ListCreateAPIView):
         return ReportSerializer
     
     def get_queryset(self):
-        queryset = Report.objects.all()
-        status_filter = self.request.query_params.get('status', None)
-        category_filter = self.request.query_params.get('category', None)
-        user_id = self.request.query_params.get('user_id', None)
-        
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        if category_filter:
-            queryset = queryset.filter(category=category_filter)
-        if user_id:
-            queryset = queryset.filter(user_id=user_id)
-            
-        return queryset
+        return filter_reports(Report.objects.for_list(), self.request.query_params)
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
@@ -43,6 +91,164 @@ class ReportListCreate(generics.ListCreateAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 class ReportRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Report.objects.all()
+    queryset = Report.objects.for_detail()
     serializer_class = ReportSerializer
     parser_classes = (MultiPartParser, FormParser)
+    
+    def perform_update(self, serializer):
+        # Status changes go through the state machine so history and notifications follow
+        report = serializer.instance
+        new_status = serializer.validated_data.pop('status', report.status)
+        if new_status != report.status and not IsModerator().has_permission(self.request, self):
+            raise PermissionDenied(IsModerator.message)
+        if new_status != report.status and not can_transition(report.status, new_status):
+            raise ValidationError({'status': f'Cannot move from {report.status} to {new_status}'})
+        serializer.save()
+        if new_status != report.status:
+            transition_reports([report.id], new_status, changed_by=self.request.user)
+            report.refresh_from_db()
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_media_upload(request):
+    """Start a resumable upload: {"report", "filename", "size", "content_type", "checksum"}"""
+    try:
+        report = Report.objects.get(id=request.data.get('report'), user=request.user)
+    except (Report.DoesNotExist, ValueError, TypeError):
+        return Response({'error': 'Report not found'}, status=status.HTTP_404_NOT_FOUND)
+    content_type = str(request.data.get('content_type', ''))
+    if uploads.media_type(content_type) is None:
+        return Response({'error': 'Only images and videos can be attached'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        return Response({'error': 'size is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < size <= uploads.get_max_size():
+        return Response({'error': f'size must be between 1 and {uploads.get_max_size()} bytes'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    upload = MediaUpload.objects.create(
+        report=report,
+        user=request.user,
+        filename=str(request.data.get('filename', 'upload'))[:255],
+        content_type=content_type,
+        size=size,
+        checksum=str(request.data.get('checksum', ''))[:64],
+    )
+    response = Response(upload_state(upload), status=status.HTTP_201_CREATED)
+    response['Location'] = f'/api/reports/uploads/{upload.id}/'
+    return response
+
+def upload_state(upload):
+    return {
+        'id': str(upload.id),
+        'offset': upload.offset,
+        'size': upload.size,
+        'status': upload.status,
+        'media_id': upload.media_id,
+    }
+
+@api_view(['GET', 'HEAD', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def media_upload(request, upload_id):
+    """HEAD/GET the offset, PATCH the next chunk (Upload-Offset header, raw body), DELETE to abort"""
+    try:
+        upload = MediaUpload.objects.get(id=upload_id, user=request.user)
+    except MediaUpload.DoesNotExist:
+        return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if request.method == 'DELETE':
+        if os.path.exists(uploads.partial_path(upload)):
+            os.remove(uploads.partial_path(upload))
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    if request.method == 'PATCH':
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return Response({'error': 'Upload-Offset and Content-Length headers are required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            uploads.append_chunk(upload, request.stream, offset, length)
+        except uploads.UploadError as exc:
+            response = Response({'error': str(exc), **upload_state(upload)}, status=exc.status)
+            response['Upload-Offset'] = str(upload.offset)
+            return response
+    
+    response = Response(upload_state(upload))
+    response['Upload-Offset'] = str(upload.offset)
+    response['Upload-Length'] = str(upload.size)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+@api_view(['POST'])
+@permission_classes([IsModerator])
+def bulk_transition_reports(request):
+    """Move many reports to one status: {"ids": [...], "status": "...", "notes": "..."}"""
+    # Form posts repeat ids=; a JSON string or number is not a list, however iterable
+    ids = request.data.getlist('ids') if hasattr(request.data, 'getlist') else request.data.get('ids', [])
+    new_status = request.data.get('status', None)
+    if new_status not in dict(Report.STATUS_CHOICES):
+        return Response({'error': 'Unknown status'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        if not isinstance(ids, list):
+            raise TypeError
+        ids = [int(report_id) for report_id in ids]
+    except (TypeError, ValueError):
+        return Response({'error': 'ids must be a list of report ids'}, status=status.HTTP_400_BAD_REQUEST)
+    if not ids or len(ids) > MAX_BULK_TRANSITION:
+        return Response({'error': f'Send between 1 and {MAX_BULK_TRANSITION} report ids'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    updated, rejected = transition_reports(ids, new_status, changed_by=request.user,
+                                           notes=request.data.get('notes', ''))
+    return Response({'updated': updated, 'rejected': rejected})
+
+@api_view(['GET'])
+@permission_classes([IsPartner])
+def export_reports(request, export_format):
+    """Stream every report matching the list filters (?from=&to=&status=&category=...) as CSV or NDJSON"""
+    if export_format not in EXPORT_FORMATS:
+        return Response({'error': 'Unsupported export format'}, status=status.HTTP_404_NOT_FOUND)
+    
+    queryset = filter_reports(Report.objects.all(), request.query_params)
+    stream, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(stream(queryset), content_type=content_type)
+    filename = f"reports-{timezone.now():%Y%m%d}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@api_view(['GET'])
+def report_map_tile(request, z, x, y):
+    """Clustered reports in one XYZ map tile"""
+    if z > geo.MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        return Response({'error': 'Tile out of range'}, status=status.HTTP_404_NOT_FOUND)
+    category = request.query_params.get('category', None)
+    return Response({'z': z, 'x': x, 'y': y, 'clusters': tile_clusters(z, x, y, category)})
+
+@api_view(['GET'])
+@permission_classes([IsPartner])
+def report_sla_percentiles(request):
+    """p50/p90/p99 review or resolution time in seconds: ?metric=review|resolve&by=category|state|assignee&days=30"""
+    metric = request.query_params.get('metric', 'resolve')
+    if metric not in dict(LatencySketch.METRIC_CHOICES):
+        return Response({'error': 'metric must be review or resolve'}, status=status.HTTP_400_BAD_REQUEST)
+    dimension = request.query_params.get('by', '')
+    if dimension and dimension not in sla.DIMENSIONS:
+        return Response({'error': f"by must be one of {', '.join(sla.DIMENSIONS)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        days = int(request.query_params.get('days', 30))
+    except ValueError:
+        days = 0
+    if not 1 <= days <= 366:
+        return Response({'error': 'days must be between 1 and 366'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    results = [
+        {'key': row['key'], 'count': row['count'],
+         **{f'p{round(q * 100)}': row[q] and round(row[q], 1) for q in sla.QUANTILES}}
+        for row in sla.percentiles(metric, dimension, days=days)
+    ]
+    return Response({'metric': metric, 'by': dimension, 'days': days, 'results': results})
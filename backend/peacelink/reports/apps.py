@@ -1,3 +1,6 @@
 from django.apps import AppConfig
 class ReportsConfig(AppConfig):
     name = 'peacelink.reports'
+
+    def ready(self):
+        from . import dedup, map  # noqa: F401 - connects the duplicate detection, geohash and tile cache signals
@@ -0,0 +1,171 @@
+"""
+Near-duplicate report detection at ingestion
+
+Each new report's description is reduced to a MinHash signature over
+character shingles. The signature is split into LSH bands, and each band
+is stored as a bucket key scoped by category, place (normalized location
+text and, when known, a ~5km geohash cell) and time window. Reports that
+share a bucket with a new report in the current or previous window are
+the only candidates compared, so detection costs a few indexed lookups
+however large the table grows. Candidates whose estimated Jaccard
+similarity reaches THRESHOLD are linked through related_report_id.
+"""
+import hashlib
+import operator
+import re
+import struct
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Report, ReportLSHBucket, ReportSignature
+
+DEFAULTS = {
+    'ENABLED': True,
+    'NUM_PERM': 64,       # MinHash permutations
+    'BANDS': 16,          # LSH bands; NUM_PERM / BANDS rows per band
+    'SHINGLE_SIZE': 4,    # Characters per shingle
+    'THRESHOLD': 0.5,     # Estimated Jaccard similarity to link a duplicate
+    'WINDOW_HOURS': 48,   # Reports further apart than about this are not compared
+}
+
+MAX_HASH = (1 << 32) - 1
+GEOHASH_PRECISION = 5
+WORD_RE = re.compile(r'\w+')
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REPORT_DEDUP', {})}
+
+
+class MinHasher:
+    """MinHash signatures and LSH band keys for one configuration"""
+
+    def __init__(self, num_perm=64, bands=16, shingle_size=4):
+        if num_perm % bands:
+            raise ValueError('NUM_PERM must be a multiple of BANDS')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.unpack = struct.Struct(f'<{num_perm}I').unpack
+
+    def shingles(self, text):
+        text = ' '.join(WORD_RE.findall(text.lower()))
+        k = self.shingle_size
+        if len(text) <= k:
+            return {text.encode()} if text else set()
+        return {text[i:i + k].encode() for i in range(len(text) - k + 1)}
+
+    def signature(self, text):
+        # Each 32-bit slice of a SHAKE digest is an independent hash function,
+        # so one digest per shingle yields all NUM_PERM hashes and the minimum
+        # per position is taken column-wise in C by zip/min
+        shingles = self.shingles(text)
+        if not shingles:
+            return array('I', [MAX_HASH] * self.num_perm)
+        size = 4 * self.num_perm
+        hashes = [self.unpack(hashlib.shake_128(shingle).digest(size)) for shingle in shingles]
+        return array('I', map(min, zip(*hashes)))
+
+    def band_digests(self, signature):
+        """One short digest per LSH band"""
+        return [
+            hashlib.blake2b(signature[i * self.rows:(i + 1) * self.rows].tobytes(), digest_size=8).hexdigest()
+            for i in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(first, second):
+        """Estimated Jaccard similarity of two signatures"""
+        return sum(map(operator.eq, first, second)) / len(first)
+
+
+_hashers = {}
+
+
+def get_hasher(config=None):
+    config = config or get_config()
+    key = (config['NUM_PERM'], config['BANDS'], config['SHINGLE_SIZE'])
+    if key not in _hashers:
+        _hashers[key] = MinHasher(*key)
+    return _hashers[key]
+
+
+def report_scopes(report):
+    """Category + place scopes a report is bucketed under"""
+    scopes = []
+    place = ' '.join(WORD_RE.findall(report.location.lower()))
+    if place:
+        scopes.append(f'{report.category}|loc:{place}')
+    if report.geohash:
+        scopes.append(f'{report.category}|geo:{report.geohash[:GEOHASH_PRECISION]}')
+    return scopes
+
+
+def bucket_keys(scopes, window, digests):
+    return [
+        hashlib.blake2b(f'{scope}|{window}|{band}|{digest}'.encode(), digest_size=16).hexdigest()
+        for scope in scopes
+        for band, digest in enumerate(digests)
+    ]
+
+
+def report_window(report, config):
+    return int(report.created_at.timestamp() // (config['WINDOW_HOURS'] * 3600))
+
+
+def index_report(report):
+    """Sign and bucket a new report and link it to the closest earlier duplicate
+
+    Returns (duplicate_report_id, similarity), or (None, 0.0).
+    """
+    config = get_config()
+    hasher = get_hasher(config)
+    signature = hasher.signature(report.description)
+    digests = hasher.band_digests(signature)
+    scopes = report_scopes(report)
+    window = report_window(report, config)
+
+    candidate_keys = bucket_keys(scopes, window, digests) + bucket_keys(scopes, window - 1, digests)
+    candidates = set(
+        ReportLSHBucket.objects.filter(key__in=candidate_keys)
+        .exclude(report_id=report.id).values_list('report_id', flat=True)
+    )
+    best_id, best_score, best_root = None, 0.0, None
+    if candidates:
+        rows = ReportSignature.objects.filter(report_id__in=candidates).values_list(
+            'report_id', 'minhash', 'duplicate_of_id'
+        )
+        for candidate_id, minhash, root_id in rows:
+            score = hasher.similarity(signature, array('I', bytes(minhash)))
+            if score >= config['THRESHOLD'] and (score, -candidate_id) > (best_score, -(best_id or 0)):
+                best_id, best_score, best_root = candidate_id, score, root_id or candidate_id
+
+    ReportSignature.objects.create(
+        report=report, minhash=signature.tobytes(), duplicate_of_id=best_root, similarity=best_score,
+    )
+    ReportLSHBucket.objects.bulk_create([
+        ReportLSHBucket(key=key, report=report, window=window)
+        for key in bucket_keys(scopes, window, digests)
+    ])
+    if best_root and not report.related_report_id:
+        report.related_report_id = str(best_root)
+        Report.objects.filter(pk=report.pk).update(related_report_id=report.related_report_id)
+    _purge_old_buckets(window)
+    return best_root, best_score
+
+
+def _purge_old_buckets(window):
+    # Buckets older than the previous window can never match again; drop them once per window
+    if cache.add(f'reports:dedup:purged:{window}', True, 60 * 60 * 24 * 7):
+        ReportLSHBucket.objects.filter(window__lt=window - 1).delete()
+
+
+@receiver(post_save, sender=Report)
+def detect_duplicates(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw and get_config()['ENABLED']:
+        index_report(instance)
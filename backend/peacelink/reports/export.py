@@ -0,0 +1,81 @@
+"""
+Streaming report exports for partner agencies
+
+Rows are read with a server-side cursor (QuerySet.iterator) and written
+out chunk by chunk as CSV or NDJSON, so memory stays flat however many
+reports are exported. Reporter identity, contact details and coordinates
+are blanked for anonymous reports.
+"""
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+CHUNK_SIZE = 2000
+
+# (column name, queryset field)
+EXPORT_FIELDS = [
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('category', 'category'),
+    ('language', 'language'),
+    ('urgency', 'urgency'),
+    ('status', 'status'),
+    ('location', 'location'),
+    ('nearest_landmark', 'nearest_landmark'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('incident_date', 'incident_date'),
+    ('description', 'description'),
+    ('people_affected', 'people_affected'),
+    ('anonymous_report', 'anonymous_report'),
+    ('reporter_id', 'user_id'),
+    ('reporter_username', 'user__username'),
+    ('contact_preference', 'contact_preference'),
+    ('contact_number', 'contact_number'),
+    ('reviewed_at', 'reviewed_at'),
+    ('resolved_at', 'resolved_at'),
+]
+COLUMNS = [column for column, _ in EXPORT_FIELDS]
+REDACTED = {'reporter_id', 'reporter_username', 'contact_number', 'latitude', 'longitude'}
+
+
+def export_rows(queryset):
+    """Report rows as dicts in id order, redacted for anonymous reports"""
+    rows = queryset.order_by('id').values_list(*[field for _, field in EXPORT_FIELDS])
+    for values in rows.iterator(chunk_size=CHUNK_SIZE):
+        row = dict(zip(COLUMNS, values))
+        if row['anonymous_report']:
+            for column in REDACTED:
+                row[column] = None
+        yield row
+
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_csv(queryset):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    for chunk in _chunks(export_rows(queryset)):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_ndjson(queryset):
+    for chunk in _chunks(export_rows(queryset)):
+        yield ''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in chunk)
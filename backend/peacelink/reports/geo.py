@@ -0,0 +1,101 @@
+"""
+Geohash and map tile arithmetic for the report map
+
+Reports are indexed by geohash so a bounding box can be answered with a
+handful of B-tree range scans on the geohash column instead of a full
+scan on latitude/longitude. Tiles use the Web Mercator XYZ scheme the
+map client requests.
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9  # ~5m cells, stored on Report.geohash
+MAX_ZOOM = 18
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def encode(lat, lng, precision=PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180 / 2 ** lat_bits, 360 / 2 ** lng_bits
+
+
+def prefix_upper_bound(prefix):
+    """The smallest geohash greater than every hash starting with `prefix`, or None"""
+    chars = list(prefix)
+    while chars:
+        index = BASE32.index(chars[-1])
+        if index < len(BASE32) - 1:
+            chars[-1] = BASE32[index + 1]
+            return ''.join(chars)
+        chars.pop()
+    return None
+
+
+def cover(south, west, north, east, max_cells=32):
+    """Geohash prefixes whose cells cover the box, as long as there are at most max_cells"""
+    best = 0
+    for precision in range(1, PRECISION + 1):
+        height, width = cell_size(precision)
+        rows = math.floor((north + 90) / height) - math.floor((south + 90) / height) + 1
+        cols = math.floor((east + 180) / width) - math.floor((west + 180) / width) + 1
+        if rows * cols > max_cells:
+            break
+        best = precision
+    if not best:
+        return []
+    height, width = cell_size(best)
+    prefixes = set()
+    row_start = math.floor((south + 90) / height)
+    col_start = math.floor((west + 180) / width)
+    for row in range(row_start, math.floor((north + 90) / height) + 1):
+        for col in range(col_start, math.floor((east + 180) / width) + 1):
+            lat = min(-90 + (row + 0.5) * height, 90)
+            lng = min(-180 + (col + 0.5) * width, 180)
+            prefixes.add(encode(lat, lng, best))
+    return sorted(prefixes)
+
+
+def tile_bounds(z, x, y):
+    """(south, west, north, east) of an XYZ tile"""
+    n = 2 ** z
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), x / n * 360 - 180, lat(y), (x + 1) / n * 360 - 180
+
+
+def point_tile(lat, lng, z):
+    """(x, y) of the tile containing a point at zoom z"""
+    n = 2 ** z
+    lat = max(min(lat, MAX_MERCATOR_LAT), -MAX_MERCATOR_LAT)
+    x = int((lng + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def cluster_precision(z):
+    """Geohash length whose cells are about an eighth of a tile wide at zoom z"""
+    return max(1, min(PRECISION, math.ceil(2 * (z + 3) / 5)))
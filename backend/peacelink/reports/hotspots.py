@@ -0,0 +1,313 @@
+"""
+Hotspot early warning over the report stream
+
+`manage.py detect_hotspots` feeds every new report, roughly in id order, to a
+HotspotDetector keyed by the reporter's (state, county) and the report
+category. Per key the detector holds one array('d'):
+
+- a fast exponentially weighted count of recent reports
+  (HALF_LIFE_HOURS half-life)
+- a 168-slot hour-of-week baseline of reports per hour, itself an EWMA
+  across weeks (BASELINE_WEEKS), so market days and night-time lulls are
+  expected rather than flagged
+- a weekly stamp per slot, so weeks with no reports decay the baseline
+  lazily instead of being written out
+- the expected fast count: the baseline rates of the hours just gone,
+  weighted by the same decay
+
+Each report costs a bounded number of float operations: catching the
+expected count up walks at most HORIZON_HALF_LIVES half-lives of hours,
+older ones having decayed away. When the fast count exceeds the expected
+count by Z_THRESHOLD Poisson standard deviations (and by at least
+MIN_REPORTS reports), the detector raises a hotspot. The worker turns it into an
+inactive EmergencyAlert draft and a notification to moderators, and
+checkpoints in the same transaction so a restart cannot raise it again.
+
+Report ids are drawn before their transactions commit, so a report can
+appear after higher ids have been read. The worker keeps a watermark below
+which every report is read and the ids read above it; it re-reads above
+the watermark, skipping those ids, and only steps over a missing id once a
+later report is COMMIT_LAG_SECONDS old. Detector state and read position
+are checkpointed to the database every CHECKPOINT_EVERY reports and
+whenever the stream goes idle.
+"""
+import math
+from array import array
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import HotspotBaseline, HotspotCheckpoint, Report
+
+DEFAULTS = {
+    'HALF_LIFE_HOURS': 6,       # Memory of the fast report count
+    'BASELINE_WEEKS': 8,        # Memory of the hour-of-week baseline
+    'Z_THRESHOLD': 4.0,         # Poisson standard deviations above the baseline
+    'MIN_REPORTS': 5,           # Excess over the expected count needed to raise anything
+    'MIN_RATE': 0.02,           # Reports per hour assumed where the baseline is lower or empty
+    'COOLDOWN_HOURS': 24,       # Quiet period per key after a hotspot
+    'MAX_ALERT_AGE_HOURS': 6,   # Older reports (catch-up, replays) update state without alerting
+    'CHECKPOINT_EVERY': 500,
+    'COMMIT_LAG_SECONDS': 300,  # Longest a report takes to commit after its insert
+}
+HORIZON_HALF_LIVES = 5  # Hours further back weigh under 2**-5 in the fast count
+
+SLOTS = 168  # Hours in a week
+# Per-key array layout
+LEVEL, EXPECTED, LEVEL_AT, HOUR, HOUR_COUNT, LAST_ALERT = range(6)
+HEADER = 6
+BASELINE = HEADER
+STAMPS = HEADER + SLOTS
+SIZE = HEADER + 2 * SLOTS
+
+ALERT_TYPES = {
+    'conflict': 'conflict',
+    'security': 'safety',
+    'gender': 'safety',
+    'health': 'disease',
+    'resources': 'resource',
+}
+MODERATOR_ROLES = ('moderator', 'admin')
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REPORT_HOTSPOTS', {})}
+
+
+def report_key(state, county, category):
+    return f'{state or ""}|{county or ""}|{category}'
+
+
+class HotspotDetector:
+    """Streaming per-key spike detection, independent of the database
+
+    Feed observe() with reports in time order; times are in hours since
+    the epoch.
+    """
+
+    def __init__(self, config=None):
+        config = config or get_config()
+        self.config = config
+        self.decay = math.log(2) / config['HALF_LIFE_HOURS']
+        self.horizon = HORIZON_HALF_LIVES * config['HALF_LIFE_HOURS']
+        self.hour_fade = math.exp(-self.decay)
+        self.hour_gain = (1 - self.hour_fade) / self.decay
+        self.keep = 1 - 1 / config['BASELINE_WEEKS']
+        self.states = {}
+        self.dirty = set()
+
+    def _new_state(self, hour, at):
+        state = array('d', bytes(8 * SIZE))
+        state[HOUR] = hour
+        state[LEVEL_AT] = at
+        state[LAST_ALERT] = -math.inf
+        for slot in range(SLOTS):
+            state[STAMPS + slot] = -1
+        return state
+
+    def _slot_value(self, state, slot, week):
+        """Baseline of a slot as of `week`, decayed for the weeks it saw no reports"""
+        stamp = state[STAMPS + slot]
+        if stamp < 0:
+            return 0.0
+        return state[BASELINE + slot] * self.keep ** max(week - stamp - 1, 0)
+
+    def _rate(self, state, hour):
+        week, slot = divmod(hour, SLOTS)
+        return max(self._slot_value(state, slot, week), self.config['MIN_RATE'])
+
+    def _fold_hour(self, state):
+        """Add the finished hour's report count to its hour-of-week slot"""
+        hour = int(state[HOUR])
+        week, slot = divmod(hour, SLOTS)
+        if state[STAMPS + slot] < 0:
+            state[BASELINE + slot] = state[HOUR_COUNT]  # First sighting seeds the slot instead of 1/BASELINE_WEEKS of it
+        else:
+            value = self._slot_value(state, slot, week)
+            state[BASELINE + slot] = self.keep * value + (1 - self.keep) * state[HOUR_COUNT]
+        state[STAMPS + slot] = week
+
+    def _advance_expected(self, state, start, end):
+        """Decay the expected fast count from `start` to `end`, accruing each hour's baseline rate"""
+        if end - start > self.horizon:
+            state[EXPECTED] = 0.0
+            start = end - self.horizon
+        expected = state[EXPECTED]
+        hour = math.floor(start)
+        last = math.floor(end)
+        if hour < last:
+            # Rest of the first hour, then whole hours at constant factors; _rate() inlined, this is the hot loop
+            fade = math.exp(-self.decay * (hour + 1 - start))
+            expected = expected * fade + self._rate(state, hour) * (1 - fade) / self.decay
+            hour_fade, hour_gain, keep, floor = self.hour_fade, self.hour_gain, self.keep, self.config['MIN_RATE']
+            for hour in range(hour + 1, last):
+                week, slot = divmod(hour, SLOTS)
+                stamp = state[STAMPS + slot]
+                rate = 0.0
+                if stamp >= 0:
+                    rate = state[BASELINE + slot]
+                    if stamp < week - 1:
+                        rate *= keep ** (week - stamp - 1)
+                expected = expected * hour_fade + (rate if rate > floor else floor) * hour_gain
+            start = last
+        fade = math.exp(-self.decay * (end - start))
+        state[EXPECTED] = expected * fade + self._rate(state, last) * (1 - fade) / self.decay
+
+    def observe(self, key, at):
+        """Count one report for `key` at `at` hours; returns the hotspot stats or None"""
+        state = self.states.get(key)
+        hour = math.floor(at)
+        if state is None:
+            state = self.states[key] = self._new_state(hour, at)
+        self.dirty.add(key)
+        at = max(at, state[LEVEL_AT])  # Tolerate slightly out-of-order timestamps
+        hour = max(hour, int(state[HOUR]))
+
+        if hour != state[HOUR]:
+            self._fold_hour(state)
+            state[HOUR] = hour
+            state[HOUR_COUNT] = 0
+        state[HOUR_COUNT] += 1
+        self._advance_expected(state, state[LEVEL_AT], at)
+        state[LEVEL] = state[LEVEL] * math.exp(-self.decay * (at - state[LEVEL_AT])) + 1
+        state[LEVEL_AT] = at
+
+        expected = max(state[EXPECTED], self.config['MIN_RATE'] / self.decay)
+        level = state[LEVEL]
+        score = (level - expected) / math.sqrt(expected)
+        if (
+            score >= self.config['Z_THRESHOLD']
+            and level - expected >= self.config['MIN_REPORTS']
+            and hour - state[LAST_ALERT] >= self.config['COOLDOWN_HOURS']
+        ):
+            state[LAST_ALERT] = hour
+            return {'key': key, 'level': level, 'expected': expected, 'score': score}
+        return None
+
+    def load(self, rows):
+        """Restore checkpointed (key, bytes) rows"""
+        for key, data in rows:
+            state = array('d')
+            state.frombytes(bytes(data))
+            if len(state) == SIZE:
+                self.states[key] = state
+
+    def dump(self, keys=None):
+        """(key, bytes) rows for `keys`, by default those changed since the last dump"""
+        keys = self.dirty if keys is None else keys
+        rows = [(key, self.states[key].tobytes()) for key in keys]
+        self.dirty = set()
+        return rows
+
+
+def load_detector():
+    detector = HotspotDetector()
+    detector.load(HotspotBaseline.objects.values_list('key', 'slots').iterator())
+    return detector
+
+
+def checkpoint(detector, last_report_id, pending=None):
+    with transaction.atomic():
+        HotspotBaseline.objects.bulk_create(
+            [HotspotBaseline(key=key, slots=data) for key, data in detector.dump()],
+            update_conflicts=True, unique_fields=['key'], update_fields=['slots', 'updated_at'],
+        )
+        HotspotCheckpoint.objects.update_or_create(
+            pk=1, defaults={'last_report_id': last_report_id, 'pending': pending or {}},
+        )
+
+
+def raise_hotspot(hotspot, state, county, category):
+    """Draft an inactive EmergencyAlert and tell moderators about it"""
+    from peacelink.notifications.models import EmergencyAlert
+    from peacelink.notifications.utils import batch_notify_users
+    from peacelink.users.models import User
+
+    place = ', '.join(part for part in (county, state) if part) or 'an unknown area'
+    label = dict(Report.CATEGORY_CHOICES).get(category, category)
+    title = f'Spike in {label} reports in {place}'
+    message = (
+        f"About {hotspot['level']:.0f} {label} reports in {place} over the last few hours, "
+        f"where about {hotspot['expected']:.1f} are usual at this time of week. "
+        f"Review the reports and activate this draft alert to send it."
+    )
+    threshold = get_config()['Z_THRESHOLD']
+    alert = EmergencyAlert.objects.create(
+        title=title[:255],
+        message=message,
+        alert_type=ALERT_TYPES.get(category, 'other'),
+        severity='severe' if hotspot['score'] >= 2 * threshold else 'moderate',
+        target_states=[state] if state else [],
+        target_counties=[county] if county else [],
+        issuing_organization='PeaceLink hotspot detection',
+        is_active=False,
+    )
+    moderators = User.objects.filter(role__in=MODERATOR_ROLES, is_active=True)
+    transaction.on_commit(lambda: batch_notify_users(
+        moderators, 'system', title, f'{message} (draft alert #{alert.id})', priority='high',
+    ))
+    return alert
+
+
+class HotspotWorker:
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.config = get_config()
+        self.detector = load_detector()
+        checkpoint_row = HotspotCheckpoint.objects.filter(pk=1).first()
+        self.last_report_id = checkpoint_row.last_report_id if checkpoint_row else 0
+        self.pending = {}  # Reports read above last_report_id, id -> created_at in hours
+        if checkpoint_row:
+            self.pending = {int(report_id): at for report_id, at in checkpoint_row.pending.items()}
+        self.since_checkpoint = 0
+
+    def run_once(self):
+        """Process one batch of new reports, returns how many were read"""
+        rows = list(
+            Report.objects.filter(id__gt=self.last_report_id).exclude(id__in=list(self.pending)).order_by('id')
+            .values_list('id', 'created_at', 'category', 'user__state', 'user__county')[:self.batch_size]
+        )
+        now = timezone.now()
+        max_age = self.config['MAX_ALERT_AGE_HOURS'] * 3600
+        for report_id, created_at, category, state, county in rows:
+            at = created_at.timestamp() / 3600
+            hotspot = self.detector.observe(report_key(state, county, category), at)
+            self.pending[report_id] = at
+            if hotspot and (now - created_at).total_seconds() <= max_age:
+                # The draft and the detector's cooldown commit together
+                with transaction.atomic():
+                    raise_hotspot(hotspot, state, county, category)
+                    self.save()
+        self.advance(now)
+        self.since_checkpoint += len(rows)
+        if self.since_checkpoint >= self.config['CHECKPOINT_EVERY'] or (self.since_checkpoint and not rows):
+            self.save()
+        return len(rows)
+
+    def advance(self, now):
+        """Move last_report_id over the ids read, and over missing ids a settled report follows"""
+        settled = (now.timestamp() - self.config['COMMIT_LAG_SECONDS']) / 3600
+        for report_id in sorted(self.pending):
+            if report_id != self.last_report_id + 1 and self.pending[report_id] > settled:
+                break
+            self.last_report_id = report_id
+            del self.pending[report_id]
+
+    def save(self):
+        checkpoint(self.detector, self.last_report_id, self.pending)
+        self.since_checkpoint = 0
+
+    def run(self, poll_interval=10, once=False):
+        import time
+
+        try:
+            while True:
+                handled = self.run_once()
+                if once and not handled:
+                    return
+                if not handled:
+                    time.sleep(poll_interval)
+        finally:
+            if self.since_checkpoint:
+                self.save()
@@ -0,0 +1,86 @@
+import random
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from peacelink.reports.dedup import bucket_keys, get_config, get_hasher
+
+VOCABULARY = (
+    'water borehole broken market cattle raid village gunfire clinic closed school teachers '
+    'flood road blocked bridge youth clash elders meeting fire shelter food aid convoy '
+    'attack night women children missing injured county payam river fishing land dispute '
+    'police checkpoint fuel price cholera outbreak latrine camp displaced families rain harvest'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Measure duplicate detection precision, recall and throughput on synthetic reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incidents', type=int, default=2000, help='Distinct incidents')
+        parser.add_argument('--copies', type=int, default=4, help='Reports per incident')
+        parser.add_argument('--edit-rate', type=float, default=0.15, help='Share of words changed per copy')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        config = get_config()
+        hasher = get_hasher(config)
+        reports = []
+        for incident in range(options['incidents']):
+            words = [rng.choice(VOCABULARY) for _ in range(rng.randint(12, 40))]
+            for _ in range(options['copies']):
+                reports.append((incident, ' '.join(self.paraphrase(words, options['edit_rate'], rng))))
+        rng.shuffle(reports)
+
+        # Same in-memory stand-in for ReportLSHBucket / ReportSignature as the database path
+        buckets = defaultdict(list)
+        signatures = []
+        seen_incidents = set()
+        true_links = false_links = expected = 0
+        scopes = ['other|loc:juba']
+        started = time.perf_counter()
+        for index, (incident, description) in enumerate(reports):
+            signature = hasher.signature(description)
+            keys = bucket_keys(scopes, 0, hasher.band_digests(signature))
+            candidates = {candidate for key in keys for candidate in buckets[key]}
+            best, best_score = None, 0.0
+            for candidate in candidates:
+                score = hasher.similarity(signature, signatures[candidate][1])
+                if score >= config['THRESHOLD'] and score > best_score:
+                    best, best_score = candidate, score
+            if incident in seen_incidents:
+                expected += 1
+            if best is not None:
+                if signatures[best][0] == incident:
+                    true_links += 1
+                else:
+                    false_links += 1
+            signatures.append((incident, signature))
+            seen_incidents.add(incident)
+            for key in keys:
+                buckets[key].append(index)
+        elapsed = time.perf_counter() - started
+
+        links = true_links + false_links
+        self.stdout.write(f'reports      {len(reports)}')
+        self.stdout.write(f'precision    {true_links / links if links else 1:.3f}')
+        self.stdout.write(f'recall       {true_links / expected if expected else 1:.3f}')
+        self.stdout.write(f'throughput   {len(reports) / elapsed:.0f} reports/s')
+        self.stdout.write(f'per report   {elapsed / len(reports) * 1000:.2f} ms')
+
+    @staticmethod
+    def paraphrase(words, edit_rate, rng):
+        result = []
+        for word in words:
+            roll = rng.random()
+            if roll < edit_rate / 3:
+                continue  # Dropped
+            if roll < edit_rate * 2 / 3:
+                result.append(rng.choice(VOCABULARY))  # Replaced
+            else:
+                result.append(word)
+            if rng.random() < edit_rate / 3:
+                result.append(rng.choice(VOCABULARY))  # Inserted
+        return result
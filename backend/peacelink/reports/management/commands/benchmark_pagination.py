@@ -0,0 +1,70 @@
+import time
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory
+
+from peacelink.reports.api_views import ReportListCreate
+from peacelink.reports.management.seed import seed_reporters, seed_reports
+
+
+class Command(BaseCommand):
+    help = 'Measure report list latency as the table grows, cursor pages against the unpaginated list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000', help='Comma-separated table sizes')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per measurement')
+        parser.add_argument('--depth', type=int, default=20, help='Pages followed before timing a deep cursor')
+        parser.add_argument('--baseline-max', type=int, default=10000,
+                            help='Largest table the unpaginated list is timed on')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Synthetic reports are seeded with generate_series, PostgreSQL only')
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        self.factory = APIRequestFactory()
+        self.paginated = ReportListCreate.as_view()
+        self.unpaginated = ReportListCreate.as_view(pagination_class=None)
+        self.stdout.write(f"{'reports':>9} {'first p50':>10} {'first p99':>10} {'deep p50':>10} "
+                          f"{'deep p99':>10} {'all p50':>10} {'all p99':>10}  (ms)")
+        with transaction.atomic():
+            users = seed_reporters(prefix='benchmark-pagination')
+            seeded = 0
+            for size in sizes:
+                seed_reports(size - seeded, users, start=seeded)
+                seeded = size
+                cursor = self.follow(options['depth'])
+                first = self.measure(self.paginated, {}, options['requests'])
+                deep = self.measure(self.paginated, {'cursor': cursor}, options['requests'])
+                if size <= options['baseline_max']:
+                    everything = self.measure(self.unpaginated, {}, max(options['requests'] // 10, 3))
+                else:
+                    everything = ('-', '-')
+                self.stdout.write(f'{size:>9} ' + ' '.join(f'{value:>10}' for value in (*first, *deep, *everything)))
+            transaction.set_rollback(True)
+
+    def get(self, view, params):
+        response = view(self.factory.get('/api/reports/', params))
+        response.render()
+        return response
+
+    def follow(self, depth):
+        """The cursor `depth` pages into the list"""
+        cursor = None
+        for _ in range(depth):
+            response = self.get(self.paginated, {'cursor': cursor} if cursor else {})
+            if not response.data['next']:
+                break
+            cursor = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+        return cursor
+
+    def measure(self, view, params, requests):
+        self.get(view, params)  # Warm up
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            self.get(view, params)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return f'{timings[len(timings) // 2]:.1f}', f'{timings[min(len(timings) - 1, int(len(timings) * 0.99))]:.1f}'
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from peacelink.reports.management.seed import seed_reporters, seed_reports
+from peacelink.reports.models import Report
+from peacelink.reports.serializers import ReportListSerializer, ReportSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare report list and detail query counts and latency, plain querysets against for_list/for_detail'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reports', type=int, default=10000, help='Reports in the table')
+        parser.add_argument('--rows', type=int, default=500, help='Reports serialized per list request')
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests per measurement')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Synthetic reports are seeded with generate_series, PostgreSQL only')
+        rows, requests = options['rows'], options['requests']
+        with transaction.atomic():
+            seed_reports(options['reports'], seed_reporters(prefix='benchmark-report-queries'))
+            with connection.cursor() as cursor:
+                # Media on every third report, so the count is not a constant
+                cursor.execute(
+                    "INSERT INTO reports_reportmedia (report_id, file, file_type, uploaded_at) "
+                    "SELECT id, 'reports/media/seed.jpg', 'image', now() "
+                    "FROM reports_report, generate_series(1, 2) WHERE mod(id, 3) = 0"
+                )
+                cursor.execute('ANALYZE reports_reportmedia')
+            report_id = Report.objects.filter(media_files__isnull=False).values_list('id', flat=True).first()
+
+            def page(queryset):
+                return lambda: ReportListSerializer(queryset.order_by('-created_at')[:rows], many=True).data
+
+            def detail(queryset):
+                return lambda: ReportSerializer(queryset.get(id=report_id)).data
+
+            self.stdout.write(f'{options["reports"]} reports, {rows} per list request')
+            self.stdout.write(f"{'':<16} {'queries':>8} {'p50 ms':>9} {'p99 ms':>9}")
+            for label, render in [
+                ('list, plain', page(Report.objects.all())),
+                ('list, for_list', page(Report.objects.for_list())),
+                ('detail, plain', detail(Report.objects.all())),
+                ('detail, joined', detail(Report.objects.for_detail())),
+            ]:
+                self.stdout.write(f'{label:<16} ' + ' '.join(
+                    f'{value:>9}' for value in self.measure(render, requests)
+                ))
+            transaction.set_rollback(True)
+
+    def measure(self, render, requests):
+        connection.queries_log.clear()  # The capture counts within a bounded log
+        with CaptureQueriesContext(connection) as queries:
+            render()
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return (
+            len(queries),
+            f'{timings[len(timings) // 2]:.1f}',
+            f'{timings[min(len(timings) - 1, int(len(timings) * 0.99))]:.1f}',
+        )
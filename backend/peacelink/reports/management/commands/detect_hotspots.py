@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from peacelink.reports.hotspots import HotspotWorker
+
+
+class Command(BaseCommand):
+    help = 'Follow new reports and draft alerts for places where a category suddenly spikes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Reports read per batch')
+        parser.add_argument('--poll-interval', type=float, default=10, help='Seconds to sleep when idle')
+        parser.add_argument('--once', action='store_true', help='Exit once caught up with the reports')
+
+    def handle(self, *args, **options):
+        worker = HotspotWorker(batch_size=options['batch_size'])
+        worker.run(poll_interval=options['poll_interval'], once=options['once'])
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+
+from peacelink.reports.api_views import filter_reports
+from peacelink.reports.management.seed import seed_reporters, seed_reports
+from peacelink.reports.models import Report
+
+# The moderator queue queries ReportListCreate serves, as query strings
+QUEUE_QUERIES = [
+    ('newest', ''),
+    ('by status', 'status=submitted'),
+    ('by category', 'category=health'),
+    ('by status and category', 'status=under_review&category=security'),
+    ('by reporter', 'user_id={user_id}'),
+    ('unresolved', 'unresolved=1'),
+    ('open critical', 'urgency=critical&unresolved=1'),
+]
+
+PAGE_SIZE = 50
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the report queue queries and fail if any sequentially scans reports_report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic reports first (rolled back afterwards)')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plans are only checked on PostgreSQL')
+        with transaction.atomic():
+            user_id = self.seed(options['seed']) if options['seed'] else None
+            failures = self.explain_queues(user_id)
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(f"Sequential scan on reports_report in: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('All report queue queries use an index'))
+
+    def seed(self, count):
+        users = seed_reporters(prefix='explain-report-queues')
+        seed_reports(count, users)
+        self.stdout.write(f'Seeded {count} reports')
+        return users[0].id
+
+    def explain_queues(self, user_id):
+        user_id = user_id or Report.objects.values_list('user_id', flat=True).first() or 0
+        failures = []
+        for name, query in QUEUE_QUERIES:
+            params = QueryDict(query.format(user_id=user_id))
+            queryset = filter_reports(Report.objects.for_list(), params).order_by('-created_at', '-id')
+            plan = queryset[:PAGE_SIZE].explain()
+            seq_scan = 'Seq Scan on reports_report' in plan
+            if seq_scan:
+                failures.append(name)
+            self.stdout.write(f"{'SEQ SCAN' if seq_scan else 'ok':8} {name}")
+            if self.verbosity > 1:
+                self.stdout.write(plan)
+        return failures
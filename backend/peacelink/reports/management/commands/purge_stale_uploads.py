@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from peacelink.reports.uploads import purge_stale
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable report uploads left unfinished past REPORT_UPLOAD_EXPIRY_HOURS'
+
+    def handle(self, *args, **options):
+        removed = purge_stale()
+        self.stdout.write(f'Removed {removed} stale uploads')
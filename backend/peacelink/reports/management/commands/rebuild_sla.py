@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from peacelink.reports import sla
+
+
+class Command(BaseCommand):
+    help = 'Recompute report SLA durations and latency sketches from the status history'
+
+    def handle(self, *args, **options):
+        covered = sla.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt SLA metrics for {covered} reports'))
@@ -0,0 +1,44 @@
+"""
+Synthetic reports for the benchmark and EXPLAIN commands (PostgreSQL only)
+"""
+from django.db import connection
+
+from peacelink.reports.models import Report
+from peacelink.users.models import User
+
+
+def pick(choices, position):
+    values = ', '.join(f"'{value}'" for value, _ in choices)
+    return f'(ARRAY[{values}])[1 + mod({position}, {len(choices)})]'
+
+
+def seed_reporters(count=3, prefix='seed-reporter'):
+    """A few reporters so user_id is not a single value"""
+    return [User.objects.get_or_create(username=f'{prefix}-{n}')[0] for n in range(count)]
+
+
+def seed_reports(count, users, start=0):
+    """Copy one template report `count` times with varied status, category, urgency and age
+
+    Rows are 30 seconds apart, newest first; pass `start` to append older rows
+    to an earlier batch. Run inside a transaction that is rolled back.
+    """
+    template = Report.objects.create(user=users[0], category='other', location='Juba', description='Seed')
+    columns = [f.column for f in Report._meta.concrete_fields if not f.primary_key]
+    overrides = {
+        'status': pick(Report.STATUS_CHOICES, 'g'),
+        'category': pick(Report.CATEGORY_CHOICES, 'g / 9'),
+        # Critical reports are the small hot subset the partial index targets
+        'urgency': "CASE WHEN mod(g, 50) = 0 THEN 'critical' ELSE " + pick(Report.URGENCY_CHOICES[1:], 'g') + ' END',
+        'user_id': f"(ARRAY[{', '.join(str(u.id) for u in users)}])[1 + mod(g, {len(users)})]",
+        'created_at': "now() - g * interval '30 seconds'",
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO reports_report ({', '.join(columns)}) "
+            f"SELECT {', '.join(overrides.get(c, c) for c in columns)} "
+            f"FROM reports_report, generate_series(%s, %s) AS g WHERE id = %s",
+            [start + 1, start + count, template.id],
+        )
+        cursor.execute('DELETE FROM reports_report WHERE id = %s', [template.id])
+        cursor.execute('ANALYZE reports_report')
@@ -0,0 +1,100 @@
+"""
+Clustered report tiles for the conflict map
+
+Each XYZ tile is answered with one GROUP BY over the reports inside it,
+bucketed by a geohash prefix sized to the zoom level, so the browser gets
+a few dozen clusters instead of every point. Tiles are cached and the
+tiles containing a report are invalidated at every zoom when it is saved,
+along with the tiles it was in before it moved or changed category.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
+from django.db.models.functions import Substr
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import geo
+from .models import Report
+
+TILE_TIMEOUT = getattr(settings, 'MAP_TILE_CACHE_TIMEOUT', 60 * 60)
+
+
+def _tile_key(z, x, y, category):
+    return f'reports:tile:{z}:{x}:{y}:{category or "all"}'
+
+
+def tile_clusters(z, x, y, category=None):
+    """Clusters of located reports in a tile: centroid, count and critical count"""
+    key = _tile_key(z, x, y, category)
+    clusters = cache.get(key)
+    if clusters is not None:
+        return clusters
+
+    south, west, north, east = geo.tile_bounds(z, x, y)
+    queryset = Report.objects.within_bbox(south, west, north, east)
+    if category:
+        queryset = queryset.filter(category=category)
+    rows = queryset.order_by().annotate(
+        cell=Substr('geohash', 1, geo.cluster_precision(z))
+    ).values('cell').annotate(
+        count=Count('id'),
+        lat=Avg('latitude'),
+        lng=Avg('longitude'),
+        critical=Count('id', filter=Q(urgency='critical')),
+    )
+    clusters = [
+        {
+            'geohash': row['cell'],
+            'count': row['count'],
+            'critical': row['critical'],
+            'latitude': round(float(row['lat']), 6),
+            'longitude': round(float(row['lng']), 6),
+        }
+        for row in rows
+    ]
+    cache.set(key, clusters, TILE_TIMEOUT)
+    return clusters
+
+
+def invalidate_point(lat, lng, categories):
+    keys = []
+    for z in range(geo.MAX_ZOOM + 1):
+        x, y = geo.point_tile(lat, lng, z)
+        keys += [_tile_key(z, x, y, category) for category in (None, *categories)]
+    cache.delete_many(keys)
+
+
+TILE_FIELDS = {'latitude', 'longitude', 'category'}
+
+
+@receiver(pre_save, sender=Report)
+def locate_report(sender, instance, raw=False, update_fields=None, **kwargs):
+    # New reports without coordinates are placed at the reporter's location, unless anonymous
+    if (
+        instance._state.adding and not raw and not instance.anonymous_report
+        and instance.latitude is None and instance.longitude is None
+    ):
+        instance.latitude = instance.user.latitude
+        instance.longitude = instance.user.longitude
+    if not instance._state.adding and not raw and (update_fields is None or TILE_FIELDS & set(update_fields)):
+        # The tiles the report is leaving, invalidated after the save
+        instance._tile_values = (
+            Report.objects.filter(pk=instance.pk, geohash__gt='').values_list(*sorted(TILE_FIELDS)).first()
+        )
+    if instance.latitude is not None and instance.longitude is not None:
+        instance.geohash = geo.encode(float(instance.latitude), float(instance.longitude))
+    else:
+        instance.geohash = ''
+
+
+@receiver(post_save, sender=Report)
+@receiver(post_delete, sender=Report)
+def invalidate_report_tiles(sender, instance, **kwargs):
+    if instance.geohash:
+        invalidate_point(float(instance.latitude), float(instance.longitude), [instance.category])
+    old = instance.__dict__.pop('_tile_values', None)
+    if old is not None:
+        category, lat, lng = old
+        if (category, lat, lng) != (instance.category, instance.latitude, instance.longitude):
+            invalidate_point(float(lat), float(lng), [category])
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_reportcomment_reportfollower_reportstatushistory_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='report',
+            name='reports_rep_status_c732ef_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='report',
+            name='reports_rep_categor_b7680f_idx',
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['status', '-created_at'], name='reports_rep_status_7dd5e5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['category', '-created_at'], name='reports_rep_categor_75c476_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['status', 'category', '-created_at'], name='reports_rep_status_1777e1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['user', '-created_at'], name='reports_rep_user_id_dcf374_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(condition=models.Q(('status__in', ('submitted', 'under_review', 'verified', 'assigned', 'in_progress', 'escalated'))), fields=['-created_at'], name='report_unresolved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(condition=models.Q(('urgency', 'critical'), ('status__in', ('submitted', 'under_review', 'verified', 'assigned', 'in_progress', 'escalated'))), fields=['-created_at'], name='report_open_critical_idx'),
+        ),
+    ]
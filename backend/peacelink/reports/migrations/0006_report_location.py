@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_queue_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0002_user_alternative_phone_user_bio_and_more'),  # User.latitude, read by 0007
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['geohash'], name='reports_rep_geohash_1bbba6_idx'),
+        ),
+    ]
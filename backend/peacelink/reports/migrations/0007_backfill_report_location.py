@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from peacelink.reports.geo import encode
+
+
+def backfill_location(apps, schema_editor):
+    Report = apps.get_model('reports', 'Report')
+    # Anonymous reports stay unlocated rather than pointing at the reporter's home
+    rows = Report.objects.filter(
+        latitude__isnull=True, anonymous_report=False, user__latitude__isnull=False, user__longitude__isnull=False
+    ).values_list('id', 'user__latitude', 'user__longitude')
+    batch = []
+    for report_id, lat, lng in rows.iterator(chunk_size=2000):
+        batch.append(Report(id=report_id, latitude=lat, longitude=lng, geohash=encode(float(lat), float(lng))))
+        if len(batch) >= 2000:
+            Report.objects.bulk_update(batch, ['latitude', 'longitude', 'geohash'])
+            batch = []
+    if batch:
+        Report.objects.bulk_update(batch, ['latitude', 'longitude', 'geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0006_report_location'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_location, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0007_backfill_report_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minhash', models.BinaryField()),
+                ('similarity', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('duplicate_of', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='reports.report')),
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='signature', to='reports.report')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReportLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=32)),
+                ('window', models.IntegerField()),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='reports.report')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key'], name='reports_rep_key_8f8a54_idx'), models.Index(fields=['window'], name='reports_rep_window_782317_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0009_mediaupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSLA',
+            fields=[
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sla', serialize=False, to='reports.report')),
+                ('time_to_review', models.DurationField(blank=True, null=True)),
+                ('time_to_resolve', models.DurationField(blank=True, null=True)),
+                ('resolved_late', models.BooleanField(null=True)),
+                ('status_durations', models.JSONField(default=dict)),
+                ('status_since', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LatencySketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('review', 'Time to review'), ('resolve', 'Time to resolve')], max_length=16)),
+                ('dimension', models.CharField(blank=True, max_length=16)),
+                ('key', models.CharField(blank=True, max_length=64)),
+                ('day', models.DateField()),
+                ('bin', models.IntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metric', 'dimension', 'day', 'key', 'bin'), name='latency_sketch_unique')],
+            },
+        ),
+    ]
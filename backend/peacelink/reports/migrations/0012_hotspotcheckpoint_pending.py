@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0011_hotspots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotspotcheckpoint',
+            name='pending',
+            field=models.JSONField(default=dict),
+        ),
+    ]
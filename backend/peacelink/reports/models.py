@@ -1,5 +1,46 @@
+import uuid
+
+from django.contrib.contenttypes.fields import GenericRelation
 from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from peacelink.users.models import User
+from . import geo
+
+# Statuses still waiting on moderators or partners; matches the partial indexes
+OPEN_STATUSES = ('submitted', 'under_review', 'verified', 'assigned', 'in_progress', 'escalated')
+UNRESOLVED = Q(status__in=OPEN_STATUSES)
+OPEN_CRITICAL = Q(urgency='critical') & UNRESOLVED
+
+
+class ReportQuerySet(models.QuerySet):
+    def for_list(self):
+        """Reporter and media_count for ReportListSerializer in the same query"""
+        # A correlated count (not a JOIN + GROUP BY) so only the rows on the page are counted
+        media = ReportMedia.objects.filter(report=OuterRef('pk')).order_by().values('report')
+        return self.select_related('user').annotate(
+            media_count=Coalesce(Subquery(media.annotate(c=Count('*')).values('c')), 0)
+        )
+
+    def for_detail(self):
+        """Related users, media and media derivatives read by ReportSerializer"""
+        return self.select_related('user', 'reviewed_by').prefetch_related('derivatives', 'media_files__derivatives')
+
+    def unresolved(self):
+        return self.filter(UNRESOLVED)
+
+    def within_bbox(self, south, west, north, east):
+        """Reports inside the box, narrowed first by geohash ranges on the geohash index"""
+        cells = Q()
+        for prefix in geo.cover(south, west, north, east):
+            upper = geo.prefix_upper_bound(prefix)
+            cells |= Q(geohash__gte=prefix, geohash__lt=upper) if upper else Q(geohash__gte=prefix)
+        return self.filter(
+            cells,
+            latitude__gte=south, latitude__lte=north,
+            longitude__gte=west, longitude__lte=east,
+        )
+
 
 class Report(models.Model):
     CATEGORY_CHOICES = [
@@ -60,12 +101,16 @@ class Report(models.Model):
     # Location & Timing
     location = models.CharField(max_length=255)
     nearest_landmark = models.CharField(max_length=255, blank=True)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, editable=False)  # Set from latitude/longitude
     incident_date = models.DateField(null=True, blank=True)
     urgency = models.CharField(max_length=20, choices=URGENCY_CHOICES, default='medium')
     
     # Description
     description = models.TextField()
     audio_recording = models.FileField(upload_to='reports/audio/', null=True, blank=True)
+    derivatives = GenericRelation('media.MediaDerivative')  # Transcoded audio, see peacelink.media
     
     # Impact
     people_affected = models.IntegerField(null=True, blank=True)
@@ -98,14 +143,23 @@ class Report(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ReportQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        # Shaped after the moderator queues in ReportListCreate, which filter
+        # on these columns and page by -created_at
         indexes = [
             models.Index(fields=['-created_at']),
-            models.Index(fields=['status']),
-            models.Index(fields=['category']),
+            models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['category', '-created_at']),
+            models.Index(fields=['status', 'category', '-created_at']),
+            models.Index(fields=['user', '-created_at']),
             models.Index(fields=['assigned_to']),
             models.Index(fields=['urgency']),
+            models.Index(fields=['geohash']),
+            models.Index(fields=['-created_at'], condition=UNRESOLVED, name='report_unresolved_idx'),
+            models.Index(fields=['-created_at'], condition=OPEN_CRITICAL, name='report_open_critical_idx'),
         ]
 
     def __str__(self):
@@ -156,11 +210,131 @@ class ReportFollower(models.Model):
         return f"{self.user.username} following Report #{self.report.id}"
 
 
+class ReportSignature(models.Model):
+    """MinHash of a report's description and the earlier report it duplicates, if any"""
+    report = models.OneToOneField(Report, on_delete=models.CASCADE, related_name='signature')
+    minhash = models.BinaryField()
+    duplicate_of = models.ForeignKey(Report, on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates')
+    similarity = models.FloatField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Signature for Report #{self.report_id}"
+
+
+class ReportLSHBucket(models.Model):
+    """One LSH band of a report's signature, scoped by category, place and time window"""
+    key = models.CharField(max_length=32)
+    report = models.ForeignKey(Report, on_delete=models.CASCADE, related_name='lsh_buckets')
+    window = models.IntegerField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['key']),
+            models.Index(fields=['window']),
+        ]
+    
+    def __str__(self):
+        return f"{self.key} -> Report #{self.report_id}"
+
+
+class ReportSLA(models.Model):
+    """Review/resolution durations of a report, maintained by reports.sla at each transition"""
+    report = models.OneToOneField(Report, on_delete=models.CASCADE, primary_key=True, related_name='sla')
+    time_to_review = models.DurationField(null=True, blank=True)  # Until the first transition
+    time_to_resolve = models.DurationField(null=True, blank=True)  # Until first resolved
+    resolved_late = models.BooleanField(null=True)  # Resolved after resolution_timeline; None without one
+    status_durations = models.JSONField(default=dict)  # Seconds spent in each status so far
+    status_since = models.DateTimeField()  # Start of the current status
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"SLA for Report #{self.report_id}"
+
+
+class LatencySketch(models.Model):
+    """One bin of a daily DDSketch of review or resolution times, see reports.sla
+
+    Sketches merge by adding counts per bin, so percentiles over any range of
+    days and any grouping are computed from bin sums without touching reports.
+    """
+    METRIC_CHOICES = [
+        ('review', 'Time to review'),
+        ('resolve', 'Time to resolve'),
+    ]
+    
+    metric = models.CharField(max_length=16, choices=METRIC_CHOICES)
+    dimension = models.CharField(max_length=16, blank=True)  # '', category, state or assignee
+    key = models.CharField(max_length=64, blank=True)
+    day = models.DateField()
+    bin = models.IntegerField()
+    count = models.BigIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'dimension', 'day', 'key', 'bin'], name='latency_sketch_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.metric} {self.dimension}={self.key} {self.day} bin {self.bin}: {self.count}"
+
+
+class HotspotBaseline(models.Model):
+    """Checkpointed detector state of one state|county|category key, see reports.hotspots"""
+    key = models.CharField(max_length=200, unique=True)
+    slots = models.BinaryField()  # Packed array('d'): fast count, hour-of-week baseline and stamps
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Hotspot baseline {self.key}"
+
+
+class HotspotCheckpoint(models.Model):
+    """How far the hotspot detector has read the reports; a single row"""
+    last_report_id = models.BigIntegerField(default=0)  # Every report up to here is read or never committed
+    pending = models.JSONField(default=dict)  # Reports read above last_report_id, id -> created_at in hours
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Hotspot detector at Report #{self.last_report_id}"
+
+
 class ReportMedia(models.Model):
     report = models.ForeignKey(Report, on_delete=models.CASCADE, related_name='media_files')
     file = models.FileField(upload_to='reports/media/')
     file_type = models.CharField(max_length=10, choices=[('image', 'Image'), ('video', 'Video')])
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    derivatives = GenericRelation('media.MediaDerivative')  # WebP sizes or video posters, see peacelink.media
     
     def __str__(self):
         return f"{self.file_type} for Report #{self.report.id}"
+
+
+class MediaUpload(models.Model):
+    """A resumable upload of one report media file, see reports.uploads"""
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report = models.ForeignKey(Report, on_delete=models.CASCADE, related_name='uploads')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='media_uploads')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True)  # Hex SHA-256 announced by the client
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    media = models.OneToOneField(ReportMedia, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} for Report #{self.report_id} ({self.offset}/{self.size})"
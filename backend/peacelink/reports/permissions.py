@@ -0,0 +1,25 @@
+"""
+Role checks for the report endpoints that only some users may call
+"""
+from rest_framework.permissions import BasePermission
+
+TRIAGE_ROLES = ('moderator', 'admin')
+EXPORT_ROLES = ('ngo', 'moderator', 'admin')
+
+
+class HasRole(BasePermission):
+    """Signed-in users whose role is one of `roles`; anonymous users are refused"""
+    roles = ()
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.role in self.roles
+
+
+class IsModerator(HasRole):
+    roles = TRIAGE_ROLES
+    message = 'Only moderators can change report status'
+
+
+class IsPartner(HasRole):
+    roles = EXPORT_ROLES
+    message = 'Only partner agencies and moderators can see report exports and metrics'
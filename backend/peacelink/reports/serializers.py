@@ -1,11 +1,14 @@
 from rest_framework import serializers
 from .models import Report, ReportMedia
+from peacelink.media.serializers import DerivativesField
 from peacelink.users.models import User
 
 class ReportMediaSerializer(serializers.ModelSerializer):
+    derivatives = DerivativesField()
+    
     class Meta:
         model = ReportMedia
-        fields = ['id', 'file', 'file_type', 'uploaded_at']
+        fields = ['id', 'file', 'file_type', 'uploaded_at', 'derivatives']
 
 class UserBasicSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,16 +19,17 @@ class ReportSerializer(serializers.ModelSerializer):
     user_info = UserBasicSerializer(source='user', read_only=True)
     media_files = ReportMediaSerializer(many=True, read_only=True)
     reviewed_by_info = UserBasicSerializer(source='reviewed_by', read_only=True)
+    derivatives = DerivativesField()
     
     class Meta:
         model = Report
         fields = [
             'id', 'user', 'user_info', 'category', 'language', 'location', 
-            'nearest_landmark', 'incident_date', 'urgency', 'description', 
+            'latitude', 'longitude', 'nearest_landmark', 'incident_date', 'urgency', 'description', 
             'audio_recording', 'people_affected', 'contact_preference', 
             'contact_number', 'related_report_id', 'anonymous_report', 
             'photo', 'status', 'trusted', 'reviewed_by', 'reviewed_by_info',
-            'reviewed_at', 'created_at', 'updated_at', 'media_files'
+            'reviewed_at', 'created_at', 'updated_at', 'media_files', 'derivatives'
         ]
         read_only_fields = ['user', 'created_at', 'updated_at', 'reviewed_at']
     
@@ -38,12 +42,14 @@ class ReportListSerializer(serializers.ModelSerializer):
     media_count = serializers.SerializerMethodField()
     
     def get_media_count(self, obj):
+        if hasattr(obj, 'media_count'):
+            return obj.media_count
         return obj.media_files.count()
     
     class Meta:
         model = Report
         fields = [
-            'id', 'user_info', 'category', 'location', 'urgency', 
+            'id', 'user_info', 'category', 'location', 'latitude', 'longitude', 'urgency', 
             'description', 'status', 'trusted', 'anonymous_report',
             'created_at', 'people_affected', 'media_count'
         ]
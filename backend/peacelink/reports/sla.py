@@ -0,0 +1,203 @@
+"""
+Report review and resolution SLA metrics
+
+transition_reports hands every batch of moved reports to
+record_transitions. Each report's ReportSLA row accumulates the time
+spent in each status and keeps its time to review (until the first
+transition, when reviewed_at is set) and time to resolve (until it is
+first resolved). Each new review or resolution time is also added to that
+day's DDSketches overall and per category, reporter's state and assignee.
+
+A DDSketch counts values in logarithmic bins, so every quantile it
+reports is within RELATIVE_ACCURACY of the true value. Sketches merge by
+summing counts per bin, so p50/p90/p99 over any range of days come from
+one GROUP BY over at most a few thousand bin rows, never from a scan of
+reports or their history. `manage.py rebuild_sla` recomputes everything
+from ReportStatusHistory.
+"""
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import LatencySketch, Report, ReportSLA, ReportStatusHistory
+
+RELATIVE_ACCURACY = 0.01  # Stored bins depend on this; run rebuild_sla after changing it
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+MIN_SECONDS = 1.0
+
+# Sketch dimension -> Report lookup; every sample is also added to the '' (overall) sketch
+DIMENSIONS = {'category': 'category', 'state': 'user__state', 'assignee': 'assigned_to_id'}
+QUANTILES = (0.5, 0.9, 0.99)
+REBUILD_BATCH = 1000
+UPSERT_BATCH = 500
+
+
+def bin_index(seconds):
+    return math.ceil(math.log(max(seconds, MIN_SECONDS)) / LOG_GAMMA)
+
+
+def bin_value(index):
+    """Representative value of a bin, within RELATIVE_ACCURACY of anything counted in it"""
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+def quantiles(bins, qs=QUANTILES):
+    """{q: seconds} from (bin, count) pairs of one merged sketch; None values when it is empty"""
+    bins = sorted((index, count) for index, count in bins if count > 0)
+    total = sum(count for _, count in bins)
+    result = dict.fromkeys(qs)
+    if not total:
+        return result
+    for q in qs:
+        rank = q * (total - 1)
+        cumulative = 0
+        for index, count in bins:
+            cumulative += count
+            if cumulative > rank:
+                result[q] = bin_value(index)
+                break
+    return result
+
+
+def _report_rows(report_ids):
+    fields = ['id', 'created_at', 'resolution_timeline', *DIMENSIONS.values()]
+    return {row['id']: row for row in Report.objects.filter(id__in=report_ids).values(*fields)}
+
+
+def _apply(sla, row, old_status, new_status, when, samples):
+    """Advance `sla` through one transition, appending (metric, row, seconds, day) samples"""
+    spent = max((when - sla.status_since).total_seconds(), 0)
+    sla.status_durations[old_status] = sla.status_durations.get(old_status, 0) + spent
+    sla.status_since = when
+    day = timezone.localdate(when)
+    if sla.time_to_review is None:
+        sla.time_to_review = when - row['created_at']
+        samples.append(('review', row, sla.time_to_review.total_seconds(), day))
+    if new_status == 'resolved' and sla.time_to_resolve is None:
+        sla.time_to_resolve = when - row['created_at']
+        if row['resolution_timeline'] is not None:
+            sla.resolved_late = when > row['resolution_timeline']
+        samples.append(('resolve', row, sla.time_to_resolve.total_seconds(), day))
+
+
+def _sketch_keys(row):
+    yield '', ''
+    for dimension, path in DIMENSIONS.items():
+        if row[path] not in (None, ''):
+            yield dimension, str(row[path])[:64]
+
+
+def add_samples(samples):
+    """Add (metric, report row, seconds, day) samples to the daily sketches"""
+    counts = Counter()
+    for metric, row, seconds, day in samples:
+        index = bin_index(seconds)
+        for dimension, key in _sketch_keys(row):
+            counts[(metric, dimension, key, day, index)] += 1
+    if not counts:
+        return
+    qn = connection.ops.quote_name
+    table = qn(LatencySketch._meta.db_table)
+    columns = ', '.join(qn(column) for column in ('metric', 'dimension', 'day', 'key', 'bin'))
+    rows = list(counts.items())
+    for start in range(0, len(rows), UPSERT_BATCH):
+        batch = rows[start:start + UPSERT_BATCH]
+        params = []
+        for (metric, dimension, key, day, index), count in batch:
+            params += [metric, dimension, connection.ops.adapt_datefield_value(day), key, index, count]
+        sql = (
+            f'INSERT INTO {table} ({columns}, {qn("count")}) VALUES '
+            + ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(batch))
+            + f' ON CONFLICT ({columns}) DO UPDATE SET {qn("count")} = {table}.{qn("count")} + EXCLUDED.{qn("count")}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+def record_transitions(moved, new_status, when):
+    """Update SLA rows and sketches for (report_id, old_status) pairs just moved to `new_status`
+
+    Called by transition_reports inside its transaction, with the reports locked.
+    """
+    rows = _report_rows([report_id for report_id, _ in moved])
+    existing = ReportSLA.objects.in_bulk([report_id for report_id, _ in moved])
+    created, updated, samples = [], [], []
+    for report_id, old_status in moved:
+        sla = existing.get(report_id)
+        if sla is None:
+            sla = ReportSLA(report_id=report_id, status_since=rows[report_id]['created_at'])
+            created.append(sla)
+        else:
+            updated.append(sla)
+        _apply(sla, rows[report_id], old_status, new_status, when, samples)
+        sla.updated_at = when
+    ReportSLA.objects.bulk_create(created)
+    ReportSLA.objects.bulk_update(updated, [
+        'time_to_review', 'time_to_resolve', 'resolved_late', 'status_durations', 'status_since', 'updated_at',
+    ])
+    add_samples(samples)
+
+
+def percentiles(metric, dimension='', days=30, end=None, qs=QUANTILES):
+    """Quantiles in seconds of `metric` over the `days` days ending `end` (today), per key of `dimension`
+
+    Returns [{'key', 'count', q: seconds, ...}] ordered by count, largest first.
+    """
+    end = end or timezone.localdate()
+    bins = (
+        LatencySketch.objects.filter(
+            metric=metric, dimension=dimension, day__gt=end - timedelta(days=days), day__lte=end,
+        )
+        .values('key', 'bin').annotate(total=Sum('count')).order_by()
+    )
+    merged = defaultdict(list)
+    for row in bins:
+        merged[row['key']].append((row['bin'], row['total']))
+    results = [
+        {'key': key, 'count': sum(count for _, count in sketch), **quantiles(sketch, qs)}
+        for key, sketch in merged.items()
+    ]
+    return sorted(results, key=lambda result: (-result['count'], result['key']))
+
+
+def rebuild():
+    """Recompute every ReportSLA row and sketch from ReportStatusHistory, returns reports covered"""
+    history = (
+        ReportStatusHistory.objects.order_by('report_id', 'created_at', 'id')
+        .values_list('report_id', 'old_status', 'new_status', 'created_at')
+    )
+    covered = 0
+    with transaction.atomic():
+        ReportSLA.objects.all().delete()
+        LatencySketch.objects.all().delete()
+        batch = []
+        for report_id, transitions in groupby(history.iterator(), key=lambda entry: entry[0]):
+            batch.append((report_id, list(transitions)))
+            if len(batch) >= REBUILD_BATCH:
+                covered += _rebuild_batch(batch)
+                batch = []
+        covered += _rebuild_batch(batch)
+    return covered
+
+
+def _rebuild_batch(batch):
+    rows = _report_rows([report_id for report_id, _ in batch])
+    slas, samples = [], []
+    for report_id, transitions in batch:
+        row = rows.get(report_id)
+        if row is None:
+            continue
+        sla = ReportSLA(report_id=report_id, status_since=row['created_at'])
+        for _, old_status, new_status, when in transitions:
+            _apply(sla, row, old_status, new_status, when, samples)
+        sla.updated_at = transitions[-1][3]
+        slas.append(sla)
+    ReportSLA.objects.bulk_create(slas)
+    add_samples(samples)
+    return len(slas)
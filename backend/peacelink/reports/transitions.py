@@ -0,0 +1,93 @@
+"""
+Report status state machine
+
+Every status change, single or bulk, goes through transition_reports: the
+reports are locked, each move is checked against ALLOWED_TRANSITIONS, the
+history rows are written with one bulk_create, the reports are updated
+with one UPDATE, their SLA durations and sketches are advanced (see
+reports.sla), and the reporters and followers are notified as one batch
+once the transaction commits.
+"""
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from peacelink.analytics import rollups
+
+from . import sla
+from .models import Report, ReportStatusHistory
+
+ALLOWED_TRANSITIONS = {
+    'submitted': {'under_review', 'verified', 'rejected', 'escalated'},
+    'under_review': {'verified', 'rejected', 'escalated'},
+    'verified': {'assigned', 'in_progress', 'escalated', 'closed'},
+    'assigned': {'in_progress', 'escalated', 'resolved'},
+    'in_progress': {'resolved', 'escalated'},
+    'escalated': {'assigned', 'in_progress', 'resolved'},
+    'resolved': {'closed', 'in_progress'},
+    'closed': {'under_review'},
+    'rejected': {'under_review'},
+}
+
+
+def can_transition(old_status, new_status):
+    return new_status in ALLOWED_TRANSITIONS.get(old_status, ())
+
+
+def transition_reports(report_ids, new_status, changed_by=None, notes=''):
+    """Move reports to `new_status`
+
+    Returns (updated_ids, rejected) where rejected maps each report id that
+    was not moved to the reason.
+    """
+    report_ids = list(dict.fromkeys(report_ids))
+    rejected = {}
+    with transaction.atomic():
+        rows = list(
+            Report.objects.select_for_update().filter(id__in=report_ids)
+            .order_by('id').values_list('id', 'status', 'user_id', 'category')
+        )
+        found = {row[0] for row in rows}
+        for report_id in report_ids:
+            if report_id not in found:
+                rejected[report_id] = 'Report not found'
+        moved = []
+        for report_id, old_status, user_id, category in rows:
+            if can_transition(old_status, new_status):
+                moved.append((report_id, old_status, user_id, category))
+            else:
+                rejected[report_id] = f'Cannot move from {old_status} to {new_status}'
+        if not moved:
+            return [], rejected
+
+        now = timezone.now()
+        ReportStatusHistory.objects.bulk_create([
+            ReportStatusHistory(report_id=report_id, old_status=old_status, new_status=new_status,
+                                changed_by=changed_by, notes=notes)
+            for report_id, old_status, _, _ in moved
+        ])
+        updated_ids = [report_id for report_id, *_ in moved]
+        changes = {
+            'status': new_status,
+            'updated_at': now,
+            'reviewed_at': Coalesce(F('reviewed_at'), Value(now)),
+        }
+        if changed_by is not None:
+            changes['reviewed_by'] = changed_by
+        if new_status == 'resolved':
+            changes['resolved_at'] = now
+        rollups.record_update('reports', Report.objects.filter(id__in=updated_ids), status=new_status)
+        Report.objects.filter(id__in=updated_ids).update(**changes)
+        sla.record_transitions([(report_id, old_status) for report_id, old_status, _, _ in moved], new_status, now)
+
+        transaction.on_commit(lambda: _notify(moved, new_status))
+    return updated_ids, rejected
+
+
+def _notify(moved, new_status):
+    from peacelink.notifications.utils import notify_report_status_changes
+
+    notify_report_status_changes(
+        [(report_id, user_id, category) for report_id, _, user_id, category in moved], new_status
+    )
@@ -0,0 +1,157 @@
+"""
+Resumable, chunked report media uploads
+
+Modelled on the tus protocol: a client creates a MediaUpload announcing
+the total size and SHA-256, then PATCHes chunks at the current offset
+until the file is complete, asking for the offset with HEAD after a
+dropped connection. Chunks are streamed from the request straight onto a
+partial file on disk, never buffered whole. Once the last byte arrives
+the checksum is verified and the file is moved into media storage as a
+ReportMedia row. Uploads idle for longer than REPORT_UPLOAD_EXPIRY_HOURS
+are removed by `manage.py purge_stale_uploads`.
+"""
+import fcntl
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from .models import MediaUpload, ReportMedia
+
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunk or upload that cannot be accepted; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_upload_dir():
+    return getattr(settings, 'REPORT_UPLOAD_DIR', os.path.join(settings.MEDIA_ROOT, 'partial_uploads'))
+
+
+def get_max_size():
+    return getattr(settings, 'REPORT_UPLOAD_MAX_SIZE', 500 * 1024 * 1024)
+
+
+def get_max_chunk_size():
+    return getattr(settings, 'REPORT_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+
+
+def get_expiry():
+    return timedelta(hours=getattr(settings, 'REPORT_UPLOAD_EXPIRY_HOURS', 24))
+
+
+def media_type(content_type):
+    """ReportMedia.file_type for a MIME type, or None if it is not accepted"""
+    if content_type.startswith('image/'):
+        return 'image'
+    if content_type.startswith('video/'):
+        return 'video'
+    return None
+
+
+def partial_path(upload):
+    return os.path.join(get_upload_dir(), f'{upload.id}.part')
+
+
+def append_chunk(upload, stream, offset, length):
+    """Stream `length` bytes from `stream` onto the upload at `offset`; returns the new offset"""
+    if length > get_max_chunk_size():
+        raise UploadError('Chunk too large', status=413)
+    if offset + length > upload.size:
+        raise UploadError('Chunk runs past the announced size', status=413)
+
+    os.makedirs(get_upload_dir(), exist_ok=True)
+    with open(partial_path(upload), 'ab') as part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError('Another chunk is being written', status=423)
+        # Re-read under the lock in case a concurrent request just moved the offset
+        upload.refresh_from_db(fields=['offset', 'status'])
+        if upload.status != 'uploading':
+            raise UploadError('Upload is not accepting data', status=409)
+        if offset != upload.offset:
+            raise UploadError('Offset does not match the upload', status=409)
+        if os.fstat(part.fileno()).st_size < offset:
+            raise UploadError('Partial file is missing; the upload must be restarted', status=410)
+        # Drop anything a dropped request wrote past the recorded offset
+        part.truncate(offset)
+        part.seek(offset)
+        remaining = length
+        while remaining:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            part.write(data)
+            remaining -= len(data)
+        part.flush()
+        new_offset = part.tell()
+
+    MediaUpload.objects.filter(pk=upload.pk).update(offset=new_offset, updated_at=timezone.now())
+    upload.offset = new_offset
+    if remaining:
+        raise UploadError('Chunk ended early; resume from the returned offset', status=400)
+    if new_offset == upload.size:
+        finish(upload)
+    return new_offset
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finish(upload):
+    """Verify the completed file and attach it to the report as ReportMedia"""
+    path = partial_path(upload)
+    if upload.checksum and file_checksum(path) != upload.checksum.lower():
+        os.remove(path)
+        MediaUpload.objects.filter(pk=upload.pk).update(status='failed', updated_at=timezone.now())
+        upload.status = 'failed'
+        raise UploadError('Checksum mismatch; the upload must be restarted', status=460)
+
+    media = ReportMedia(report_id=upload.report_id, file_type=media_type(upload.content_type))
+    with open(path, 'rb') as part:
+        media.file.save(os.path.basename(upload.filename), File(part), save=False)
+    media.save()
+    os.remove(path)
+    MediaUpload.objects.filter(pk=upload.pk).update(status='complete', media=media, updated_at=timezone.now())
+    upload.status, upload.media = 'complete', media
+    return media
+
+
+def purge_stale():
+    """Delete unfinished uploads idle past the expiry, their partial files and orphaned files
+
+    Returns the number of uploads removed.
+    """
+    cutoff = timezone.now() - get_expiry()
+    stale = MediaUpload.objects.filter(status__in=('uploading', 'failed'), updated_at__lt=cutoff)
+    removed = 0
+    for upload in stale.iterator():
+        try:
+            os.remove(partial_path(upload))
+        except FileNotFoundError:
+            pass
+        removed += 1
+    stale.delete()
+
+    upload_dir = get_upload_dir()
+    if os.path.isdir(upload_dir):
+        live = {f'{pk}.part' for pk in MediaUpload.objects.filter(status='uploading').values_list('id', flat=True)}
+        for name in os.listdir(upload_dir):
+            path = os.path.join(upload_dir, name)
+            if name not in live and os.path.getmtime(path) < cutoff.timestamp():
+                os.remove(path)
+    return removed
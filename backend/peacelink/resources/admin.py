@@ -1,3 +1,4 @@
 from django.contrib import admin
-from .models import Resource
+from .models import Resource, Tag
 admin.site.register(Resource)
+admin.site.register(Tag)
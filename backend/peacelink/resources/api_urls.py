@@ -4,4 +4,5 @@ from . import api_views
 urlpatterns = [
     path('', api_views.ResourceListCreate.as_view()),
     path('<int:pk>/', api_views.ResourceRetrieveUpdateDestroy.as_view()),
+    path('facets/', api_views.resource_facets),
 ]
@@ -2,59 +2,79 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from .models import Resource, ResourceBookmark
+from .tags import tag_slug
 from .serializers import ResourceSerializer, ResourceListSerializer
-from django.db.models import Q
+from peacelink.analytics import counters
+from peacelink.pagination import SearchResultsPagination
+from .search import search_resources
+
+def filter_resources(queryset, params):
+    """Apply the library's category/type/language/featured/tag/search filters"""
+    category = params.get('category', None)
+    resource_type = params.get('type', None)
+    language = params.get('language', None)
+    search = params.get('search', None)
+    featured = params.get('featured', None)
+    
+    if category:
+        queryset = queryset.filter(category=category)
+    if resource_type:
+        queryset = queryset.filter(resource_type=resource_type)
+    if language:
+        queryset = queryset.filter(language=language)
+    if featured:
+        queryset = queryset.filter(featured=True)
+    for tag in params.getlist('tag'):
+        queryset = queryset.with_tag(tag_slug(tag))
+    if search:
+        queryset = search_resources(queryset, search)
+    
+    return queryset
 
 class ResourceListCreate(generics.ListCreateAPIView):
+    @property
+    def pagination_class(self):
+        if self.request.query_params.get('search'):
+            return SearchResultsPagination
+        return super().pagination_class
+    
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return ResourceListSerializer
         return ResourceSerializer
     
     def get_queryset(self):
-        queryset = Resource.objects.filter(verified=True)
-        category = self.request.query_params.get('category', None)
-        resource_type = self.request.query_params.get('type', None)
-        language = self.request.query_params.get('language', None)
-        search = self.request.query_params.get('search', None)
-        featured = self.request.query_params.get('featured', None)
-        
-        if category:
-            queryset = queryset.filter(category=category)
-        if resource_type:
-            queryset = queryset.filter(resource_type=resource_type)
-        if language:
-            queryset = queryset.filter(language=language)
-        if featured:
-            queryset = queryset.filter(featured=True)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search) |
-                Q(tags__icontains=search) |
-                Q(author__icontains=search)
-            )
-        
-        return queryset
+        queryset = Resource.objects.filter(verified=True).with_bookmark_flag(self.request.user)
+        return filter_resources(queryset, self.request.query_params)
 
 class ResourceRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Resource.objects.all()
     serializer_class = ResourceSerializer
     
+    def get_queryset(self):
+        return Resource.objects.with_bookmark_flag(self.request.user).prefetch_related('tag_set')
+    
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        # Increment view count
-        instance.view_count += 1
-        instance.save(update_fields=['view_count'])
+        counters.increment(instance, 'view_count')
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
+@api_view(['GET'])
+def resource_facets(request):
+    """Counts per category, language, type and tag for the filtered library"""
+    queryset = filter_resources(Resource.objects.filter(verified=True), request.query_params)
+    facets = {'category': [], 'language': [], 'type': [], 'tag': []}
+    for row in queryset.facet_counts():
+        facets[row['facet']].append({'value': row['value'], 'count': row['count']})
+    for counts in facets.values():
+        counts.sort(key=lambda item: -item['count'])
+    return Response(facets)
+
 @api_view(['POST'])
 def download_resource(request, resource_id):
     try:
         resource = Resource.objects.get(id=resource_id)
-        resource.download_count += 1
-        resource.save(update_fields=['download_count'])
+        counters.increment(resource, 'download_count')
         return Response({'success': True, 'download_count': resource.download_count})
     except Resource.DoesNotExist:
         return Response({'error': 'Resource not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -77,6 +97,6 @@ def bookmark_resource(request, resource_id):
 
 @api_view(['GET'])
 def my_bookmarks(request):
-    bookmarks = Resource.objects.filter(bookmarks__user=request.user)
+    bookmarks = Resource.objects.filter(bookmarks__user=request.user).with_bookmark_flag(request.user)
     serializer = ResourceListSerializer(bookmarks, many=True, context={'request': request})
     return Response(serializer.data)
@@ -1,3 +1,6 @@
 from django.apps import AppConfig
 class ResourcesConfig(AppConfig):
     name = 'peacelink.resources'
+
+    def ready(self):
+        from . import search, tags  # noqa: F401 - connects the search vector and tag signals
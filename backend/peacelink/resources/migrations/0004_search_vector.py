@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:28
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def build_search_index(apps, schema_editor):
+    # GIN index and backfill only exist on PostgreSQL; other backends search in-process
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX resources_resource_search_gin ON resources_resource USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        "UPDATE resources_resource SET search_vector = "
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(tags, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(author, '')), 'C') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'D')"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS resources_resource_search_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0003_resourcebookmark_alter_resource_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
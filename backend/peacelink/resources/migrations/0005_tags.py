@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0004_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('slug', models.SlugField(allow_unicode=True, max_length=60, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResourceTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_tags', to='resources.resource')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_tags', to='resources.tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, related_name='resources', through='resources.ResourceTag', to='resources.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcetag',
+            index=models.Index(fields=['tag', 'resource'], name='resources_r_tag_id_87d5b8_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='resourcetag',
+            unique_together={('resource', 'tag')},
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+from django.utils.text import slugify
+
+
+def populate_tags(apps, schema_editor):
+    Resource = apps.get_model('resources', 'Resource')
+    Tag = apps.get_model('resources', 'Tag')
+    ResourceTag = apps.get_model('resources', 'ResourceTag')
+
+    tags = {}  # slug -> name, first spelling wins
+    links = set()
+    for resource_id, value in Resource.objects.exclude(tags='').values_list('id', 'tags').iterator():
+        for name in value.split(','):
+            name = name.strip()[:50]
+            slug = slugify(name, allow_unicode=True)
+            if slug:
+                tags.setdefault(slug, name)
+                links.add((resource_id, slug))
+
+    Tag.objects.bulk_create([Tag(name=name, slug=slug) for slug, name in tags.items()], batch_size=1000)
+    tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+    ResourceTag.objects.bulk_create(
+        [ResourceTag(resource_id=resource_id, tag_id=tag_ids[slug]) for resource_id, slug in links],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0005_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_tags, migrations.RunPython.noop),
+    ]
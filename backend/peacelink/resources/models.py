@@ -1,6 +1,46 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Count, Exists, F, OuterRef, Value
 from peacelink.users.models import User
 
+
+class ResourceQuerySet(models.QuerySet):
+    def with_bookmark_flag(self, user=None):
+        """Annotate is_bookmarked for `user` as an EXISTS subquery"""
+        if user is not None and user.is_authenticated:
+            is_bookmarked = Exists(ResourceBookmark.objects.filter(resource=OuterRef('pk'), user=user))
+        else:
+            is_bookmarked = Value(False)
+        return self.annotate(is_bookmarked=is_bookmarked)
+
+    def with_tag(self, slug):
+        """Resources carrying the tag `slug`, through the ResourceTag index"""
+        return self.filter(tag_set__slug=slug)
+
+    def facet_counts(self):
+        """Per-category, language, type and tag counts as one UNION ALL query"""
+        base = self.order_by()
+        facets = [
+            base.values(facet=Value('category'), value=F('category')).annotate(count=Count('id')),
+            base.values(facet=Value('language'), value=F('language')).annotate(count=Count('id')),
+            base.values(facet=Value('type'), value=F('resource_type')).annotate(count=Count('id')),
+            base.filter(tag_set__isnull=False)
+            .values(facet=Value('tag'), value=F('tag_set__slug')).annotate(count=Count('id')),
+        ]
+        return facets[0].union(*facets[1:], all=True)
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=50)
+    slug = models.SlugField(max_length=60, unique=True, allow_unicode=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
 class Resource(models.Model):
     CATEGORY_CHOICES = [
         ('legal', 'Legal Guides'),
@@ -57,9 +97,16 @@ class Resource(models.Model):
     
     # Additional metadata
     author = models.CharField(max_length=255, blank=True)  # Original author/organization
-    tags = models.CharField(max_length=255, blank=True)  # Comma-separated tags
+    tags = models.CharField(max_length=255, blank=True)  # Comma-separated tags, synced to tag_set
     duration = models.CharField(max_length=20, blank=True)  # For audio/video, e.g., "45 min"
     
+    # Weighted title/tags/author/description vector, maintained by resources.search
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    tag_set = models.ManyToManyField(Tag, through='ResourceTag', related_name='resources', blank=True)
+    
+    objects = ResourceQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-featured', '-created_at']
         indexes = [
@@ -72,6 +119,19 @@ class Resource(models.Model):
     def __str__(self):
         return self.title
 
+class ResourceTag(models.Model):
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='resource_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='resource_tags')
+
+    class Meta:
+        unique_together = ('resource', 'tag')
+        indexes = [
+            models.Index(fields=['tag', 'resource']),
+        ]
+
+    def __str__(self):
+        return f"{self.resource_id}: {self.tag_id}"
+
 class ResourceBookmark(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookmarked_resources')
     resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='bookmarks')
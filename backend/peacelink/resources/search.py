@@ -0,0 +1,124 @@
+"""
+Ranked search over the resource library
+
+On PostgreSQL each Resource carries a weighted tsvector (title A, tags B,
+author C, description D) with a GIN index, refreshed whenever those fields
+are saved. Queries match every term as a prefix so the search box can
+type-ahead, and results are ordered by ts_rank. Other databases (SQLite in
+tests) score candidates in-process by trigram similarity instead.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Resource
+
+# No stemming: resources span languages without a stemmer, and stemmed
+# prefixes ("educat" -> "educ") would make type-ahead unpredictable
+SEARCH_CONFIG = 'simple'
+
+SEARCH_FIELDS = (
+    ('title', 'A', 1.0),
+    ('tags', 'B', 0.4),
+    ('author', 'C', 0.2),
+    ('description', 'D', 0.1),
+)
+
+# Minimum trigram similarity for a term to match in the in-process fallback
+TRIGRAM_THRESHOLD = 0.3
+
+TERM_RE = re.compile(r'\w+')
+
+
+def is_supported():
+    return connection.vendor == 'postgresql'
+
+
+def resource_vector():
+    vector = None
+    for field, weight, _ in SEARCH_FIELDS:
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def terms(text):
+    return TERM_RE.findall(text.lower())
+
+
+def prefix_query(text):
+    """A tsquery requiring every term as a prefix: 'water bore' -> water:* & bore:*"""
+    raw = ' & '.join(f"'{term}':*" for term in terms(text))
+    return SearchQuery(raw, config=SEARCH_CONFIG, search_type='raw')
+
+
+def search_resources(queryset, text):
+    """Resources matching `text`, best matches first"""
+    if not terms(text):
+        return queryset
+    if not is_supported():
+        return _trigram_search(queryset, text)
+
+    query = prefix_query(text)
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=SearchRank(F('search_vector'), query)
+    ).order_by('-search_rank', '-featured', '-created_at')
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def word_similarity(term, words):
+    """Best pg_trgm-style similarity of `term` to any word, prefixes count as exact"""
+    best = 0.0
+    term_grams = trigrams(term)
+    for word in words:
+        if word.startswith(term):
+            return 1.0
+        word_grams = trigrams(word)
+        best = max(best, len(term_grams & word_grams) / len(term_grams | word_grams))
+    return best
+
+
+def trigram_score(query_terms, row):
+    """Weighted score of a row, or 0 unless every term matches some field"""
+    similarities = [
+        [word_similarity(term, terms(value or '')) for term in query_terms]
+        for value in row
+    ]
+    if any(max(column) < TRIGRAM_THRESHOLD for column in zip(*similarities)):
+        return 0.0
+    return sum(
+        weight * sum(field_similarities) / len(query_terms)
+        for (_, _, weight), field_similarities in zip(SEARCH_FIELDS, similarities)
+    )
+
+
+def _trigram_search(queryset, text):
+    query_terms = terms(text)
+    fields = [field for field, _, _ in SEARCH_FIELDS]
+    scores = {}
+    for row in queryset.values_list('id', *fields).iterator():
+        score = trigram_score(query_terms, row[1:])
+        if score:
+            scores[row[0]] = score
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return queryset.filter(id__in=ranked).annotate(
+        search_position=Case(
+            *[When(id=pk, then=Value(position)) for position, pk in enumerate(ranked)],
+            output_field=IntegerField(),
+        )
+    ).order_by('search_position')
+
+
+@receiver(post_save, sender=Resource)
+def update_resource_vector(sender, instance, update_fields=None, **kwargs):
+    fields = {field for field, _, _ in SEARCH_FIELDS}
+    if is_supported() and (update_fields is None or fields & set(update_fields)):
+        Resource.objects.filter(pk=instance.pk).update(search_vector=resource_vector())
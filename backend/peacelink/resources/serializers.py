@@ -13,15 +13,15 @@ class ResourceSerializer(serializers.ModelSerializer):
     tags_list = serializers.SerializerMethodField()
     
     def get_is_bookmarked(self, obj):
+        if hasattr(obj, 'is_bookmarked'):
+            return obj.is_bookmarked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.bookmarks.filter(user=request.user).exists()
         return False
     
     def get_tags_list(self, obj):
-        if obj.tags:
-            return [tag.strip() for tag in obj.tags.split(',')]
-        return []
+        return [tag.name for tag in obj.tag_set.all()]
     
     class Meta:
         model = Resource
@@ -36,6 +36,8 @@ class ResourceListSerializer(serializers.ModelSerializer):
     is_bookmarked = serializers.SerializerMethodField()
     
     def get_is_bookmarked(self, obj):
+        if hasattr(obj, 'is_bookmarked'):
+            return obj.is_bookmarked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.bookmarks.filter(user=request.user).exists()
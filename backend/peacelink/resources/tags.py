@@ -0,0 +1,51 @@
+"""
+Normalized resource tags
+
+Resource.tags stays the comma-separated field clients read and write; on
+save it is parsed into Tag rows linked through ResourceTag, which is what
+tag filtering and facet counts query. Tags are identified by slug so
+"Water", "water " and "WATER" share one row.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils.text import slugify
+
+from .models import Resource, ResourceTag, Tag
+
+
+def tag_slug(name):
+    return slugify(name, allow_unicode=True)
+
+
+def parse_tags(value):
+    """{slug: name} for a comma-separated tag string, first spelling wins"""
+    tags = {}
+    for name in (value or '').split(','):
+        name = name.strip()[:Tag._meta.get_field('name').max_length]
+        slug = tag_slug(name)
+        if slug and slug not in tags:
+            tags[slug] = name
+    return tags
+
+
+def sync_tags(resource):
+    """Point the resource's ResourceTag rows at the tags in resource.tags"""
+    wanted = parse_tags(resource.tags)
+    Tag.objects.bulk_create(
+        [Tag(name=name, slug=slug) for slug, name in wanted.items()],
+        ignore_conflicts=True,
+    )
+    tag_ids = set(Tag.objects.filter(slug__in=wanted).values_list('id', flat=True))
+    current = set(ResourceTag.objects.filter(resource=resource).values_list('tag_id', flat=True))
+    if current - tag_ids:
+        ResourceTag.objects.filter(resource=resource, tag_id__in=current - tag_ids).delete()
+    ResourceTag.objects.bulk_create(
+        [ResourceTag(resource=resource, tag_id=tag_id) for tag_id in tag_ids - current],
+        ignore_conflicts=True,
+    )
+
+
+@receiver(post_save, sender=Resource)
+def update_resource_tags(sender, instance, update_fields=None, raw=False, **kwargs):
+    if not raw and (update_fields is None or 'tags' in update_fields):
+        sync_tags(instance)
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from peacelink.forums.chat import ChatConsumer
+from peacelink.notifications.consumers import NotificationConsumer
+
+websocket_urlpatterns = [
+    path('ws/notifications/', NotificationConsumer.as_asgi()),
+    path('ws/chat/<int:conversation_id>/', ChatConsumer.as_asgi()),
+]
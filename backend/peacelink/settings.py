@@ -1,5 +1,6 @@
 # Django settings for PeaceLink PostgreSQL backend
 import os
+import sys
 from dotenv import load_dotenv
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -20,6 +21,7 @@ INSTALLED_APPS = [
 	'channels',
 	'peacelink.analytics',
 	'peacelink.forums',
+	'peacelink.media',
 	'peacelink.notifications',
 	'peacelink.reports',
 	'peacelink.resources',
@@ -73,15 +75,110 @@ USE_L10N = True
 USE_TZ = True
 
 STATIC_URL = '/static/'
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+# Resumable report media uploads (peacelink.reports.uploads)
+REPORT_UPLOAD_MAX_SIZE = 500 * 1024 * 1024
+REPORT_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+REPORT_UPLOAD_EXPIRY_HOURS = 24
+
+# Background transcoding of uploads (peacelink.media); run `manage.py process_media`
+MEDIA_FFMPEG = os.getenv('MEDIA_FFMPEG', 'ffmpeg')
+MEDIA_PROCESSING_MAX_ATTEMPTS = 5
 
 ASGI_APPLICATION = 'peacelink.asgi.application'
-CHANNEL_LAYERS = {
-	'default': {
-		'BACKEND': 'channels_redis.core.RedisChannelLayer',
-		'CONFIG': {
-			'hosts': [('localhost', 6379)],
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
+# `manage.py test` keeps the cache and counters in process memory instead of Redis
+TESTING = sys.argv[1:2] == ['test']
+
+# CHANNEL_LAYER=memory selects the in-process layer for single-node deployments; tests always use it
+if os.getenv('CHANNEL_LAYER', 'redis') == 'memory' or TESTING:
+	CHANNEL_LAYERS = {
+		'default': {
+			'BACKEND': 'channels.layers.InMemoryChannelLayer',
 		},
-	},
+	}
+else:
+	CHANNEL_LAYERS = {
+		'default': {
+			'BACKEND': 'channels_redis.core.RedisChannelLayer',
+			'CONFIG': {
+				'hosts': [(REDIS_HOST, REDIS_PORT)],
+			},
+		},
+	}
+
+# Shared by every worker and management command: notification inboxes (peacelink.notifications.inbox),
+# map tiles and analytics series are invalidated in one process and must not linger in the others
+if TESTING:
+	CACHES = {
+		'default': {
+			'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+		},
+	}
+else:
+	CACHES = {
+		'default': {
+			'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+			'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}/1',
+		},
+	}
+
+# View/download tallies are buffered in Redis and flushed in bulk, see peacelink.analytics.counters.
+# LocalCounterBackend keeps them in process memory, where a crashed worker loses them; tests only.
+if TESTING:
+	COUNTERS = {
+		'BACKEND': 'peacelink.analytics.counters.LocalCounterBackend',
+	}
+else:
+	COUNTERS = {
+		'BACKEND': 'peacelink.analytics.counters.RedisCounterBackend',
+		'OPTIONS': {'location': f'redis://{REDIS_HOST}:{REDIS_PORT}/0'},
+		'FLUSH_INTERVAL': int(os.getenv('COUNTER_FLUSH_INTERVAL', '10')),  # seconds
+	}
+
+# Hour/day/week analytics counters, see peacelink.analytics.rollups. With SIGNALS off,
+# schedule `manage.py rebuild_rollups --incremental` to keep them current instead.
+ROLLUPS = {
+	'SIGNALS': os.getenv('ROLLUP_SIGNALS', '1') == '1',
+}
+
+# Alert fan-out writes notifications in chunks on a small thread pool (0 = inline)
+NOTIFICATION_FANOUT_CHUNK_SIZE = 2000
+NOTIFICATION_FANOUT_WORKERS = int(os.getenv('NOTIFICATION_FANOUT_WORKERS', '4'))
+
+# Channel backends for `manage.py deliver_notifications`; RATE_LIMIT is sends per second.
+# peacelink.notifications.backends.InMemoryBackend records sends for tests.
+NOTIFICATION_CHANNELS = {
+	'push': {'BACKEND': 'peacelink.notifications.backends.LoggingBackend', 'RATE_LIMIT': 100},
+	'sms': {'BACKEND': 'peacelink.notifications.backends.LoggingBackend', 'RATE_LIMIT': 10},
+	'whatsapp': {'BACKEND': 'peacelink.notifications.backends.LoggingBackend', 'RATE_LIMIT': 10},
+}
+NOTIFICATION_DELIVERY_MAX_ATTEMPTS = 5
+
+# Near-duplicate report detection, see peacelink.reports.dedup
+REPORT_DEDUP = {
+	'ENABLED': True,
+	'NUM_PERM': 64,
+	'BANDS': 16,
+	'SHINGLE_SIZE': 4,
+	'THRESHOLD': 0.5,
+	'WINDOW_HOURS': 48,
+}
+
+REPORT_HOTSPOTS = {
+	'HALF_LIFE_HOURS': 6,
+	'BASELINE_WEEKS': 8,
+	'Z_THRESHOLD': 4.0,
+	'MIN_REPORTS': 5,
+	'COOLDOWN_HOURS': 24,
+}
+
+REST_FRAMEWORK = {
+	'DEFAULT_PAGINATION_CLASS': 'peacelink.pagination.CreatedAtCursorPagination',
+	'PAGE_SIZE': 50,
 }
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -11,10 +11,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'peacelink.settings')
 django.setup()
 
 from peacelink.users.models import User
-from peacelink.reports.models import Report
+from peacelink.reports.models import HotspotBaseline, HotspotCheckpoint, Report
 from peacelink.forums.models import ForumPost
 from peacelink.resources.models import Resource
-from peacelink.analytics.models import Analytics
+from peacelink.analytics.models import Analytics, RollupCounter
 from peacelink.notifications.models import Alert
 
 fake = Faker('en_US')
@@ -61,6 +61,9 @@ def clear_existing_data() -> None:
     ForumPost.objects.all().delete()
     Report.objects.all().delete()
     User.objects.exclude(is_superuser=True).delete()
+    RollupCounter.objects.all().delete()
+    HotspotBaseline.objects.all().delete()
+    HotspotCheckpoint.objects.all().delete()
 
 
 def unique_username(base: str) -> str:
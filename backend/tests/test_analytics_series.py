@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from peacelink.analytics import rollups, series
+from peacelink.reports.models import Report
+from peacelink.users.models import User
+
+# A Monday, so day and week buckets line up with the start
+START = timezone.make_aware(datetime(2026, 9, 7))
+
+
+@override_settings(NOTIFICATION_FANOUT_WORKERS=0)
+class SeriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reporter', password='x', state='Jonglei')
+        for days, category in [(0, 'conflict'), (3, 'conflict'), (3, 'conflict'), (3, 'health'), (9, 'health')]:
+            report = Report.objects.create(user=cls.user, category=category, location='Bor', description='-')
+            Report.objects.filter(pk=report.pk).update(created_at=START + timedelta(days=days, hours=10))
+        rollups.rebuild('reports')
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self, result):
+        return {tuple(row[dim] for dim in result['group_by']): row['counts'] for row in result['series']}
+
+    def test_zero_filled(self):
+        result = series.series('reports', 'day', START, START + timedelta(days=5), group_by=['category'])
+        self.assertEqual(result['buckets'], [START + timedelta(days=n) for n in range(5)])
+        self.assertEqual(self.counts(result), {('conflict',): [1, 0, 0, 2, 0], ('health',): [0, 0, 0, 1, 0]})
+        self.assertEqual([row['total'] for row in result['series']], [3, 1])
+
+        empty = series.series('reports', 'day', START, START + timedelta(days=2), filters={'category': 'health'})
+        self.assertEqual(empty['series'], [])
+        self.assertEqual(len(empty['buckets']), 2)
+
+    def test_rollups_and_table_agree(self):
+        cases = [
+            ('hour', START, START + timedelta(days=10), ['category']),
+            ('day', START, START + timedelta(days=14), ['category', 'state']),
+            ('week', START - timedelta(weeks=2), START + timedelta(weeks=3), []),
+            ('month', START - timedelta(days=40), START + timedelta(days=60), ['category']),
+        ]
+        for granularity, start, end, group_by in cases:
+            cache.clear()
+            with override_settings(ROLLUPS={'SIGNALS': True}):
+                from_rollups = series.series('reports', granularity, start, end, group_by=group_by)
+            cache.clear()
+            with override_settings(ROLLUPS={'SIGNALS': False}):
+                from_table = series.series('reports', granularity, start, end, group_by=group_by)
+            self.assertEqual((from_rollups['source'], from_table['source']), ('rollups', 'table'))
+            from_rollups.pop('source'), from_table.pop('source')
+            self.assertEqual(from_rollups, from_table, granularity)
+            self.assertEqual(sum(row['total'] for row in from_table['series']), 5, granularity)
+
+    @override_settings(ANALYTICS_SERIES={'MAX_POINTS': 10})
+    def test_downsampled_past_max_points(self):
+        result = series.series('reports', 'hour', START, START + timedelta(days=3))
+        self.assertEqual(result['granularity'], 'day')
+        self.assertEqual(result['series'][0]['counts'], [1, 0, 0])
+
+        result = series.series('reports', 'hour', START, START + timedelta(days=14))
+        self.assertEqual((result['granularity'], result['series'][0]['counts']), ('week', [4, 1]))
+        self.assertEqual(series.series('reports', 'day', START, START + timedelta(days=800))['granularity'], 'month')
+
+    @override_settings(ANALYTICS_SERIES={'CACHE_TIMEOUT': 600, 'LIVE_CACHE_TIMEOUT': 5})
+    def test_cache_timeouts(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            closed = series.series('reports', 'day', START, START + timedelta(days=5))
+            series.series('reports', 'day', START, timezone.now() + timedelta(hours=1))
+            series.series('reports', 'day', timezone.now() - timedelta(days=3))
+        self.assertEqual([call.args[2] for call in cache_set.call_args_list], [600, 5, 5])
+
+        # Cached: a new report in the closed range is not seen until the entry expires
+        report = Report.objects.create(user=self.user, category='conflict', location='Bor', description='-')
+        Report.objects.filter(pk=report.pk).update(created_at=START + timedelta(hours=1))
+        rollups.rebuild('reports')
+        self.assertEqual(series.series('reports', 'day', START, START + timedelta(days=5)), closed)
+        cache.clear()
+        self.assertEqual(series.series('reports', 'day', START, START + timedelta(days=5))['series'][0]['total'], 5)
+
+
+class MetricSeriesViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_series(self):
+        response = self.client.get('/api/analytics/series/', {
+            'metric': 'reports', 'granularity': 'day', 'start': '2026-09-07', 'end': '2026-09-10',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['granularity'], len(response.data['buckets'])), ('day', 3))
+
+    def test_bad_parameters(self):
+        cases = [
+            {'metric': 'nope'},
+            {'metric': 'reports', 'granularity': 'minute'},
+            {'metric': 'reports', 'group_by': 'category,colour'},
+            {'metric': 'reports', 'start': 'last tuesday'},
+            {'metric': 'reports', 'start': '2026-09-10', 'end': '2026-09-07'},
+        ]
+        for params in cases:
+            response = self.client.get('/api/analytics/series/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.data)
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+from unittest import mock
+
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase
+from django.urls import path
+
+from community.models import Conversation, Message
+from peacelink.forums import chat
+from peacelink.routing import websocket_urlpatterns
+from peacelink.users.models import User
+
+logger = logging.getLogger(__name__)
+
+application = URLRouter(websocket_urlpatterns)
+
+
+class StalledChatConsumer(chat.ChatConsumer):
+    """A client whose socket never drains"""
+
+    async def drain_queue(self):
+        await asyncio.Event().wait()
+
+
+stalled_application = URLRouter([path('ws/chat/<int:conversation_id>/', StalledChatConsumer.as_asgi())])
+
+
+class ChatLoadTests(TransactionTestCase):
+    ROOMS = 10
+    SOCKETS_PER_ROOM = 20
+    MESSAGES_PER_SOCKET = 3
+
+    def setUp(self):
+        self.users = User.objects.bulk_create(
+            [User(username=f'chatter-{n}') for n in range(self.ROOMS * self.SOCKETS_PER_ROOM)]
+        )
+        self.rooms = []
+        for room in range(self.ROOMS):
+            conversation = Conversation.objects.create(is_group=True, group_name=f'Room {room}')
+            members = self.users[room * self.SOCKETS_PER_ROOM:(room + 1) * self.SOCKETS_PER_ROOM]
+            conversation.participants.set(members)
+            self.rooms.append((conversation, members))
+
+    async def connect(self, user, conversation, app=application):
+        communicator = WebsocketCommunicator(app, f'/ws/chat/{conversation.id}/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_many_sockets(self):
+        sockets = [
+            (room, await self.connect(user, conversation))
+            for room, (conversation, members) in enumerate(self.rooms) for user in members
+        ]
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            communicator.send_json_to({'message': f'{room}:{n}:{i}'})
+            for n, (room, communicator) in enumerate(sockets) for i in range(self.MESSAGES_PER_SOCKET)
+        ])
+        expected = self.SOCKETS_PER_ROOM * self.MESSAGES_PER_SOCKET
+        for room, communicator in sockets:
+            received = [await communicator.receive_json_from(timeout=10) for _ in range(expected)]
+            # Every message of the room reached every socket in it, none from other rooms
+            self.assertEqual({message['message'].split(':')[0] for message in received}, {str(room)})
+            self.assertEqual(len({message['id'] for message in received}), expected)
+        elapsed = time.perf_counter() - started
+        await asyncio.gather(*[communicator.disconnect() for _, communicator in sockets])
+
+        total = len(sockets) * self.MESSAGES_PER_SOCKET
+        self.assertEqual(await database_sync_to_async(Message.objects.count)(), total)
+        logger.info('%d sockets, %d messages, %d deliveries in %.2fs',
+                    len(sockets), total, total * self.SOCKETS_PER_ROOM, elapsed)
+
+    async def test_stalled_client_is_dropped(self):
+        conversation, members = self.rooms[0]
+        stalled = await self.connect(members[0], conversation, stalled_application)
+        sender = await self.connect(members[1], conversation)
+        for n in range(chat.SEND_QUEUE_SIZE + 1):
+            await sender.send_json_to({'message': f'flood {n}'})
+            await sender.receive_json_from(timeout=5)
+        closed = await stalled.receive_output(timeout=5)
+        self.assertEqual(closed, {'type': 'websocket.close', 'code': 4008})
+        await sender.disconnect()
+
+    async def test_unsaved_messages_are_not_broadcast(self):
+        conversation, members = self.rooms[0]
+        sender = await self.connect(members[0], conversation)
+        listener = await self.connect(members[1], conversation)
+        with mock.patch.object(chat.MessageWriter, 'write', side_effect=RuntimeError('database down')), \
+                mock.patch.object(chat.writer, 'retry_delay', 0), \
+                self.assertLogs('peacelink.forums.chat', 'ERROR'):
+            await sender.send_json_to({'message': 'lost?'})
+            reply = await sender.receive_json_from(timeout=5)
+        self.assertEqual(reply['message'], 'lost?')
+        self.assertIn('error', reply)
+        self.assertTrue(await listener.receive_nothing())
+        self.assertEqual(await database_sync_to_async(Message.objects.count)(), 0)
+        await sender.disconnect()
+        await listener.disconnect()
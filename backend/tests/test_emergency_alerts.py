@@ -0,0 +1,65 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from peacelink.notifications.models import EmergencyAlert, Notification
+from peacelink.users.models import User
+
+
+@override_settings(NOTIFICATION_FANOUT_WORKERS=0)
+class DraftActivationTests(APITestCase):
+    """Draft alerts, e.g. from hotspot detection, are sent when they are activated"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='x', role='admin', is_staff=True)
+        cls.moderator = User.objects.create_user(username='moderator', password='x', role='moderator')
+        for n in range(3):
+            User.objects.create_user(username=f'resident-{n}', password='x', state='Jonglei')
+        User.objects.create_user(username='elsewhere', password='x', state='Unity')
+
+    def setUp(self):
+        self.alert = EmergencyAlert.objects.create(
+            title='Spike in conflict reports', message='-', alert_type='conflict', severity='moderate',
+            target_states=['Jonglei'], is_active=False,
+        )
+        self.client.force_authenticate(self.admin)
+
+    def sent(self):
+        return Notification.objects.filter(notification_type='emergency_alert').count()
+
+    def test_editing_a_draft_sends_nothing(self):
+        response = self.client.patch(f'/api/alerts/emergency/{self.alert.id}/', {'severity': 'severe'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sent(), 0)
+
+    def test_switching_a_draft_on_sends_it_once(self):
+        url = f'/api/alerts/emergency/{self.alert.id}/'
+        response = self.client.patch(url, {'is_active': True, 'severity': 'severe'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_active'])
+        self.alert.refresh_from_db()
+        self.assertEqual((self.alert.is_active, self.alert.severity, self.alert.recipients_count), (True, 'severe', 3))
+        self.assertEqual(self.sent(), 3)
+
+        self.client.patch(url, {'is_active': True}, format='json')
+        self.assertEqual(self.sent(), 3)
+
+    def test_activate(self):
+        url = f'/api/alerts/emergency/{self.alert.id}/activate/'
+        response = self.client.post(url)
+        self.assertEqual(response.data, {'status': 'alert activated', 'recipients_count': 3})
+        self.assertEqual(self.sent(), 3)
+        self.assertEqual(self.client.post(url).data['status'], 'alert already active')
+        self.assertEqual(self.sent(), 3)
+
+        # Deactivated and activated again, it goes out again
+        self.client.post(f'/api/alerts/emergency/{self.alert.id}/deactivate/')
+        self.client.post(url)
+        self.assertEqual(self.sent(), 6)
+
+    def test_admins_only(self):
+        self.client.force_authenticate(self.moderator)
+        self.assertEqual(self.client.post(f'/api/alerts/emergency/{self.alert.id}/activate/').status_code, 403)
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.post('/api/alerts/emergency/0/activate/').status_code, 404)
+        self.assertEqual(self.sent(), 0)
@@ -0,0 +1,50 @@
+from django.contrib.contenttypes.models import ContentType
+from rest_framework.test import APITestCase
+
+from peacelink.forums.models import ForumLike, ForumPost, ForumTopic
+from peacelink.users.models import User
+
+
+class ForumQueryCountTests(APITestCase):
+    """The forum endpoints issue the same number of queries however many posts a topic has"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader', password='x')
+        cls.authors = [User.objects.create_user(username=f'author-{n}', password='x') for n in range(3)]
+        cls.topic = ForumTopic.objects.create(
+            title='Water point repairs', category='infrastructure', author=cls.authors[0],
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        ContentType.objects.get_for_model(ForumPost)  # Cached per process; keep it out of the counts
+
+    def add_posts(self, count, replies=3):
+        for n in range(count):
+            author = self.authors[n % len(self.authors)]
+            post = ForumPost.objects.create(topic=self.topic, user=author, content=f'Post {n}')
+            ForumLike.objects.create(post=post, user=self.user)
+            for r in range(replies):
+                ForumPost.objects.create(topic=self.topic, user=author, parent=post, content=f'Reply {r}')
+
+    def assertConstantQueries(self, url, expected):
+        self.add_posts(2)
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.add_posts(20, replies=8)
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_topic_list(self):
+        for n in range(5):
+            ForumTopic.objects.create(title=f'Topic {n}', category='health', author=self.authors[n % 3])
+        self.assertConstantQueries('/api/forums/topics/', 1)
+
+    def test_topic_detail(self):
+        # Topic, top-level posts, their recent replies, and the audio derivatives of both
+        self.assertConstantQueries(f'/api/forums/topics/{self.topic.id}/', 5)
+
+    def test_post_list(self):
+        # Page of posts, their recent replies, and the audio derivatives of both
+        self.assertConstantQueries(f'/api/forums/posts/?topic={self.topic.id}', 4)
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from peacelink.notifications.models import EmergencyAlert
+from peacelink.reports.hotspots import HOUR_COUNT, HotspotWorker, report_key
+from peacelink.reports.models import HotspotCheckpoint, Report
+from peacelink.users.models import User
+
+
+class HotspotWorkerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reporter', password='x', state='Jonglei', county='Bor South')
+
+    def create_report(self, **fields):
+        return Report.objects.create(user=self.user, category='conflict', location='Bor', description='-', **fields)
+
+    def observed(self, worker):
+        return worker.detector.states[report_key('Jonglei', 'Bor South', 'conflict')][HOUR_COUNT]
+
+    def test_reports_committed_out_of_order_are_read(self):
+        HotspotCheckpoint.objects.create(pk=1, last_report_id=1000)
+        self.create_report(id=1001)
+        self.create_report(id=1003)
+        worker = HotspotWorker()
+        self.assertEqual(worker.run_once(), 2)
+        self.assertEqual((worker.last_report_id, set(worker.pending)), (1001, {1003}))
+
+        # 1002 commits late; it is read once, and so is nothing else
+        self.create_report(id=1002)
+        self.assertEqual(worker.run_once(), 1)
+        self.assertEqual(worker.run_once(), 0)
+        self.assertEqual(self.observed(worker), 3)
+        self.assertEqual((worker.last_report_id, worker.pending), (1003, {}))
+
+    def test_missing_ids_are_skipped_once_settled(self):
+        HotspotCheckpoint.objects.create(pk=1, last_report_id=2000)
+        self.create_report(id=2001)
+        late = self.create_report(id=2005)
+        worker = HotspotWorker()
+        worker.run_once()
+        self.assertEqual(worker.last_report_id, 2001)
+
+        # A restart resumes with the ids read above the watermark
+        worker.save()
+        worker = HotspotWorker()
+        self.assertEqual(worker.run_once(), 0)
+        self.assertEqual(set(worker.pending), {late.id})
+
+        worker.advance(timezone.now() + timedelta(seconds=worker.config['COMMIT_LAG_SECONDS'] + 1))
+        self.assertEqual((worker.last_report_id, worker.pending), (2005, {}))
+
+    def test_hotspot_is_not_raised_again_after_a_crash(self):
+        for _ in range(8):
+            self.create_report()
+        worker = HotspotWorker()
+        self.assertEqual(worker.run_once(), 8)
+        self.assertEqual(EmergencyAlert.objects.count(), 1)
+
+        # Crash before the batch's own checkpoint: the reports after the alert are read again
+        restarted = HotspotWorker()
+        self.assertGreater(restarted.run_once(), 0)
+        self.assertEqual(EmergencyAlert.objects.count(), 1)
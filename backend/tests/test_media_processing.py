@@ -0,0 +1,210 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from peacelink.media.jobs import MediaWorker, store_derivatives
+from peacelink.media.models import MediaDerivative, MediaJob
+from peacelink.media.processing import ProcessingError, get_ffmpeg, process
+from peacelink.media.serializers import bandwidth_hint, pick_derivatives
+from peacelink.reports.models import Report
+from peacelink.users.models import User
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'media')
+
+
+def fixture(name):
+    return os.path.join(FIXTURES, name)
+
+
+class InlinePool:
+    """Runs jobs on the test's own thread, which can see its uncommitted rows"""
+
+    def map(self, fn, items):
+        return map(fn, items)
+
+    def shutdown(self):
+        pass
+
+
+@unittest.skipUnless(shutil.which(get_ffmpeg()), 'ffmpeg is not installed')
+class ProcessTests(SimpleTestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+    def assertWritten(self, specs, kind, variants):
+        self.assertEqual([(spec['kind'], spec['variant']) for spec in specs], [(kind, v) for v in variants])
+        for spec in specs:
+            self.assertEqual(os.path.dirname(spec['path']), self.output_dir)
+            self.assertEqual(os.path.getsize(spec['path']), spec['size_bytes'])
+            self.assertGreater(spec['size_bytes'], 0)
+
+    def test_audio(self):
+        specs = process('audio', fixture('tone.wav'), self.output_dir)
+        self.assertWritten(specs, 'audio', ['low', 'standard'])
+        self.assertEqual([spec['bitrate'] for spec in specs], [12, 24])
+
+    def test_image(self):
+        specs = process('image', fixture('gradient.png'), self.output_dir)
+        self.assertWritten(specs, 'image', ['small', 'medium', 'large'])
+
+    def test_video_poster(self):
+        specs = process('video', fixture('clip.y4m'), self.output_dir)
+        self.assertWritten(specs, 'poster', ['small', 'medium'])
+
+    def test_unreadable_source(self):
+        with self.assertRaises(ProcessingError):
+            process('image', fixture('missing.png'), self.output_dir)
+
+
+class MediaJobTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reporter', password='x')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.scratch = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.scratch)
+
+        self.report = Report(user=self.user, category='conflict', location='Bor', description='-')
+        with open(fixture('tone.wav'), 'rb') as wav:
+            self.report.audio_recording.save('tone.wav', ContentFile(wav.read()))
+        self.job = MediaJob.objects.get()
+
+    def write_specs(self, output_dir, size=10):
+        specs = []
+        for variant, kbps in (('low', 12), ('standard', 24)):
+            path = os.path.join(output_dir, f'{variant}.opus')
+            with open(path, 'wb') as output:
+                output.write(b'o' * size * kbps)
+            specs.append({'path': path, 'kind': 'audio', 'variant': variant,
+                          'size_bytes': size * kbps, 'bitrate': kbps})
+        return specs
+
+
+class StoreDerivativesTests(MediaJobTestCase):
+    def test_upload_is_queued(self):
+        self.assertEqual((self.job.kind, self.job.field_name, self.job.status), ('audio', 'audio_recording', 'pending'))
+        self.assertEqual(self.job.source_name, self.report.audio_recording.name)
+
+    def test_replaces_earlier_derivatives(self):
+        store_derivatives(self.job, self.write_specs(self.scratch))
+        earlier = list(MediaDerivative.objects.values_list('id', 'file'))
+        self.assertEqual(len(earlier), 2)
+        for _, name in earlier:
+            self.assertTrue(name.startswith(f'derivatives/reports_report/{self.report.id}/audio_recording-'))
+            self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            store_derivatives(self.job, self.write_specs(self.scratch, size=20))
+        current = MediaDerivative.objects.all()
+        self.assertEqual(sorted(d.size_bytes for d in current), [240, 480])
+        self.assertFalse(current.filter(id__in=[pk for pk, _ in earlier]).exists())
+        for _, name in earlier:
+            self.assertFalse(default_storage.exists(name))
+        for derivative in current:
+            self.assertTrue(default_storage.exists(derivative.file.name))
+
+
+@override_settings(MEDIA_PROCESSING_MAX_ATTEMPTS=3)
+class MediaWorkerTests(MediaJobTestCase):
+    def setUp(self):
+        super().setUp()
+        self.worker = MediaWorker()
+        self.worker.pool.shutdown()
+        self.worker.pool = InlinePool()
+
+    def test_processes_and_stores(self):
+        def fake_process(kind, source, output_dir):
+            self.assertEqual(kind, 'audio')
+            with open(source, 'rb') as copy, open(fixture('tone.wav'), 'rb') as original:
+                self.assertEqual(copy.read(), original.read())
+            return self.write_specs(output_dir)
+
+        with mock.patch('peacelink.media.jobs.process', side_effect=fake_process):
+            self.assertEqual(self.worker.run_once(), 1)
+        job = MediaJob.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('done', 1, ''))
+        self.assertEqual(set(self.report.derivatives.values_list('variant', flat=True)), {'low', 'standard'})
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_failures_back_off_then_give_up(self):
+        delays = []
+        with mock.patch('peacelink.media.jobs.process', side_effect=ProcessingError('ffmpeg exploded')):
+            for attempt in range(1, 4):
+                started = timezone.now()
+                self.assertEqual(self.worker.run_once(), 1)
+                job = MediaJob.objects.get()
+                self.assertEqual((job.attempts, job.last_error), (attempt, 'ffmpeg exploded'))
+                delays.append(round((job.next_attempt_at - started).total_seconds()))
+                if attempt < 3:
+                    self.assertEqual(job.status, 'pending')
+                    self.assertEqual(self.worker.run_once(), 0)  # Not due yet
+                    MediaJob.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(delays, [60, 120, 240])
+            self.assertEqual(job.status, 'failed')
+            MediaJob.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(self.worker.run_once(), 0)
+        self.assertFalse(MediaDerivative.objects.exists())
+
+    def test_replaced_upload_is_skipped(self):
+        Report.objects.filter(pk=self.report.pk).update(audio_recording='reports/audio/other.wav')
+        with mock.patch('peacelink.media.jobs.process') as process_mock:
+            self.assertEqual(self.worker.run_once(), 1)
+        process_mock.assert_not_called()
+        self.assertEqual(MediaJob.objects.get().status, 'done')
+
+
+class PickDerivativesTests(SimpleTestCase):
+    def derivatives(self, *variants):
+        return [
+            MediaDerivative(kind=kind, variant=variant, size_bytes=size)
+            for kind, variant, size in variants
+        ]
+
+    def picked(self, derivatives, hint):
+        return {kind: d.variant for kind, d in pick_derivatives(derivatives, hint).items()}
+
+    def test_hints(self):
+        derivatives = self.derivatives(
+            ('audio', 'standard', 2000), ('audio', 'low', 1000),
+            ('image', 'large', 90000), ('image', 'small', 8000), ('image', 'medium', 30000),
+            ('poster', 'medium', 20000), ('poster', 'small', 6000),
+        )
+        self.assertEqual(self.picked(derivatives, 'low'), {'audio': 'low', 'image': 'small', 'poster': 'small'})
+        self.assertEqual(self.picked(derivatives, 'high'), {'audio': 'standard', 'image': 'medium', 'poster': 'medium'})
+
+    def test_high_without_the_preferred_variant(self):
+        derivatives = self.derivatives(('audio', 'low', 1000), ('image', 'small', 8000))
+        self.assertEqual(self.picked(derivatives, 'high'), {'audio': 'low', 'image': 'small'})
+        self.assertEqual(self.picked([], 'high'), {})
+
+    def test_bandwidth_hint(self):
+        factory = APIRequestFactory()
+        cases = [
+            ({}, {}, 'high'),
+            ({'bandwidth': 'low'}, {}, 'low'),
+            ({'bandwidth': 'high'}, {'HTTP_SAVE_DATA': 'on'}, 'high'),
+            ({}, {'HTTP_SAVE_DATA': 'on'}, 'low'),
+            ({}, {'HTTP_DOWNLINK': '0.4'}, 'low'),
+            ({}, {'HTTP_DOWNLINK': '10'}, 'high'),
+            ({}, {'HTTP_DOWNLINK': 'fast'}, 'high'),
+        ]
+        for params, headers, expected in cases:
+            request = Request(factory.get('/api/reports/', params, **headers))
+            self.assertEqual(bandwidth_hint(request), expected, (params, headers))
+        self.assertEqual(bandwidth_hint(None), 'high')
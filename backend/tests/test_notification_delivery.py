@@ -0,0 +1,94 @@
+import time
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from peacelink.notifications import delivery
+from peacelink.notifications.backends import InMemoryBackend
+from peacelink.notifications.delivery import DeliveryWorker, RateLimiter, enqueue
+from peacelink.notifications.models import Notification, NotificationDelivery
+from peacelink.users.models import User
+
+BACKEND = 'peacelink.notifications.backends.InMemoryBackend'
+CHANNELS = {
+    'push': {'BACKEND': BACKEND},
+    'sms': {'BACKEND': BACKEND, 'OPTIONS': {'fail': True}},
+    'whatsapp': {'BACKEND': BACKEND, 'RATE_LIMIT': 10},
+}
+
+
+@override_settings(NOTIFICATION_CHANNELS=CHANNELS, NOTIFICATION_DELIVERY_MAX_ATTEMPTS=3)
+class DeliveryWorkerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='recipient', password='x')
+
+    def setUp(self):
+        InMemoryBackend.outbox.clear()
+        self.worker = DeliveryWorker(concurrency=2)
+        self.addCleanup(self.worker.pool.shutdown)
+
+    def notify(self, count, channel):
+        ids = [
+            Notification.objects.create(
+                recipient=self.user, notification_type='system', title=f'Notice {n}', message='-',
+            ).id
+            for n in range(count)
+        ]
+        enqueue(ids, channel)
+        return ids
+
+    def test_sends_and_marks_delivered(self):
+        ids = self.notify(3, 'push')
+        self.assertEqual(self.worker.run_once(), 3)
+        self.assertEqual(sorted(InMemoryBackend.outbox), [('push', pk) for pk in ids])
+        self.assertEqual(set(NotificationDelivery.objects.values_list('status', 'attempts')), {('sent', 1)})
+        self.assertTrue(all(Notification.objects.filter(id__in=ids).values_list('push_sent', flat=True)))
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_claimed_rows_are_leased(self):
+        self.notify(2, 'push')
+        claimed = self.worker.claim()
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(self.worker.claim(), [])
+        leased_until = NotificationDelivery.objects.values_list('next_attempt_at', flat=True)[0]
+        self.assertGreater(leased_until, timezone.now() + delivery.LEASE - timedelta(seconds=5))
+
+    def test_failures_back_off_then_give_up(self):
+        self.notify(1, 'sms')
+        delays = []
+        for attempt in range(1, 4):
+            started = timezone.now()
+            self.assertEqual(self.worker.run_once(), 1)
+            row = NotificationDelivery.objects.get()
+            self.assertEqual((row.attempts, row.last_error), (attempt, 'sms gateway unavailable'))
+            delays.append(round((row.next_attempt_at - started).total_seconds()))
+            if attempt < 3:
+                self.assertEqual(row.status, 'pending')
+                self.assertEqual(self.worker.run_once(), 0)  # Not due yet
+                NotificationDelivery.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(delays, [30, 60, 120])
+        self.assertEqual(row.status, 'failed')
+        NotificationDelivery.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(self.worker.run_once(), 0)
+        self.assertEqual(InMemoryBackend.outbox, [])
+
+    def test_retry_delay_is_capped(self):
+        self.assertEqual(delivery.retry_delay(1), timedelta(seconds=30))
+        self.assertEqual(delivery.retry_delay(20), timedelta(seconds=delivery.RETRY_MAX_SECONDS))
+
+    def test_rate_limit(self):
+        self.notify(15, 'whatsapp')
+        started = time.monotonic()
+        self.assertEqual(self.worker.run_once(), 15)
+        # A full bucket of 10, then 5 more at 10 per second
+        self.assertGreaterEqual(time.monotonic() - started, 0.45)
+        self.assertEqual(len(InMemoryBackend.outbox), 15)
+
+    def test_rate_limiter_without_a_rate_never_waits(self):
+        limiter = RateLimiter(0)
+        started = time.monotonic()
+        for _ in range(1000):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - started, 0.1)
@@ -0,0 +1,49 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from peacelink.notifications import inbox
+from peacelink.notifications.models import Notification
+from peacelink.users.models import User
+
+
+class InboxCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='recipient', password='x')
+
+    def setUp(self):
+        cache.clear()
+
+    def notify(self):
+        notification = Notification.objects.create(
+            recipient=self.user, notification_type='system', title='Notice', message='-',
+        )
+        inbox.notification_created(notification)
+
+    def test_counter_follows_creates_and_reads(self):
+        self.assertEqual(inbox.unread_count(self.user.id), 0)
+        self.notify()
+        self.notify()
+        self.assertEqual(inbox.unread_count(self.user.id), 2)
+        notification = Notification.objects.first()
+        Notification.objects.filter(pk=notification.pk).update(read=True)
+        inbox.notification_read(notification)
+        self.assertEqual(inbox.unread_count(self.user.id), 1)
+
+    def test_count_racing_a_create_expires(self):
+        add = cache.add
+
+        def add_after_a_create(*args, **kwargs):
+            self.notify()  # Commits after the count, before the key exists
+            return add(*args, **kwargs)
+
+        with mock.patch.object(cache, 'add', side_effect=add_after_a_create):
+            self.assertEqual(inbox.unread_count(self.user.id), 0)
+        self.assertEqual(inbox.unread_count(self.user.id), 0)
+
+        later = time.time() + inbox.COUNT_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(inbox.unread_count(self.user.id), 1)
@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from peacelink.reports.models import Report
+from peacelink.users.models import User
+
+
+def copy_report(report, count):
+    """Insert `count` copies of `report` in one statement"""
+    columns = ', '.join(f.column for f in Report._meta.concrete_fields if not f.primary_key)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"WITH RECURSIVE copies(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM copies WHERE n < %s) "
+            f"INSERT INTO reports_report ({columns}) SELECT {columns} FROM reports_report, copies WHERE id = %s",
+            [count, report.id],
+        )
+
+
+class ReportExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.partner = User.objects.create_user(username='partner', password='x', role='ngo')
+        cls.reporter = User.objects.create_user(username='reporter', password='x')
+
+    def setUp(self):
+        self.client.force_authenticate(self.partner)
+
+    def create_report(self, **fields):
+        return Report.objects.create(**{
+            'user': self.reporter, 'category': 'conflict', 'location': 'Bor', 'description': 'Cattle raid',
+            'latitude': Decimal('6.209300'), 'longitude': Decimal('31.559400'), 'contact_number': '+211900000000',
+            **fields,
+        })
+
+    def export(self, export_format='ndjson', **params):
+        response = self.client.get(f'/api/reports/export/{export_format}/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_roles(self):
+        self.client.force_authenticate(None)
+        self.assertIn(self.client.get('/api/reports/export/csv/').status_code, (401, 403))
+        self.client.force_authenticate(self.reporter)
+        self.assertEqual(self.client.get('/api/reports/export/csv/').status_code, 403)
+
+    def test_anonymous_reports_are_redacted(self):
+        self.create_report()
+        self.create_report(anonymous_report=True)
+        named, anonymous = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual(named['reporter_username'], 'reporter')
+        self.assertEqual(named['latitude'], '6.209300')
+        for column in ('reporter_id', 'reporter_username', 'contact_number', 'latitude', 'longitude'):
+            self.assertIsNone(anonymous[column], column)
+
+    def test_filters(self):
+        old = self.create_report(category='health')
+        Report.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=10))
+        self.create_report(status='resolved')
+        self.create_report()
+        today = timezone.localdate().isoformat()
+        rows = list(csv.DictReader(io.StringIO(self.export('csv', **{'from': today, 'status': 'submitted'}))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(len(self.export(category='health').splitlines()), 1)
+        self.assertEqual(self.client.get('/api/reports/export/csv/', {'to': '2026-13-01'}).status_code, 400)
+
+    def test_memory_stays_flat(self):
+        """Peak memory for ten times the rows stays that of one chunk, as it would at 1M reports"""
+        template = self.create_report()
+
+        def peak(total):
+            copy_report(template, total - Report.objects.count())
+            tracemalloc.start()
+            try:
+                lines = sum(chunk.count(b'\n') for chunk in
+                            self.client.get('/api/reports/export/csv/').streaming_content)
+                return lines, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        small_lines, small_peak = peak(5000)
+        large_lines, large_peak = peak(50000)
+        self.assertEqual((small_lines, large_lines), (5001, 50001))
+        self.assertLess(large_peak, small_peak * 1.5)
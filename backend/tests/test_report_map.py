@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from peacelink.reports import geo
+from peacelink.reports.map import tile_clusters
+from peacelink.reports.models import Report
+from peacelink.users.models import User
+
+JUBA = (Decimal('4.859400'), Decimal('31.571300'))
+MALAKAL = (Decimal('9.533400'), Decimal('31.660500'))
+
+
+class ReportMapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reporter', password='x', latitude=JUBA[0], longitude=JUBA[1])
+
+    def setUp(self):
+        cache.clear()
+
+    def clusters(self, point, z=10, category=None):
+        return tile_clusters(z, *geo.point_tile(float(point[0]), float(point[1]), z), category)
+
+    def test_reports_are_placed_at_the_reporter_unless_anonymous(self):
+        named = Report.objects.create(user=self.user, category='conflict', location='Juba', description='-')
+        anonymous = Report.objects.create(
+            user=self.user, category='conflict', location='Juba', description='-', anonymous_report=True,
+        )
+        self.assertEqual((named.latitude, named.longitude), JUBA)
+        self.assertEqual((anonymous.latitude, anonymous.longitude, anonymous.geohash), (None, None, ''))
+
+    def test_moving_a_report_invalidates_the_tiles_it_left(self):
+        report = Report.objects.create(user=self.user, category='conflict', location='Juba', description='-')
+        self.assertEqual(self.clusters(JUBA)[0]['count'], 1)
+        self.assertEqual(self.clusters(JUBA, category='conflict')[0]['count'], 1)
+
+        report.latitude, report.longitude = MALAKAL
+        report.category = 'health'
+        report.save()
+        self.assertEqual(self.clusters(JUBA), [])
+        self.assertEqual(self.clusters(JUBA, category='conflict'), [])
+        self.assertEqual(self.clusters(MALAKAL, category='health')[0]['count'], 1)
@@ -0,0 +1,138 @@
+import math
+import random
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from peacelink.reports import sla
+from peacelink.reports.models import LatencySketch, Report, ReportSLA
+from peacelink.reports.transitions import transition_reports
+from peacelink.users.models import User
+
+HOUR = 3600
+
+
+class ReportSlaTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.partner = User.objects.create_user(username='partner', password='x', role='ngo')
+        cls.reporter = User.objects.create_user(username='reporter', password='x')
+
+    def test_roles(self):
+        self.assertIn(self.client.get('/api/reports/sla/').status_code, (401, 403))
+        self.client.force_authenticate(self.reporter)
+        self.assertEqual(self.client.get('/api/reports/sla/').status_code, 403)
+        self.client.force_authenticate(self.partner)
+        response = self.client.get('/api/reports/sla/', {'metric': 'review', 'by': 'category'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+
+@override_settings(NOTIFICATION_FANOUT_WORKERS=0)
+class ReportLifecycleTests(TestCase):
+    """SLA rows and sketches follow transition_reports on a mocked clock"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reporter', password='x', state='Jonglei')
+
+    def setUp(self):
+        self.now = timezone.make_aware(datetime(2026, 10, 5, 8))
+        clock = mock.patch('django.utils.timezone.now', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def create_report(self, category, **fields):
+        return Report.objects.create(user=self.user, category=category, location='Bor', description='-', **fields)
+
+    def move(self, report, status, after_hours):
+        self.now += timedelta(hours=after_hours)
+        updated, rejected = transition_reports([report.id], status)
+        self.assertEqual((updated, rejected), ([report.id], {}))
+
+    def assertWithinAccuracy(self, value, expected):
+        self.assertLessEqual(abs(value - expected), expected * sla.RELATIVE_ACCURACY, (value, expected))
+
+    def run_lifecycle(self):
+        created = self.now
+        resolved = self.create_report('conflict', resolution_timeline=created + timedelta(hours=24))
+        waiting = self.create_report('health')
+        self.move(waiting, 'under_review', after_hours=0.5)
+        self.move(resolved, 'under_review', after_hours=1.5)
+        self.move(resolved, 'verified', after_hours=1)
+        self.move(resolved, 'assigned', after_hours=2)
+        self.move(resolved, 'in_progress', after_hours=4)
+        self.move(resolved, 'resolved', after_hours=17)
+        self.move(resolved, 'closed', after_hours=3)
+        return resolved, waiting
+
+    def snapshot(self):
+        slas = list(ReportSLA.objects.order_by('report_id').values(
+            'report_id', 'time_to_review', 'time_to_resolve', 'resolved_late', 'status_durations', 'status_since'))
+        sketches = sorted(LatencySketch.objects.values_list('metric', 'dimension', 'key', 'day', 'bin', 'count'))
+        return slas, sketches
+
+    def test_durations(self):
+        resolved, waiting = self.run_lifecycle()
+        row = ReportSLA.objects.get(report=resolved)
+        self.assertEqual(row.time_to_review, timedelta(hours=2))
+        self.assertEqual(row.time_to_resolve, timedelta(hours=26))
+        self.assertTrue(row.resolved_late)
+        self.assertEqual(row.status_durations, {
+            'submitted': 2 * HOUR, 'under_review': HOUR, 'verified': 2 * HOUR,
+            'assigned': 4 * HOUR, 'in_progress': 17 * HOUR, 'resolved': 3 * HOUR,
+        })
+        self.assertEqual(row.status_since, self.now)
+
+        row = ReportSLA.objects.get(report=waiting)
+        self.assertEqual((row.time_to_review, row.time_to_resolve, row.resolved_late),
+                         (timedelta(minutes=30), None, None))
+
+        # Closing again after a reopen does not count a second resolution
+        self.move(resolved, 'under_review', after_hours=1)
+        self.move(resolved, 'verified', after_hours=1)
+        self.assertEqual(ReportSLA.objects.get(report=resolved).time_to_resolve, timedelta(hours=26))
+
+    def test_percentiles(self):
+        self.run_lifecycle()
+        end = timezone.localdate()
+        (review,) = sla.percentiles('review', end=end)
+        self.assertEqual((review['key'], review['count']), ('', 2))
+        self.assertWithinAccuracy(review[0.5], 0.5 * HOUR)
+        by_category = {row['key']: row for row in sla.percentiles('review', 'category', end=end)}
+        self.assertWithinAccuracy(by_category['conflict'][0.5], 2 * HOUR)
+        self.assertWithinAccuracy(by_category['health'][0.5], 0.5 * HOUR)
+
+        (resolve,) = sla.percentiles('resolve', 'state', end=end)
+        self.assertEqual((resolve['key'], resolve['count']), ('Jonglei', 1))
+        self.assertWithinAccuracy(resolve[0.9], 26 * HOUR)
+
+        # Samples are dated by their transition; a window ending before it is empty
+        self.assertEqual(sla.percentiles('resolve', end=end - timedelta(days=2), days=1), [])
+
+    def test_rebuild_matches(self):
+        self.run_lifecycle()
+        recorded = self.snapshot()
+        self.assertEqual(sla.rebuild(), 2)
+        self.assertEqual(self.snapshot(), recorded)
+
+
+class QuantileAccuracyTests(SimpleTestCase):
+    def test_log_normal_samples(self):
+        rng = random.Random(24)
+        samples = sorted(max(rng.lognormvariate(8, 1.5), sla.MIN_SECONDS) for _ in range(20000))
+        bins = {}
+        for seconds in samples:
+            index = sla.bin_index(seconds)
+            bins[index] = bins.get(index, 0) + 1
+        qs = (0.1, 0.5, 0.9, 0.99, 0.999)
+        estimated = sla.quantiles(bins.items(), qs)
+        for q in qs:
+            exact = samples[math.floor(q * (len(samples) - 1))]
+            self.assertLessEqual(abs(estimated[q] - exact) / exact, sla.RELATIVE_ACCURACY, q)
+
+    def test_empty(self):
+        self.assertEqual(sla.quantiles([]), {0.5: None, 0.9: None, 0.99: None})
@@ -0,0 +1,48 @@
+from rest_framework.test import APITestCase
+
+from peacelink.reports.models import Report
+from peacelink.users.models import User
+
+
+class ReportTransitionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.moderator = User.objects.create_user(username='moderator', password='x', role='moderator')
+        cls.reporter = User.objects.create_user(username='reporter', password='x')
+        cls.report = Report.objects.create(
+            user=cls.reporter, category='conflict', location='Bor', description='Cattle raid',
+        )
+
+    def bulk(self, data, **kwargs):
+        return self.client.post('/api/reports/bulk-transition/', data, **kwargs)
+
+    def test_bulk_transition(self):
+        self.client.force_authenticate(self.moderator)
+        response = self.bulk({'ids': [self.report.id], 'status': 'under_review'}, format='json')
+        self.assertEqual(response.data, {'updated': [self.report.id], 'rejected': {}})
+        response = self.bulk({'ids': [self.report.id], 'status': 'verified'}, format='multipart')
+        self.assertEqual(response.data['updated'], [self.report.id])
+
+    def test_bulk_transition_needs_a_list_of_ids(self):
+        self.client.force_authenticate(self.moderator)
+        for ids in (str(self.report.id), self.report.id, {'id': self.report.id}, ['x'], []):
+            response = self.bulk({'ids': ids, 'status': 'under_review'}, format='json')
+            self.assertEqual(response.status_code, 400, ids)
+        self.assertEqual(Report.objects.get(pk=self.report.pk).status, 'submitted')
+
+    def test_bulk_transition_roles(self):
+        data = {'ids': [self.report.id], 'status': 'under_review'}
+        self.assertIn(self.bulk(data, format='json').status_code, (401, 403))
+        self.client.force_authenticate(self.reporter)
+        self.assertEqual(self.bulk(data, format='json').status_code, 403)
+
+    def test_only_moderators_change_status_on_update(self):
+        url = f'/api/reports/{self.report.id}/'
+        self.client.force_authenticate(self.reporter)
+        self.assertEqual(self.client.patch(url, {'status': 'verified'}, format='multipart').status_code, 403)
+        self.assertEqual(self.client.patch(url, {'description': 'Two raids'}, format='multipart').status_code, 200)
+        self.assertEqual(Report.objects.get(pk=self.report.pk).status, 'submitted')
+
+        self.client.force_authenticate(self.moderator)
+        self.assertEqual(self.client.patch(url, {'status': 'verified'}, format='multipart').status_code, 200)
+        self.assertEqual(Report.objects.get(pk=self.report.pk).status, 'verified')
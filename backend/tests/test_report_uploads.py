@@ -0,0 +1,77 @@
+import hashlib
+import shutil
+import tempfile
+import uuid
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from peacelink.reports.models import MediaUpload, Report
+from peacelink.users.models import User
+
+CONTENT = b'\x89PNG fixture bytes ' * 64
+
+
+class ReportUploadTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='reporter', password='x')
+        cls.other = User.objects.create_user(username='someone-else', password='x')
+        cls.report = Report.objects.create(user=cls.owner, category='conflict', location='Bor', description='-')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_authenticate(self.owner)
+
+    def create(self):
+        response = self.client.post('/api/reports/uploads/', {
+            'report': self.report.id, 'filename': 'photo.png', 'content_type': 'image/png',
+            'size': len(CONTENT), 'checksum': hashlib.sha256(CONTENT).hexdigest(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response['Location']
+
+    def patch(self, url, data, offset):
+        return self.client.generic('PATCH', url, data, content_type='application/offset+octet-stream',
+                                   HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunks_complete_the_upload(self):
+        url = self.create()
+        self.assertEqual(self.patch(url, CONTENT[:500], 0)['Upload-Offset'], '500')
+        self.assertEqual(self.client.head(url)['Upload-Offset'], '500')
+        response = self.patch(url, CONTENT[500:], 500)
+        self.assertEqual(response.data['status'], 'complete')
+        self.assertEqual(self.report.media_files.get().file.read(), CONTENT)
+
+    def test_offset_mismatch(self):
+        url = self.create()
+        self.patch(url, CONTENT[:500], 0)
+        response = self.patch(url, CONTENT[100:600], 100)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '500')
+
+    def test_signed_out(self):
+        url = self.create()
+        self.client.force_authenticate(None)
+        for method in ('head', 'get', 'delete'):
+            self.assertIn(getattr(self.client, method)(url).status_code, (401, 403), method)
+        self.assertIn(self.patch(url, CONTENT[:10], 0).status_code, (401, 403))
+        response = self.client.post('/api/reports/uploads/', {'report': self.report.id}, format='json')
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_wrong_owner(self):
+        url = self.create()
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.head(url).status_code, 404)
+        self.assertEqual(self.patch(url, CONTENT[:10], 0).status_code, 404)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        self.assertTrue(MediaUpload.objects.exists())
+        response = self.client.post('/api/reports/uploads/', {
+            'report': self.report.id, 'content_type': 'image/png', 'size': 10,
+        }, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.head(f'/api/reports/uploads/{uuid.uuid4()}/').status_code, 404)
@@ -0,0 +1,55 @@
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from peacelink.resources.api_views import my_bookmarks
+from peacelink.resources.models import Resource, ResourceBookmark
+from peacelink.users.models import User
+
+
+class ResourceQueryCountTests(APITestCase):
+    """is_bookmarked comes from the with_bookmark_flag annotation, not a query per resource"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader', password='x')
+        cls.other = User.objects.create_user(username='other-reader', password='x')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def add_resources(self, count):
+        for n in range(count):
+            resource = Resource.objects.create(
+                title=f'Guide {n}', description='Know your rights', file_url='https://example.org/guide.pdf',
+                verified=True,
+            )
+            if n % 2:
+                ResourceBookmark.objects.create(user=self.user, resource=resource)
+            ResourceBookmark.objects.create(user=self.other, resource=resource)
+
+    def get_bookmarks(self):
+        request = APIRequestFactory().get('/api/resources/bookmarks/')
+        force_authenticate(request, self.user)
+        response = my_bookmarks(request)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_resource_list(self):
+        self.add_resources(2)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/resources/')
+        self.assertEqual([r['is_bookmarked'] for r in response.data['results']], [True, False])
+        self.add_resources(20)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/resources/')
+        self.assertEqual(sum(r['is_bookmarked'] for r in response.data['results']), 11)
+
+    def test_my_bookmarks(self):
+        self.add_resources(2)
+        with self.assertNumQueries(1):
+            data = self.get_bookmarks()
+        self.assertEqual(len(data), 1)
+        self.add_resources(20)
+        with self.assertNumQueries(1):
+            data = self.get_bookmarks()
+        self.assertEqual(len(data), 11)
+        self.assertTrue(all(r['is_bookmarked'] for r in data))
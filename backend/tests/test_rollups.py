@@ -0,0 +1,91 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from peacelink.analytics import rollups
+from peacelink.analytics.models import RollupCounter, RollupWatermark
+from peacelink.reports.models import Report
+from peacelink.reports.transitions import transition_reports
+from peacelink.users.models import User
+
+
+@override_settings(NOTIFICATION_FANOUT_WORKERS=0)  # Status notifications run inside the test transaction
+class RollupCommitTests(TestCase):
+    """Rollup counters are upserted after the counted change commits"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reporter', password='x', state='Jonglei')
+
+    def create_report(self):
+        return Report.objects.create(user=self.user, category='conflict', location='Bor', description='-')
+
+    def by_status(self):
+        return {row['status']: row['count'] for row in rollups.query('reports', group_by=['status'])}
+
+    def test_counted_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            report = self.create_report()
+            self.assertFalse(RollupCounter.objects.exists())
+        self.assertEqual(self.by_status(), {'submitted': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_reports([report.id], 'under_review')
+            self.assertEqual(self.by_status(), {'submitted': 1})
+        self.assertEqual(self.by_status(), {'under_review': 1})
+
+    def test_rollback_drops_the_counts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.create_report()
+                transaction.set_rollback(True)
+        self.assertFalse(RollupCounter.objects.exists())
+
+
+@override_settings(NOTIFICATION_FANOUT_WORKERS=0, ROLLUPS={'SIGNALS': False})
+class IncrementalRebuildTests(TestCase):
+    """With signals off, --incremental refolds the weeks of rows updated since the watermark"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reporter', password='x', state='Jonglei')
+
+    def create_report(self, weeks_ago):
+        report = Report.objects.create(user=self.user, category='conflict', location='Bor', description='-')
+        Report.objects.filter(pk=report.pk).update(created_at=timezone.now() - timedelta(weeks=weeks_ago))
+        return report
+
+    def counters(self):
+        return sorted(RollupCounter.objects.filter(metric='reports').values_list(
+            'granularity', 'bucket', 'dimensions', 'key', 'count'))
+
+    def by_status(self):
+        totals = Counter()
+        for row in rollups.query('reports', 'week', group_by=['status']):
+            totals[row['status']] += row['count']
+        return totals
+
+    def test_old_rows_updated_since_the_watermark(self):
+        old = self.create_report(weeks_ago=5)
+        self.create_report(weeks_ago=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_report(weeks_ago=0)
+        self.assertFalse(RollupCounter.objects.exists())  # Nothing counted from signals
+
+        rollups.rebuild_incremental('reports')
+        self.assertEqual(self.by_status(), {'submitted': 3})
+
+        RollupWatermark.objects.update(rebuilt_at=timezone.now())  # After the creates above
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_reports([old.id], 'under_review')
+        self.assertEqual(rollups.changed_weeks('reports', RollupWatermark.objects.get().rebuilt_at),
+                         {rollups.bucket_start(Report.objects.get(pk=old.pk).created_at, 'week')})
+        rollups.rebuild_incremental('reports')
+        self.assertEqual(self.by_status(), {'submitted': 2, 'under_review': 1})
+
+        incremental = self.counters()
+        rollups.rebuild('reports')
+        self.assertEqual(self.counters(), incremental)